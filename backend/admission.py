@@ -0,0 +1,134 @@
+import logging
+import os
+import shutil
+import tempfile
+
+from api.media import SAMPLE_RATE
+from api.model_client import model_server_available
+from api.transcriber import PASS_MODELS, loaded_models
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.admission')
+
+# Resident memory of an int8 Whisper model on CPU, in MB
+MODEL_FOOTPRINT_MB = {
+    'tiny': 150,
+    'base': 250,
+    'small': 700,
+    'medium': 1800,
+    'large-v2': 3600,
+    'large-v3': 3600
+}
+UNKNOWN_MODEL_MB = 3600
+
+# Decoder state, ffmpeg and Python overhead per job, on top of the PCM buffer
+JOB_OVERHEAD_MB = 300
+
+MB = 1024 * 1024
+
+
+def job_requirements(item, options, media, output_directory=''):
+    """
+    Estimate what a queued job will take from the host
+
+    Args:
+        item: Queue row
+        options: Engine options the job will run with
+        media: Cached media record (size and duration), or None if never probed
+        output_directory: Configured output directory ('' = next to the source)
+
+    Returns:
+        Dictionary with 'memory_mb', 'models' (sizes the job loads),
+        'disk_bytes' and 'output_dir'
+    """
+    passes = options.get('bleeptool', 'S-M-FSM').upper().split('-')
+    transcribes = options.get('mute_plan') is None and options.get('phase') != 'quick'
+    models = set()
+    # Models on the shared model server cost the workers nothing
+    if transcribes and not model_server_available():
+        overrides = options.get('models') or {}
+        models = {overrides.get(code, PASS_MODELS[code]) for code in PASS_MODELS if code in passes}
+
+    size = media['size'] if media else os.path.getsize(item['file_path'])
+    duration = media['duration'] if media and media.get('duration') else 0.0
+    pcm_mb = duration * SAMPLE_RATE * 4 / MB if transcribes else 0.0
+
+    # A cleaned copy or an in-place rewrite needs room for a second full file
+    output_mode = options.get('output_mode', 'file')
+    return {
+        'memory_mb': JOB_OVERHEAD_MB + pcm_mb,
+        'models': models,
+        'disk_bytes': 0 if output_mode == 'sidecar' else size,
+        'output_dir': output_directory or os.path.dirname(item['file_path']) or '.'
+    }
+
+
+def available_memory_mb():
+    """MemAvailable from /proc/meminfo, or None where that is not readable"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def free_disk_bytes(path):
+    """Free space on the filesystem holding path (or its nearest existing parent)"""
+    while path and not os.path.exists(path):
+        path = os.path.dirname(path)
+    return shutil.disk_usage(path or '.').free
+
+
+def check_admission(requirements, running, min_free_disk_mb=1024, max_load_per_cpu=1.5):
+    """
+    Decide whether a job can start next to the ones already running
+
+    Memory and disk that running jobs reserved but may not have used yet
+    are subtracted from what the host reports, and each Whisper model is
+    counted once since jobs share loaded models. With nothing running, only
+    disk space can hold a job back, so the queue always makes progress.
+
+    Args:
+        requirements: job_requirements() of the candidate
+        running: job_requirements() of every running job
+        min_free_disk_mb: Space to leave free in output and scratch directories
+        max_load_per_cpu: 1-minute load average per CPU above which no job is added
+
+    Returns:
+        None if the job may start, otherwise the reason it is deferred
+    """
+    reserve = min_free_disk_mb * MB
+    scratch = tempfile.gettempdir()
+    if free_disk_bytes(scratch) < reserve:
+        return f"Scratch directory {scratch} has less than {min_free_disk_mb} MB free"
+
+    output_dir = requirements['output_dir']
+    committed = sum(job['disk_bytes'] for job in running if job['output_dir'] == output_dir)
+    free = free_disk_bytes(output_dir) - committed
+    if free - requirements['disk_bytes'] < reserve:
+        return (f"Needs {requirements['disk_bytes'] / MB / 1024:.1f} GB in {output_dir}, "
+                f"{max(free, 0) / MB / 1024:.1f} GB free after running jobs")
+
+    if not running:
+        return None
+
+    memory = available_memory_mb()
+    if memory is not None:
+        in_use = loaded_models() | set().union(*(job['models'] for job in running))
+        new_models = requirements['models'] - in_use
+        needed = requirements['memory_mb'] + sum(MODEL_FOOTPRINT_MB.get(m, UNKNOWN_MODEL_MB) for m in new_models)
+        # Running jobs may still be growing towards their estimate
+        pending = sum(job['memory_mb'] for job in running) / 2
+        if memory - pending < needed:
+            return f"Needs {needed:.0f} MB of memory, {max(memory - pending, 0):.0f} MB available"
+
+    if hasattr(os, 'getloadavg'):
+        load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        if load > max_load_per_cpu:
+            return f"Load average {load:.2f} per CPU is above {max_load_per_cpu}"
+
+    return None
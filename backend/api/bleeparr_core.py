@@ -1,13 +1,54 @@
 import os
+import sys
+import argparse
 import logging
-import subprocess
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 import json
 
+from api.jobs import JobCancelled, check_cancelled
+from api.checkpoints import ChunkCheckpoint, clear_checkpoints
+from api.acoustic import HOP_SECONDS, acoustic_fingerprint, acoustic_path, find_offset, load_acoustic, save_acoustic
+from api.matcher import get_matcher
+from api.media import SAMPLE_RATE, get_primary_audio_stream, get_whisper_language, extract_pcm, mute_audio, append_muted_track, remove_clean_tracks, get_audio_streams, is_clean_track
+from api.subtitles import load_subtitles
+from api.transcriber import PASS_MODELS, get_model, transcribe_windows
+from api.transcripts import load_transcript, save_transcript, shift_transcript
+from api.media_files import get_media_record
+from api.muteplan import build_plan, plan_stats
+from api.sidecar import write_sidecars
+from api.stages import stage, stage_stats
+from api.vad import detect_speech_regions, plan_chunks, speech_stats
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('bleeparr.core')
 
+# Windows whose small-model words average below this are re-checked by M
+LOW_CONFIDENCE = 0.6
+
+# How a cleaned result is delivered: a cleaned copy, a cleaned track added to
+# the source in place, or mute lists only
+OUTPUT_MODES = ('file', 'track', 'sidecar')
+
+def _in_windows(word, windows):
+    """Check whether a word starts inside any of the given windows"""
+    return any(start <= word['start'] < end for start, end in windows)
+
+def _covered(window, windows):
+    """Check whether a window lies inside one that was already transcribed"""
+    return any(start <= window[0] and window[1] <= end for start, end in windows)
+
+def _cue_confirmed(hits, cue):
+    """Check whether a transcribed swear falls inside a subtitle cue"""
+    return any(cue['start'] - 0.5 <= hit['start'] <= cue['end'] + 0.5 for hit in hits)
+
+def _mean_probability(words, start, end):
+    """Average word probability inside a window (1.0 if it has no words)"""
+    probabilities = [w['probability'] for w in words if start <= w['start'] < end]
+    return sum(probabilities) / len(probabilities) if probabilities else 1.0
+
 class Bleeparr:
     """Class to handle profanity cleaning operations"""
     
@@ -24,19 +65,15 @@ class Bleeparr:
         self.output_prefix = output_prefix
         self.output_directory = output_directory
         
-        # Validate swears file exists
-        if not os.path.exists(self.swears_file):
-            logger.warning(f"Swears file not found: {self.swears_file}")
-        else:
-            # Count swear words for logging
-            try:
-                with open(self.swears_file, 'r') as f:
-                    swear_count = len([line for line in f if line.strip()])
-                logger.info(f"Initialized Bleeparr with {swear_count} words to censor")
-            except Exception as e:
-                logger.error(f"Error reading swear words: {str(e)}")
+        # Compiled once per swears file and shared by every instance
+        logger.info(f"Initialized Bleeparr with {len(self.matcher)} words to censor")
     
-    def process_file(self, file_path, dry_run=False, boost_db=6, pre_buffer=100, post_buffer=100, bleeptool="S-M-FSM"):
+    @property
+    def matcher(self):
+        """Compiled swear matcher, rebuilt only when the swears file changes"""
+        return get_matcher(self.swears_file)
+    
+    def process_file(self, file_path, dry_run=False, boost_db=6, pre_buffer=100, post_buffer=100, bleeptool="S-M-FSM", mute_plan=None, merge_gap=200, output_mode='file', releases=None, phase=None, models=None):
         """
         Process a media file to censor profanity
         
@@ -47,6 +84,16 @@ class Bleeparr:
             pre_buffer: Pre-mute buffer in milliseconds
             post_buffer: Post-mute buffer in milliseconds
             bleeptool: Passes to run (S=Small, M=Medium, FSM=Fallback subtitle mute)
+            mute_plan: Precomputed (start, end) spans to mute; skips all transcription
+            merge_gap: Mutes closer together than this many milliseconds are joined
+            output_mode: 'file' writes a cleaned copy, 'track' adds a cleaned default track to
+                the source in place, 'sidecar' only writes EDL/JSON mute lists
+            releases: Fingerprints of other releases of the same episode or movie, whose
+                transcripts are reused if the audio matches
+            phase: 'quick' for a subtitle-only clean ahead of the full one, 'refine' for the
+                full clean that replaces it, None for a single-phase job
+            models: Whisper model size per pass code (e.g. {'S': 'base'}), defaults to
+                small for S and medium for M
             
         Returns:
             Dictionary with processing results
@@ -60,76 +107,166 @@ class Bleeparr:
                 'file_path': file_path
             }
         
+        passes = [code for code in bleeptool.upper().split('-') if code]
+        if phase == 'quick':
+            # Subtitles only, so the file is watchable seconds after import
+            passes = ['FSM']
+        if output_mode not in OUTPUT_MODES:
+            return {
+                'success': False,
+                'error': f"Unknown output mode: {output_mode}",
+                'file_path': file_path
+            }
+        settings = {
+            'pre_buffer': pre_buffer,
+            'post_buffer': post_buffer,
+            'merge_gap': merge_gap,
+            'boost_db': boost_db,
+            'bleeptool': bleeptool
+        }
+        
         try:
-            # Determine output file path if not dry run
-            file_dir = os.path.dirname(file_path)
-            file_name = os.path.basename(file_path)
-            
-            if self.output_directory:
-                output_dir = self.output_directory
-                if not os.path.exists(output_dir):
-                    os.makedirs(output_dir, exist_ok=True)
-            else:
-                output_dir = file_dir
-                
-            output_name = f"{self.output_prefix}{file_name}"
-            output_path = os.path.join(output_dir, output_name)
-            
-            # Build command for bleeparr CLI
-            cmd = [
-                "python3", 
-                "./bleeparr-1.1.py", 
-                "--input", file_path,
-                "--swears", self.swears_file,
-                "--boost-db", str(boost_db),
-                "--pre-buffer", str(pre_buffer),
-                "--post-buffer", str(post_buffer),
-                "--bleeptool", bleeptool
-            ]
+            with stage('extract'):
+                media = get_media_record(file_path)
+            info = media['info']
+            duration = media['duration']
+            fingerprint = media['fingerprint']
+            audio_stream = get_primary_audio_stream(info)
+            if not audio_stream:
+                raise RuntimeError(f"No audio stream found in {file_path}")
+            language = get_whisper_language(audio_stream)
             
-            if dry_run:
-                cmd.append("--dry-run")
-                logger.info(f"Dry run on: {file_path}")
-            else:
-                # Add output related options
-                if output_dir != file_dir:
-                    # Handle custom output directory
-                    # The CLI doesn't support direct output dir specification,
-                    # so we'll need to move the file after processing
-                    pass
-            
-            # Run the command
-            logger.info(f"Running command: {' '.join(cmd)}")
-            process = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if process.returncode != 0:
-                logger.error(f"Bleeparr CLI process failed: {process.stderr}")
+            if mute_plan is not None:
+                # The plan was built from the word index, only the mute step is left
+                plan = build_plan([{'start': start, 'end': end} for start, end in mute_plan], pre_buffer, post_buffer, merge_gap, duration)
+                logger.info(f"Total Words Muted: {len(mute_plan)}")
+                hits = [{'start': start, 'end': end} for start, end in mute_plan]
+                result = {
+                    'success': True,
+                    'swears_found': len(mute_plan),
+                    'mute_plan': plan_stats(plan),
+                    'mute_plan_source': 'index',
+                    'phase': phase,
+                    'fingerprint': fingerprint,
+                    'duration': duration,
+                    'file_path': file_path,
+                    'dry_run': dry_run
+                }
+                result.update(self._write_output(file_path, plan, hits, info, audio_stream, output_mode, settings, dry_run))
+                return result
+            
+            # Reuse the stored transcript so a settings change only re-runs matching and muting
+            transcript = load_transcript(fingerprint)
+            if transcript and transcript['meta'].get('boost_db') != boost_db:
+                # The boost changes what Whisper hears, so the old words no longer apply
+                transcript = None
+            transcript_cached = transcript is not None
+            if not transcript:
+                transcript = {
+                    'words': [],
+                    'cues': [],
+                    'regions': [],
+                    'm_windows': [],
+                    'meta': {'boost_db': boost_db, 'language': language, 'passes': []}
+                }
+            meta = transcript['meta']
+            
+            # Decode the dialogue track at most once, and only if a pass still needs audio
+            decoded = []
+            def get_pcm():
+                if not decoded:
+                    with stage('extract'):
+                        decoded.append(extract_pcm(file_path, audio_stream['index'], boost_db))
+                return decoded[0]
+            
+            # An upgrade of a known release has the same audio, only shifted
+            reused_from = None
+            if not transcript_cached and releases:
+                reused = self._reuse_release(fingerprint, releases, get_pcm, boost_db, duration)
+                if reused:
+                    transcript = reused
+                    meta = transcript['meta']
+                    reused_from = meta['reused_from']
+            
+            # Only speech goes to Whisper, score and silence are skipped
+            if 'vad' not in meta and ('S' in passes or 'M' in passes):
+                pcm = get_pcm()
+                transcript['regions'] = detect_speech_regions(pcm, SAMPLE_RATE)
+                meta['vad'] = speech_stats(transcript['regions'], duration or len(pcm) / SAMPLE_RATE)
+            vad = meta.get('vad')
+            if vad:
+                logger.info(f"VAD kept {vad['speech_seconds']}s of {vad['duration']}s ({vad['speech_ratio']:.0%} speech)")
+            
+            cues_loaded = False
+            if ('M' in passes or 'FSM' in passes) and not meta.get('cues_loaded'):
+                transcript['cues'] = load_subtitles(file_path, info.get('streams', []), language)
+                meta['cues_loaded'] = cues_loaded = True
+            
+            hits, pass_counts, transcribe_seconds = self._run_passes(transcript, get_pcm, passes, language, models or {}, fingerprint)
+            
+            # Project how long Whisper would have spent on the discarded audio
+            if vad and 'time_saved_seconds' not in vad and 'S' in meta['passes'] and transcribe_seconds:
+                if vad['speech_seconds'] > 0:
+                    vad['time_saved_seconds'] = round(vad['skipped_seconds'] * transcribe_seconds / vad['speech_seconds'], 1)
+                else:
+                    vad['time_saved_seconds'] = 0.0
+            
+            transcript_saved = bool(decoded or cues_loaded or not transcript_cached)
+            if transcript_saved:
+                save_transcript(fingerprint, transcript)
+                clear_checkpoints(fingerprint)
+            if decoded and not acoustic_path(fingerprint).exists():
+                # Lets a later release of the same audio skip transcription
+                save_acoustic(fingerprint, acoustic_fingerprint(decoded[0], SAMPLE_RATE))
+            
+            if phase == 'quick' and not transcript['cues']:
+                # Without subtitles a quick clean would mute nothing, leave it to the refine phase
+                logger.info(f"No subtitles for a quick clean of {file_path}")
                 return {
-                    'success': False,
-                    'error': process.stderr,
-                    'command': ' '.join(cmd),
-                    'file_path': file_path
+                    'success': True,
+                    'phase': phase,
+                    'skipped': 'No subtitles for a quick clean',
+                    'swears_found': 0,
+                    'fingerprint': fingerprint,
+                    'duration': duration,
+                    'transcript_saved': transcript_saved,
+                    'output_path': None,
+                    'file_path': file_path,
+                    'dry_run': dry_run
                 }
             
-            # Parse output to get stats
-            output = process.stdout
-            swears_found = 0
-            # Look for lines with "Muting X Bad Words"
-            for line in output.splitlines():
-                if "Total Words Muted" in line:
-                    try:
-                        swears_found = int(line.split(":")[-1].strip())
-                    except:
-                        pass
+            plan = build_plan(hits, pre_buffer, post_buffer, merge_gap, duration)
+            swears_found = len(hits)
+            logger.info(f"Total Words Muted: {swears_found}")
             
-            return {
+            result = {
                 'success': True,
-                'output_path': output_path if not dry_run else None,
                 'swears_found': swears_found,
-                'output': output,
+                'mute_plan': plan_stats(plan),
+                'passes': pass_counts,
+                'vad': vad,
+                'fingerprint': fingerprint,
+                'duration': duration,
+                'transcript_cached': transcript_cached,
+                'transcript_saved': transcript_saved,
+                'reused_from': reused_from,
+                'phase': phase,
+                'transcribe_seconds': round(transcribe_seconds, 1),
                 'file_path': file_path,
                 'dry_run': dry_run
             }
+            result.update(self._write_output(file_path, plan, hits, info, audio_stream, output_mode, settings, dry_run))
+            return result
+        except JobCancelled as e:
+            # Temporary outputs were removed on the way out, the source is untouched
+            logger.warning(f"Stopped processing {file_path}: {e.reason}")
+            return {
+                'success': False,
+                'error': e.reason,
+                'cancelled': not e.timed_out,
+                'timed_out': e.timed_out,
+                'file_path': file_path
+            }
         except Exception as e:
             logger.error(f"Error processing file: {str(e)}")
             return {
@@ -137,9 +274,344 @@ class Bleeparr:
                 'error': str(e),
                 'file_path': file_path
             }
+    
+    def process_many(self, files, workers=None, **options):
+        """
+        Process a batch of media files, yielding each result as it completes
+        
+        The swear matcher is compiled and the Whisper models are loaded once
+        up front and then shared by every file. Files run through the staged
+        pipeline, so one decodes while another transcribes and a third muxes.
+        Files are taken from the iterable lazily, so a whole library list can
+        be streamed in.
+        
+        Args:
+            files: Iterable of paths, or (path, options) pairs whose options
+                override the batch options for that file
+            workers: Files in flight at once (default: one per stage slot)
+            **options: Keyword arguments for process_file shared by the batch
+            
+        Yields:
+            process_file result dictionaries, in completion order
+        """
+        logger.info(f"Batch using {len(self.matcher)} words to censor")
+        bleeptool = options.get('bleeptool', 'S-M-FSM').upper().split('-')
+        if options.get('mute_plan') is None and options.get('phase') != 'quick':
+            overrides = options.get('models') or {}
+            for code in PASS_MODELS:
+                if code in bleeptool:
+                    try:
+                        get_model(overrides.get(code) or PASS_MODELS[code])
+                    except RuntimeError as e:
+                        # Every file will report it; subtitle-only work can still go ahead
+                        logger.warning(f"Could not preload the {code} model: {e}")
+        
+        if workers is None:
+            workers = sum(s['limit'] for s in stage_stats().values())
+        workers = max(workers, 1)
+        
+        def run(entry):
+            file_path, file_options = (entry, {}) if isinstance(entry, (str, os.PathLike)) else entry
+            return self.process_file(os.fspath(file_path), **dict(options, **file_options))
+        
+        files = iter(files)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bleeparr-batch') as executor:
+            in_flight = set()
+            exhausted = False
+            while True:
+                # Keep a small backlog ready so a finishing file never leaves a stage idle
+                while not exhausted and len(in_flight) < workers * 2:
+                    entry = next(files, None)
+                    if entry is None:
+                        exhausted = True
+                    else:
+                        in_flight.add(executor.submit(run, entry))
+                if not in_flight:
+                    return
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+    
+    def _write_output(self, file_path, plan, hits, info, audio_stream, output_mode, settings, dry_run):
+        """
+        Write the cleaned result in the requested output mode
+        
+        Args:
+            file_path: Path to the source media file
+            plan: Mute plan from build_plan
+            hits: Words the plan was built from
+            info: ffprobe output for the source
+            audio_stream: Audio stream that was transcribed
+            output_mode: 'file', 'track' or 'sidecar'
+            settings: Settings that shaped the plan
+            dry_run: If True, nothing is written
+            
+        Returns:
+            Dictionary of output fields for the job result
+        """
+        output = {
+            'output_mode': output_mode,
+            'output_path': None,
+            'sidecar_paths': None,
+            'timings': None,
+            'audio_tracks': len([s for s in get_audio_streams(info) if not is_clean_track(s)])
+        }
+        if dry_run:
+            logger.info(f"Dry run on: {file_path}")
+            return output
+        check_cancelled()
+        
+        if output_mode == 'sidecar':
+            # Players apply the mute list themselves, the media is never rewritten
+            output['sidecar_paths'] = write_sidecars(file_path, plan, hits, settings)
+            return output
+        
+        file_dir = os.path.dirname(file_path)
+        file_name = os.path.basename(file_path)
+        
+        if self.output_directory:
+            output_dir = self.output_directory
+            if not os.path.exists(output_dir):
+                os.makedirs(output_dir, exist_ok=True)
+        else:
+            output_dir = file_dir
+        
+        if output_mode == 'track':
+            with stage('mux'):
+                output['output_path'], output['timings'] = self._replace_with_track(
+                    file_path, os.path.join(output_dir, file_name), plan, info, audio_stream
+                )
+                # The cleaned file took the source's place, remember it as already done
+                output['output_fingerprint'] = get_media_record(output['output_path'])['fingerprint']
+            return output
+            
+        output_name = f"{self.output_prefix}{file_name}"
+        output['output_path'] = os.path.join(output_dir, output_name)
+        # Swapped in whole, so a refined clean replaces a quick one without a half-written window
+        with stage('mux'):
+            output['timings'] = self._write_atomically(
+                output['output_path'],
+                lambda tmp_path: mute_audio(file_path, tmp_path, plan, info)
+            )
+        return output
+    
+    def _write_atomically(self, final_path, write):
+        """
+        Write a file next to its destination and rename it into place
+        
+        Args:
+            final_path: Path the file should end up at
+            write: Callable writing the file to the temporary path it is given
+            
+        Returns:
+            Whatever write returned
+        """
+        final_dir, final_name = os.path.split(final_path)
+        tmp_path = os.path.join(final_dir, f".bleeparr-{final_name}")
+        try:
+            result = write(tmp_path)
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return result
+    
+    def _replace_with_track(self, file_path, final_path, plan, info, audio_stream):
+        """
+        Add a cleaned track and swap the result in for the source
+        
+        ffmpeg writes a hidden temporary file in the destination directory,
+        so the swap is a rename on one filesystem: readers see either the old
+        file or the new one, and no full-size copy is left behind. When the
+        destination is another directory the source is removed afterwards,
+        which moves the file without copying it across filesystems. With an
+        empty plan the cleaned tracks of an earlier run are removed and the
+        dialogue track is made the default again.
+        
+        Args:
+            file_path: Path to the source media file
+            final_path: Where the cleaned file should end up
+            plan: Mute plan from build_plan
+            info: ffprobe output for the source
+            audio_stream: Audio stream to clean
+            
+        Returns:
+            Tuple of (final path, timings or None if no remux was needed)
+        """
+        moving = os.path.abspath(final_path) != os.path.abspath(file_path)
+        same_device = os.stat(os.path.dirname(final_path) or '.').st_dev == os.stat(file_path).st_dev
+        # A re-render can leave nothing to mute in a file cleaned before
+        stale = any(is_clean_track(s) for s in get_audio_streams(info))
+        if not len(plan) and not stale and (not moving or same_device):
+            # Nothing to mute: leave the file alone, or just rename it into place
+            if moving:
+                os.replace(file_path, final_path)
+            return final_path, None
+        
+        def write(tmp_path):
+            if len(plan):
+                timings = append_muted_track(file_path, tmp_path, plan, info, audio_stream)
+            elif stale:
+                timings = remove_clean_tracks(file_path, tmp_path, info, audio_stream)
+            else:
+                timings = mute_audio(file_path, tmp_path, plan, info)
+            shutil.copymode(file_path, tmp_path)
+            return timings
+        
+        timings = self._write_atomically(final_path, write)
+        if moving:
+            os.remove(file_path)
+        return final_path, timings
+    
+    def _reuse_release(self, fingerprint, releases, get_pcm, boost_db, duration):
+        """
+        Borrow the transcript of another release with the same audio
+        
+        Candidates need both a stored transcript (made with the same boost)
+        and an acoustic fingerprint. The new file's audio is only decoded and
+        fingerprinted once at least one candidate qualifies.
+        
+        Args:
+            fingerprint: File fingerprint of the file being processed
+            releases: File fingerprints of other releases of the same item
+            get_pcm: Callable returning the decoded dialogue track
+            boost_db: Boost the transcript must have been made with
+            duration: Duration of the file being processed
+            
+        Returns:
+            Shifted transcript with meta['reused_from'] set, or None
+        """
+        candidates = []
+        for other in releases:
+            if other == fingerprint:
+                continue
+            known = load_acoustic(other)
+            if known is None:
+                continue
+            old = load_transcript(other)
+            if old and old['meta'].get('boost_db') == boost_db:
+                candidates.append((other, known, old))
+        if not candidates:
+            return None
+        
+        acoustic = load_acoustic(fingerprint)
+        if acoustic is None:
+            acoustic = acoustic_fingerprint(get_pcm(), SAMPLE_RATE)
+            save_acoustic(fingerprint, acoustic)
+        
+        for other, known, old in candidates:
+            offset = find_offset(known, acoustic)
+            if offset is None:
+                continue
+            transcript = shift_transcript(old, offset, duration)
+            meta = transcript['meta']
+            meta['vad'] = speech_stats(transcript['regions'], duration or len(acoustic) * HOP_SECONDS)
+            meta['reused_from'] = {'fingerprint': other, 'offset_seconds': offset}
+            logger.info(f"Reusing transcript of release {other} shifted by {offset:+.2f}s")
+            return transcript
+        return None
+    
+    def _run_passes(self, transcript, get_pcm, passes, language, models, fingerprint):
+        """
+        Run the bleeptool passes, transcribing only what the cache lacks
+        
+        S transcribes every speech region with the small model. M re-checks
+        suspect spans with the medium model: subtitle cues that contain a
+        swear S did not hear, or low-confidence regions when there are no
+        subtitles. FSM mutes whole cues that are still unconfirmed.
+        
+        The transcript is updated in place. Spans M has already re-checked
+        are remembered, so a new swear list only sends new spans to Whisper.
+        
+        Every finished chunk is checkpointed and the transcript is saved after
+        each Whisper pass, so an interrupted job resumes where it stopped.
+        Audio is decoded before a transcribe slot is taken, so the slot is
+        only held while Whisper runs.
+        
+        Args:
+            transcript: Transcript dictionary (cached or freshly created)
+            get_pcm: Callable returning the decoded dialogue track
+            passes: List of pass codes, e.g. ['S', 'M', 'FSM']
+            language: Two-letter language code or None
+            models: Whisper model size overrides per pass code
+            fingerprint: File fingerprint the transcript and checkpoints are keyed by
+            
+        Returns:
+            Tuple of (hits, pass_counts, transcribe_seconds)
+        """
+        meta = transcript['meta']
+        cues = transcript['cues']
+        transcribe_seconds = 0.0
+        chunks = plan_chunks(transcript['regions'])
+        
+        def checkpoint(code):
+            model_size = models.get(code) or PASS_MODELS[code]
+            return ChunkCheckpoint(fingerprint, f"{code}-{model_size}-{meta['boost_db']}")
+        
+        if 'S' in passes and 'S' not in meta['passes']:
+            small_checkpoint = checkpoint('S')
+            pcm = get_pcm()
+            with stage('transcribe'):
+                small_words, elapsed = transcribe_windows(
+                    pcm, SAMPLE_RATE, chunks, 'S', language, model_size=models.get('S'),
+                    checkpoint=small_checkpoint
+                )
+            transcript['words'].extend(small_words)
+            meta['passes'].append('S')
+            transcribe_seconds += elapsed
+            save_transcript(fingerprint, transcript)
+            small_checkpoint.clear()
+        
+        matcher = self.matcher
+        words = transcript['words']
+        hits = matcher.match_words(words)
+        flagged = [cue for cue in cues if matcher.find(cue['text'])]
+        
+        if 'M' in passes:
+            if cues:
+                windows = [
+                    (max(cue['start'] - 0.5, 0.0), cue['end'] + 0.5)
+                    for cue in flagged if not _cue_confirmed(hits, cue)
+                ]
+            else:
+                windows = [
+                    (start, end) for start, end in chunks
+                    if _mean_probability(words, start, end) < LOW_CONFIDENCE
+                ]
+            windows = [w for w in windows if not _covered(w, transcript['m_windows'])]
+            if windows:
+                medium_checkpoint = checkpoint('M')
+                pcm = get_pcm()
+                with stage('transcribe'):
+                    medium_words, elapsed = transcribe_windows(
+                        pcm, SAMPLE_RATE, windows, 'M', language, model_size=models.get('M'),
+                        checkpoint=medium_checkpoint
+                    )
+                transcribe_seconds += elapsed
+                # Medium output replaces small output inside the re-checked spans
+                words = [w for w in words if not _in_windows(w, windows)] + medium_words
+                words.sort(key=lambda w: w['start'])
+                transcript['words'] = words
+                transcript['m_windows'].extend(windows)
+                hits = matcher.match_words(words)
+                save_transcript(fingerprint, transcript)
+                medium_checkpoint.clear()
+        
+        pass_counts = {code: sum(1 for w in hits if w['pass'] == code) for code in passes if code != 'FSM'}
+        
+        if 'FSM' in passes:
+            fallback = [
+                {'text': cue['text'], 'start': cue['start'], 'end': cue['end'], 'probability': None, 'pass': 'FSM'}
+                for cue in flagged if not _cue_confirmed(hits, cue)
+            ]
+            hits.extend(fallback)
+            pass_counts['FSM'] = len(fallback)
+        
+        return hits, pass_counts, transcribe_seconds
 
 # Standalone functions for compatibility with existing code
-def process_media_file(file_path, media_type, title, output_prefix='clean_', dry_run=False):
+def process_media_file(file_path, media_type, title, output_prefix='clean_', dry_run=False, swears_file='swears.txt', **options):
     """
     Process a media file to censor profanity
     
@@ -149,15 +621,17 @@ def process_media_file(file_path, media_type, title, output_prefix='clean_', dry
         title: Title of the media
         output_prefix: Prefix for the output file name
         dry_run: If True, will not actually make changes
+        swears_file: Path to the file containing profanity words
+        **options: Extra keyword arguments for Bleeparr.process_file
         
     Returns:
         Dictionary with processing results
     """
     # Create a temporary Bleeparr instance
-    bleeper = Bleeparr(output_prefix=output_prefix)
+    bleeper = Bleeparr(swears_file=swears_file, output_prefix=output_prefix)
     
     # Process the file
-    result = bleeper.process_file(file_path, dry_run=dry_run)
+    result = bleeper.process_file(file_path, dry_run=dry_run, **options)
     
     # Add additional info
     result['media_type'] = media_type
@@ -165,16 +639,73 @@ def process_media_file(file_path, media_type, title, output_prefix='clean_', dry
     
     return result
 
-def process_episode(episode_path, series_title, episode_info, output_prefix='clean_', dry_run=False):
+def process_episode(episode_path, series_title, episode_info, output_prefix='clean_', dry_run=False, **options):
     """Process a TV episode file"""
     title = f"{series_title} - {episode_info}"
-    return process_media_file(episode_path, 'show', title, output_prefix, dry_run)
+    return process_media_file(episode_path, 'show', title, output_prefix, dry_run, **options)
 
-def process_movie(movie_path, movie_title, output_prefix='clean_', dry_run=False):
+def process_movie(movie_path, movie_title, output_prefix='clean_', dry_run=False, **options):
     """Process a movie file"""
-    return process_media_file(movie_path, 'movie', movie_title, output_prefix, dry_run)
+    return process_media_file(movie_path, 'movie', movie_title, output_prefix, dry_run, **options)
 
 def clean_file(file_path, dry_run=False):
     """Legacy function for backward compatibility"""
     bleeper = Bleeparr()
     return bleeper.process_file(file_path, dry_run=dry_run)
+
+def _read_input_list(path):
+    """Yield media paths from a file (or '-' for stdin), one per line"""
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean a batch of media files with one model load")
+    parser.add_argument('files', nargs='*', help="Media files to clean")
+    parser.add_argument('--input-list', help="File with one media path per line ('-' for stdin)")
+    parser.add_argument('--workers', type=int, help="Files in flight at once (default: one per pipeline stage slot)")
+    parser.add_argument('--swears-file', default='swears.txt')
+    parser.add_argument('--output-prefix', default='clean_')
+    parser.add_argument('--output-directory', default='')
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES, default='file')
+    parser.add_argument('--bleeptool', default='S-M-FSM')
+    parser.add_argument('--boost-db', type=float, default=6)
+    parser.add_argument('--pre-buffer', type=float, default=100)
+    parser.add_argument('--post-buffer', type=float, default=100)
+    parser.add_argument('--merge-gap', type=float, default=200)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    
+    if not args.files and not args.input_list:
+        parser.error("no files given (pass paths or --input-list)")
+    
+    from backend.db import init_db
+    from api.calibration import apply_calibration
+    init_db()
+    apply_calibration()
+    
+    files = list(args.files)
+    if args.input_list:
+        files = (path for source in (files, _read_input_list(args.input_list)) for path in source)
+    
+    bleeper = Bleeparr(swears_file=args.swears_file, output_prefix=args.output_prefix,
+                       output_directory=args.output_directory)
+    failed = 0
+    # One JSON line per file as it finishes
+    for result in bleeper.process_many(
+        files, workers=args.workers, dry_run=args.dry_run, boost_db=args.boost_db,
+        pre_buffer=args.pre_buffer, post_buffer=args.post_buffer, merge_gap=args.merge_gap,
+        bleeptool=args.bleeptool, output_mode=args.output_mode
+    ):
+        failed += not result.get('success')
+        print(json.dumps(result, default=str), flush=True)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+import argparse
+import difflib
+import hashlib
+import json
+import logging
+import os
+import platform
+import time
+import wave
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.db import get_setting, set_setting
+from api.media import SAMPLE_RATE, extract_pcm, get_primary_audio_stream, probe
+from api.transcriber import DEFAULT_BEAM_SIZE, PASS_MODELS, WhisperModel, set_tuning, transcribe_audio
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.calibration')
+
+# Settings key holding the calibration as JSON
+TUNING_SETTING = 'whisper_tuning'
+
+# Length of the benchmark clip; one full Whisper window
+CLIP_SECONDS = 30
+
+# Default benchmark clip: 11 s of real dialogue (a public domain excerpt of
+# the 1961 inaugural address, as shipped with whisper.cpp) in 16 kHz mono
+SPEECH_CLIP = Path(__file__).parent / 'assets' / 'calibration_speech.wav'
+
+# Reference setup the candidates are compared against
+REFERENCE_COMPUTE_TYPE = 'float32'
+
+# Tried in order from most to least precise
+COMPUTE_TYPES = ('float32', 'int16', 'int8_float32', 'int8')
+BEAM_SIZES = (DEFAULT_BEAM_SIZE, 2, 1)
+
+# CPU flags that change which CTranslate2 kernels run
+_CPU_FLAGS = ('avx', 'avx2', 'avx512f', 'avx512_vnni', 'avx_vnni', 'fma', 'f16c', 'neon', 'asimd')
+
+
+def hardware_id() -> str:
+    """
+    Identify the CPU the calibration was measured on
+
+    Built from the CPU model, core count and the SIMD flags that pick
+    CTranslate2 kernels, so moving the container to another host or
+    changing its CPU quota triggers a new calibration.
+    """
+    model = platform.processor() or platform.machine()
+    flags = set()
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                key = key.strip()
+                if key in ('model name', 'Hardware', 'CPU part') and value.strip():
+                    model = value.strip()
+                elif key in ('flags', 'Features'):
+                    flags.update(value.split())
+    except OSError:
+        pass
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    description = f"{model}|{cores}|{','.join(sorted(flags.intersection(_CPU_FLAGS)))}"
+    return hashlib.sha1(description.encode()).hexdigest()[:16]
+
+
+def synthetic_clip(seconds: float = CLIP_SECONDS, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Generate the benchmark clip
+
+    Speech-like audio built in code so nothing binary has to ship: a voiced
+    source with a wandering pitch, shaped by vowel formants that change at
+    syllable rate, with pauses and a noise floor. It exercises the encoder
+    and decoder the way dialogue does but holds no words, so it can only be
+    used to time the reference settings, never to check accuracy.
+    """
+    rng = np.random.default_rng(1234)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 120 + 25 * np.sin(2 * np.pi * 0.3 * t) + 10 * np.sin(2 * np.pi * 2.1 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+
+    # (F1, F2) of a few vowels, switched about four times a second
+    vowels = np.array([(730, 1090), (270, 2290), (530, 1840), (570, 840), (300, 870)])
+    syllables = rng.integers(0, len(vowels), int(seconds * 4) + 1)
+    formants = vowels[syllables[(t * 4).astype(int)]]
+
+    voiced = np.zeros_like(t)
+    for harmonic in range(1, 30):
+        frequency = harmonic * pitch
+        gain = sum(1.0 / (1.0 + ((frequency - formants[:, i]) / 90.0) ** 2) for i in range(2))
+        voiced += gain * np.sin(harmonic * phase) / harmonic
+
+    # Syllable envelope with a pause every couple of seconds
+    envelope = np.clip(np.sin(np.pi * (t * 4 % 1)), 0, None) * (np.sin(2 * np.pi * 0.45 * t) > -0.6)
+    audio = voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    return (0.3 * audio / np.max(np.abs(audio))).astype(np.float32)
+
+
+def speech_clip(path: Path = SPEECH_CLIP) -> np.ndarray:
+    """Read the bundled speech clip (16-bit mono WAV at the Whisper sample rate)"""
+    with wave.open(str(path), 'rb') as f:
+        if f.getnchannels() != 1 or f.getsampwidth() != 2 or f.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path} must be 16-bit mono at {SAMPLE_RATE} Hz")
+        frames = f.readframes(f.getnframes())
+    return (np.frombuffer(frames, dtype='<i2') / 32768.0).astype(np.float32)
+
+
+def default_clip() -> np.ndarray:
+    """The bundled speech clip, or the synthetic clip if it is missing"""
+    try:
+        return speech_clip()
+    except (OSError, EOFError, wave.Error, ValueError) as e:
+        logger.warning(f"Cannot read {SPEECH_CLIP}, falling back to the synthetic clip: {e}")
+        return synthetic_clip()
+
+
+def load_clip(file_path: str, seconds: float = CLIP_SECONDS) -> np.ndarray:
+    """Take a benchmark clip from the middle of a media file's dialogue track"""
+    stream = get_primary_audio_stream(probe(file_path))
+    if not stream:
+        raise RuntimeError(f"No audio stream found in {file_path}")
+    pcm = extract_pcm(file_path, stream['index'])
+    start = max(len(pcm) // 2 - int(seconds * SAMPLE_RATE) // 2, 0)
+    return pcm[start:start + int(seconds * SAMPLE_RATE)]
+
+
+def _agreement(reference: List[str], words: List[str]) -> float:
+    """Word-level similarity of a transcript to the reference (1.0 = identical)"""
+    return difflib.SequenceMatcher(None, reference, words).ratio()
+
+
+def _measure(model, clip: np.ndarray, beam_size: int) -> Tuple[List[str], float]:
+    """Transcribe the clip once and time it"""
+    started = time.perf_counter()
+    words = transcribe_audio(model, clip, beam_size=beam_size)
+    elapsed = time.perf_counter() - started
+    return [w['text'].lower().strip('.,!?') for w in words], elapsed
+
+
+def calibrate_model(model_size: str, clip: np.ndarray, min_agreement: float = 0.95) -> Dict[str, Any]:
+    """
+    Find the fastest inference settings for one model size
+
+    The reference is float32 on every core with the default beam. Compute
+    type, then thread count, then beam width are searched in turn, each
+    keeping the fastest setting whose transcript still agrees with the
+    reference by at least min_agreement. If the reference has no words
+    there is nothing to check accuracy against, so float32 and the default
+    beam are kept and only the thread count is tuned.
+
+    Args:
+        model_size: Whisper model size
+        clip: Mono float32 benchmark audio
+        min_agreement: Lowest acceptable word agreement with the reference
+
+    Returns:
+        Dictionary with 'compute_type', 'cpu_threads', 'beam_size',
+        'seconds' (per clip), 'agreement' and 'reference_seconds'
+    """
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    models = {}
+
+    def model_for(compute_type, cpu_threads):
+        key = (compute_type, cpu_threads)
+        if key not in models:
+            models.clear()
+            models[key] = WhisperModel(model_size, device='cpu', compute_type=compute_type, cpu_threads=cpu_threads)
+            # First call pays one-off allocation costs, keep it out of the timings
+            transcribe_audio(models[key], clip[:SAMPLE_RATE * 5], beam_size=1)
+        return models[key]
+
+    reference, reference_seconds = _measure(model_for(REFERENCE_COMPUTE_TYPE, cores), clip, DEFAULT_BEAM_SIZE)
+    if not reference:
+        logger.warning(f"{model_size}: the clip produced no words, keeping {REFERENCE_COMPUTE_TYPE} "
+                       f"and beam {DEFAULT_BEAM_SIZE} and tuning only the thread count")
+    best = {
+        'compute_type': REFERENCE_COMPUTE_TYPE,
+        'cpu_threads': cores,
+        'beam_size': DEFAULT_BEAM_SIZE,
+        'seconds': reference_seconds,
+        'agreement': 1.0
+    }
+
+    def consider(compute_type, cpu_threads, beam_size):
+        if not reference and (compute_type, beam_size) != (REFERENCE_COMPUTE_TYPE, DEFAULT_BEAM_SIZE):
+            return
+        try:
+            words, seconds = _measure(model_for(compute_type, cpu_threads), clip, beam_size)
+        except (ValueError, RuntimeError) as e:
+            # Compute type not supported by this CPU or build
+            logger.info(f"{model_size}: {compute_type} unavailable: {e}")
+            return
+        agreement = _agreement(reference, words)
+        logger.info(f"{model_size}: {compute_type}, {cpu_threads} threads, beam {beam_size}: "
+                    f"{seconds:.2f}s, agreement {agreement:.3f}")
+        if agreement >= min_agreement and seconds < best['seconds']:
+            best.update(compute_type=compute_type, cpu_threads=cpu_threads, beam_size=beam_size,
+                        seconds=seconds, agreement=agreement)
+
+    for compute_type in COMPUTE_TYPES[1:]:
+        consider(compute_type, cores, DEFAULT_BEAM_SIZE)
+    for cpu_threads in sorted({max(cores // 2, 1), min(cores, 4)} - {cores}):
+        consider(best['compute_type'], cpu_threads, DEFAULT_BEAM_SIZE)
+    for beam_size in BEAM_SIZES[1:]:
+        consider(best['compute_type'], best['cpu_threads'], beam_size)
+    models.clear()
+
+    best['seconds'] = round(best['seconds'], 3)
+    best['agreement'] = round(best['agreement'], 3)
+    best['reference_seconds'] = round(reference_seconds, 3)
+    logger.info(f"{model_size}: using {best['compute_type']}, {best['cpu_threads']} threads, beam {best['beam_size']} "
+                f"({reference_seconds / best['seconds']:.1f}x the reference)")
+    return best
+
+
+def get_calibration() -> Optional[Dict[str, Any]]:
+    """The stored calibration, or None"""
+    stored = get_setting(TUNING_SETTING)
+    if not stored:
+        return None
+    try:
+        return json.loads(stored)
+    except ValueError:
+        return None
+
+
+def calibration_needed(model_sizes=None) -> bool:
+    """Check whether there is no calibration for this hardware and these model sizes"""
+    calibration = get_calibration()
+    if not calibration or calibration.get('hardware') != hardware_id():
+        return True
+    return not set(model_sizes or PASS_MODELS.values()) <= set(calibration.get('models', {}))
+
+
+def calibration_stale() -> bool:
+    """Check whether the stored calibration was measured on different hardware"""
+    calibration = get_calibration()
+    return bool(calibration) and calibration.get('hardware') != hardware_id()
+
+
+def apply_calibration() -> None:
+    """Hand the stored calibration to the transcriber, if it was made on this hardware"""
+    calibration = get_calibration()
+    if calibration and calibration.get('hardware') == hardware_id():
+        set_tuning(calibration.get('models', {}))
+    else:
+        set_tuning({})
+
+
+def run_calibration(model_sizes=None, clip: Optional[np.ndarray] = None,
+                    min_agreement: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Calibrate the model sizes, store the result as a setting and apply it
+
+    Args:
+        model_sizes: Model sizes to calibrate (default: every pass's model)
+        clip: Benchmark audio (default: the bundled speech clip)
+        min_agreement: Accuracy tolerance (default: calibration_min_agreement setting)
+
+    Returns:
+        The stored calibration
+    """
+    if WhisperModel is None:
+        raise RuntimeError("faster-whisper is not installed")
+    if min_agreement is None:
+        min_agreement = float(get_setting('calibration_min_agreement', '0.95'))
+    clip = default_clip() if clip is None else clip
+    model_sizes = list(model_sizes or dict.fromkeys(PASS_MODELS.values()))
+
+    logger.info(f"Calibrating Whisper inference for {', '.join(model_sizes)}")
+    calibration = {
+        'hardware': hardware_id(),
+        'calibrated_at': datetime.now().isoformat(),
+        'min_agreement': min_agreement,
+        'models': {size: calibrate_model(size, clip, min_agreement) for size in model_sizes}
+    }
+    set_setting(TUNING_SETTING, json.dumps(calibration))
+    apply_calibration()
+    return calibration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Whisper inference settings for this CPU")
+    parser.add_argument('models', nargs='*', help="Model sizes (default: the S and M pass models)")
+    parser.add_argument('--clip', help="Media file to take the benchmark clip from (default: bundled speech clip)")
+    parser.add_argument('--min-agreement', type=float, help="Accuracy tolerance against the float32/beam 5 reference")
+    args = parser.parse_args()
+
+    from backend.db import init_db
+    init_db()
+    clip = load_clip(args.clip) if args.clip else None
+    print(json.dumps(run_calibration(args.models or None, clip, args.min_agreement), indent=2))
+
+
+if __name__ == '__main__':
+    main()
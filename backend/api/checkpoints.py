@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.checkpoints')
+
+CHECKPOINT_DIR = Path(os.getenv('DATA_DIR', Path(__file__).parent.parent / 'data')) / 'checkpoints'
+
+
+def _window_key(window: Tuple[float, float]) -> Tuple[float, float]:
+    """Round a window so keys survive the JSON round trip"""
+    return (round(window[0], 3), round(window[1], 3))
+
+
+class ChunkCheckpoint:
+    """
+    Completed transcription chunks of one Whisper pass over one file
+
+    Each finished chunk is appended to a JSON-lines file as soon as Whisper
+    returns it, so a job killed by a restart or the watchdog picks up after
+    the last finished chunk instead of starting the pass again. A line cut
+    short by the crash is ignored.
+    """
+
+    def __init__(self, fingerprint: str, key: str):
+        """
+        Args:
+            fingerprint: File fingerprint the pass runs on
+            key: Everything that changes the pass output (pass, model, boost)
+        """
+        self.path = CHECKPOINT_DIR / fingerprint[:2] / fingerprint / f"{key}.jsonl"
+        self.done = self._load()
+        if self.done:
+            logger.info(f"Resuming {key} for {fingerprint} after {len(self.done)} finished chunks")
+
+    def _load(self) -> Dict[Tuple[float, float], List[Dict[str, Any]]]:
+        done = {}
+        if not self.path.exists():
+            return done
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    chunk = json.loads(line)
+                except ValueError:
+                    break
+                done[_window_key(chunk['window'])] = chunk['words']
+        return done
+
+    def get(self, window: Tuple[float, float]):
+        """Words of a finished chunk, or None if it still needs transcribing"""
+        return self.done.get(_window_key(window))
+
+    def add(self, window: Tuple[float, float], words: List[Dict[str, Any]]) -> None:
+        """Record a finished chunk durably"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'window': list(_window_key(window)), 'words': words}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.done[_window_key(window)] = words
+
+    def clear(self) -> None:
+        """Drop the checkpoint once the pass is stored in the transcript"""
+        self.path.unlink(missing_ok=True)
+        self.done = {}
+
+
+def clear_checkpoints(fingerprint: str) -> None:
+    """Remove every checkpoint of a file"""
+    shutil.rmtree(CHECKPOINT_DIR / fingerprint[:2] / fingerprint, ignore_errors=True)
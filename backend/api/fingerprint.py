@@ -0,0 +1,33 @@
+import hashlib
+import logging
+import os
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.fingerprint')
+
+# Bytes hashed from each sampled region of the file
+SAMPLE_SIZE = 1024 * 1024
+
+
+def file_fingerprint(file_path: str) -> str:
+    """
+    Compute a fast content fingerprint for a media file
+
+    Hashes the file size plus 1 MiB from the start, middle and end of the
+    file, so a 40 GB remux is identified after reading 3 MiB. Renames and
+    moves keep the fingerprint; a re-encode or a different release does not.
+
+    Args:
+        file_path: Path to the media file
+
+    Returns:
+        Hex digest identifying the file contents
+    """
+    size = os.path.getsize(file_path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(file_path, 'rb') as f:
+        for offset in (0, max(size // 2 - SAMPLE_SIZE // 2, 0), max(size - SAMPLE_SIZE, 0)):
+            f.seek(offset)
+            digest.update(f.read(SAMPLE_SIZE))
+    return digest.hexdigest()
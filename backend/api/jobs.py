@@ -0,0 +1,239 @@
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.jobs')
+
+# Seconds between watchdog sweeps
+WATCHDOG_INTERVAL = 1.0
+
+# ionice arguments per I/O priority setting
+IONICE_CLASSES = {
+    'idle': ['-c', '3'],
+    'best-effort': ['-c', '2', '-n', '7']
+}
+
+_local = threading.local()
+_jobs = {}
+_jobs_lock = threading.Lock()
+_watchdog = None
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that was cancelled or ran past its deadline"""
+
+    def __init__(self, reason: str, timed_out: bool = False):
+        super().__init__(reason)
+        self.reason = reason
+        self.timed_out = timed_out
+
+
+class Job:
+    """Cancellation state of one running clean and the processes it started"""
+
+    def __init__(self, job_id, timeout: Optional[float] = None, budget: Optional[Dict] = None):
+        """
+        Args:
+            job_id: Queue id of the job
+            timeout: Seconds after which the watchdog cancels the job, or None
+            budget: Thread budget from the scheduler ('ffmpeg_threads', 'nice',
+                'ionice'), or None to run unrestricted
+        """
+        self.job_id = job_id
+        self.budget = budget or {}
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout else None
+        self.reason = None
+        self.timed_out = False
+        self.processes = set()
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str = "Cancelled", timed_out: bool = False) -> None:
+        """Flag the job and kill every process group it started"""
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self.timed_out = timed_out
+            self._cancelled.set()
+            processes = list(self.processes)
+        logger.info(f"Cancelling job {self.job_id}: {reason}")
+        for process in processes:
+            _kill_group(process)
+
+    def check(self) -> None:
+        """Raise JobCancelled if the job should stop; called between units of work"""
+        if self.cancelled:
+            raise JobCancelled(self.reason, self.timed_out)
+
+    def register(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self.processes.add(process)
+            cancelled = self._cancelled.is_set()
+        if cancelled:
+            # Started just as the job was cancelled
+            _kill_group(process)
+
+    def unregister(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self.processes.discard(process)
+
+
+def _kill_group(process: subprocess.Popen) -> None:
+    """Kill a process and everything it spawned"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _watch() -> None:
+    """Cancel jobs that ran past their deadline"""
+    while True:
+        time.sleep(WATCHDOG_INTERVAL)
+        now = time.monotonic()
+        with _jobs_lock:
+            overdue = [job for job in _jobs.values() if job.deadline and now > job.deadline and not job.cancelled]
+        for job in overdue:
+            job.cancel(f"Timed out after {now - job.started:.0f}s", timed_out=True)
+
+
+def start_job(job_id, timeout: Optional[float] = None, budget: Optional[Dict] = None) -> Job:
+    """
+    Register a job for the calling thread
+
+    Subprocesses started through run_process() on this thread belong to the
+    job until finish_job() is called, and run within its thread budget. The
+    thread itself is reniced, so in-process inference yields the CPU to the
+    API and the poller (a niced thread cannot be raised again, which is fine
+    for the dedicated worker threads jobs run on).
+    """
+    global _watchdog
+    job = Job(job_id, timeout, budget)
+    nice = job.budget.get('nice', 0)
+    if nice and hasattr(os, 'setpriority'):
+        try:
+            # On Linux nice is per thread; threads started from here inherit it
+            current = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+            if current < nice:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+        except OSError as e:
+            logger.debug(f"Could not renice job thread: {e}")
+    with _jobs_lock:
+        _jobs[job_id] = job
+        if timeout and _watchdog is None:
+            _watchdog = threading.Thread(target=_watch, daemon=True, name='bleeparr-watchdog')
+            _watchdog.start()
+    _local.job = job
+    return job
+
+
+def finish_job(job: Job) -> None:
+    """Forget a job once its thread is done with it"""
+    with _jobs_lock:
+        if _jobs.get(job.job_id) is job:
+            del _jobs[job.job_id]
+    if getattr(_local, 'job', None) is job:
+        _local.job = None
+
+
+def current_job() -> Optional[Job]:
+    """The job running on this thread, if any"""
+    return getattr(_local, 'job', None)
+
+
+def cancel_job(job_id, reason: str = "Cancelled") -> bool:
+    """
+    Cancel a running job from any thread
+
+    Returns:
+        True if the job was running
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if not job:
+        return False
+    job.cancel(reason)
+    return True
+
+
+def running_jobs() -> Dict:
+    """Running jobs by id"""
+    with _jobs_lock:
+        return dict(_jobs)
+
+
+def check_cancelled() -> None:
+    """Raise JobCancelled if the current thread's job should stop"""
+    job = current_job()
+    if job:
+        job.check()
+
+
+def _budgeted(cmd: List[str], budget: Dict) -> List[str]:
+    """Apply a job's thread budget and priorities to a command line"""
+    cmd = list(cmd)
+    threads = budget.get('ffmpeg_threads')
+    if threads and os.path.basename(cmd[0]) == 'ffmpeg':
+        # Decoder and filter-graph threads, which are what audio work uses
+        cmd[1:1] = ['-filter_threads', str(threads), '-threads', str(threads)]
+    ionice = IONICE_CLASSES.get(budget.get('ionice'))
+    if ionice and shutil.which('ionice'):
+        cmd = ['ionice', *ionice, *cmd]
+    if budget.get('nice') and shutil.which('nice'):
+        cmd = ['nice', '-n', str(budget['nice']), *cmd]
+    return cmd
+
+
+def spawn(cmd: List[str], **kwargs) -> subprocess.Popen:
+    """
+    Start a subprocess in its own process group, owned by the current job
+
+    The caller must pass the process to release() once it has exited.
+    """
+    job = current_job()
+    if job and job.budget:
+        cmd = _budgeted(cmd, job.budget)
+    process = subprocess.Popen(cmd, start_new_session=True, **kwargs)
+    if job:
+        job.register(process)
+    return process
+
+
+def release(process: subprocess.Popen) -> None:
+    """Detach an exited process from the current job, raising if the job was cancelled"""
+    job = current_job()
+    if job:
+        job.unregister(process)
+        job.check()
+
+
+def run_process(cmd: List[str], text: bool = False) -> subprocess.CompletedProcess:
+    """
+    Cancellable replacement for subprocess.run(cmd, capture_output=True)
+
+    Args:
+        cmd: Command line
+        text: Decode stdout and stderr as text
+
+    Returns:
+        CompletedProcess with stdout and stderr
+    """
+    process = spawn(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text)
+    try:
+        stdout, stderr = process.communicate()
+    finally:
+        release(process)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.matcher')
+
+# Trie key marking the end of a phrase
+END = None
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so words compare cleanly
+
+    Lowercases, folds accents ('fück' -> 'fuck'), drops apostrophes
+    ("don't" -> 'dont') and turns other punctuation into spaces.
+
+    Args:
+        text: Raw word, phrase or subtitle line
+
+    Returns:
+        Space-separated normalized tokens
+    """
+    folded = unicodedata.normalize('NFKD', text.lower())
+    folded = ''.join(c for c in folded if not unicodedata.combining(c))
+    return re.sub(r"[^\w\s]", ' ', folded.replace("'", '').replace('’', ''))
+
+
+class SwearMatcher:
+    """Token trie matching single words and multi-word phrases in one scan"""
+
+    def __init__(self, phrases: List[str]):
+        """
+        Compile a matcher
+
+        Args:
+            phrases: Words or phrases to censor (normalized on the way in)
+        """
+        self.trie = {}
+        self.phrases = set()
+        self.max_length = 0
+        for phrase in phrases:
+            tokens = normalize_text(phrase).split()
+            if not tokens:
+                continue
+            node = self.trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[END] = ' '.join(tokens)
+            self.phrases.add(' '.join(tokens))
+            self.max_length = max(self.max_length, len(tokens))
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def match_tokens(self, tokens: List[str]) -> List[Tuple[int, int, str]]:
+        """
+        Find all phrase occurrences in a token sequence
+
+        At each position the longest phrase wins and scanning resumes after
+        it, so 'son of a bitch' is one hit rather than one for 'bitch' too.
+
+        Args:
+            tokens: Normalized tokens
+
+        Returns:
+            List of (first_index, last_index, phrase) tuples
+        """
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self.trie
+            found = None
+            for j in range(i, min(i + self.max_length, len(tokens))):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if END in node:
+                    found = (i, j, node[END])
+            if found:
+                matches.append(found)
+                i = found[1] + 1
+            else:
+                i += 1
+        return matches
+
+    def find(self, text: str) -> List[str]:
+        """
+        Find censored phrases in a piece of text
+
+        Args:
+            text: Transcribed word or subtitle line
+
+        Returns:
+            List of matched phrases
+        """
+        return [phrase for _, _, phrase in self.match_tokens(normalize_text(text).split())]
+
+    def match_words(self, words: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Find censored phrases in a timed word sequence
+
+        Whisper words can hold several tokens ("mother-f***er") and phrases
+        can span several words, so matching runs over the flattened tokens
+        and each hit covers the words its tokens came from.
+
+        Args:
+            words: Transcribed words with 'text', 'start', 'end', 'probability' and 'pass'
+
+        Returns:
+            Hit dictionaries spanning the matched words, with the phrase as 'text'
+        """
+        tokens = []
+        owners = []
+        for index, word in enumerate(words):
+            for token in normalize_text(word['text']).split():
+                tokens.append(token)
+                owners.append(index)
+
+        hits = []
+        for first, last, phrase in self.match_tokens(tokens):
+            first_word = words[owners[first]]
+            last_word = words[owners[last]]
+            hits.append({
+                'text': phrase,
+                'start': first_word['start'],
+                'end': last_word['end'],
+                'probability': first_word.get('probability'),
+                'pass': first_word.get('pass')
+            })
+        return hits
+
+
+def read_phrases(swears_file: str) -> List[str]:
+    """
+    Read the censored word list
+
+    Args:
+        swears_file: Path to the file containing profanity words, one per line
+
+    Returns:
+        List of non-empty lines
+    """
+    with open(swears_file, 'r', encoding='utf-8', errors='replace') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def get_matcher(swears_file: str) -> SwearMatcher:
+    """
+    Get the compiled matcher for a swears file
+
+    The matcher is built once and shared by every job. A stat() per call
+    detects edits; the file is only re-read when its mtime or size moved,
+    and only recompiled when its content hash actually changed.
+
+    Args:
+        swears_file: Path to the swears file
+
+    Returns:
+        SwearMatcher (empty if the file does not exist)
+    """
+    path = os.path.abspath(swears_file)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        logger.warning(f"Swears file not found: {swears_file}")
+        return SwearMatcher([])
+
+    with _matchers_lock:
+        cached = _matchers.get(path)
+        if cached and cached['mtime'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+            return cached['matcher']
+
+        with open(path, 'rb') as f:
+            content_hash = hashlib.sha1(f.read()).hexdigest()
+        if cached and cached['hash'] == content_hash:
+            # Touched but unchanged
+            cached['mtime'], cached['size'] = stat.st_mtime_ns, stat.st_size
+            return cached['matcher']
+
+        matcher = SwearMatcher(read_phrases(path))
+        _matchers[path] = {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'hash': content_hash,
+            'matcher': matcher
+        }
+        logger.info(f"Compiled swear matcher with {len(matcher)} phrases from {swears_file}")
+        return matcher
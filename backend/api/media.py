@@ -0,0 +1,435 @@
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from api.jobs import run_process, spawn, release
+from api.muteplan import audio_filter, remove_script
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.media')
+
+# Whisper models expect 16 kHz mono float32 audio
+SAMPLE_RATE = 16000
+
+# ffprobe reports ISO 639-2 codes, Whisper wants ISO 639-1
+LANGUAGE_CODES = {
+    'eng': 'en', 'spa': 'es', 'fre': 'fr', 'fra': 'fr', 'ger': 'de', 'deu': 'de',
+    'ita': 'it', 'por': 'pt', 'dut': 'nl', 'nld': 'nl', 'rus': 'ru', 'jpn': 'ja',
+    'chi': 'zh', 'zho': 'zh', 'kor': 'ko', 'swe': 'sv', 'nor': 'no', 'dan': 'da',
+    'fin': 'fi', 'pol': 'pl'
+}
+
+# Encoders that reproduce each source codec
+AUDIO_ENCODERS = {
+    'aac': 'aac', 'ac3': 'ac3', 'eac3': 'eac3', 'mp3': 'libmp3lame', 'mp2': 'mp2',
+    'opus': 'libopus', 'vorbis': 'libvorbis', 'flac': 'flac', 'alac': 'alac', 'dts': 'dca',
+    'pcm_s16le': 'pcm_s16le', 'pcm_s24le': 'pcm_s24le', 'pcm_s32le': 'pcm_s32le'
+}
+LOSSLESS_CODECS = {'truehd', 'mlp'}
+BITRATELESS_ENCODERS = {'flac', 'alac', 'pcm_s16le', 'pcm_s24le', 'pcm_s32le'}
+ENCODER_MAX_BITRATES = {'ac3': 640000, 'eac3': 6144000, 'dca': 1509000}
+
+# Title given to the cleaned track when it is added next to the original
+CLEAN_TRACK_TITLE = 'Bleeparr Clean'
+
+
+def probe(file_path: str) -> Dict[str, Any]:
+    """
+    Read container and stream metadata with ffprobe
+
+    Args:
+        file_path: Path to the media file
+
+    Returns:
+        Parsed ffprobe output with 'format' and 'streams' keys
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_format", "-show_streams",
+        "-of", "json",
+        file_path
+    ]
+    process = run_process(cmd, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {file_path}: {process.stderr.strip()}")
+    return json.loads(process.stdout)
+
+
+def get_duration(info: Dict[str, Any]) -> float:
+    """
+    Get the media duration in seconds from ffprobe output
+
+    Args:
+        info: Output of probe()
+
+    Returns:
+        Duration in seconds, or 0.0 if unknown
+    """
+    try:
+        return float(info.get('format', {}).get('duration', 0.0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def get_audio_streams(info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Get the audio streams from ffprobe output
+
+    Args:
+        info: Output of probe()
+
+    Returns:
+        List of audio stream objects, in container order
+    """
+    return [s for s in info.get('streams', []) if s.get('codec_type') == 'audio']
+
+
+def get_primary_audio_stream(info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Pick the audio stream that transcription should run on
+
+    The default-flagged track wins, otherwise the first audio track is used.
+    Cleaned tracks added by a previous run are never picked.
+
+    Args:
+        info: Output of probe()
+
+    Returns:
+        Audio stream object or None if the file has no audio
+    """
+    streams = [s for s in get_audio_streams(info) if not is_clean_track(s)]
+    if not streams:
+        return None
+    for stream in streams:
+        if stream.get('disposition', {}).get('default'):
+            return stream
+    return streams[0]
+
+
+def is_clean_track(stream: Dict[str, Any]) -> bool:
+    """Check whether an audio stream is a cleaned track added by Bleeparr"""
+    return (stream.get('tags', {}).get('title') or '').endswith(CLEAN_TRACK_TITLE)
+
+
+def get_whisper_language(stream: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Map a stream's language tag to a Whisper language code
+
+    Args:
+        stream: Audio stream object from ffprobe
+
+    Returns:
+        Two-letter language code, or None to let Whisper detect it
+    """
+    if not stream:
+        return None
+    language = stream.get('tags', {}).get('language', '').lower()
+    if len(language) == 2:
+        return language
+    return LANGUAGE_CODES.get(language)
+
+
+def extract_pcm(file_path: str, stream_index: Optional[int] = None, boost_db: float = 0) -> np.ndarray:
+    """
+    Decode one audio stream to 16 kHz mono float32 PCM
+
+    Args:
+        file_path: Path to the media file
+        stream_index: Absolute stream index to decode (first audio stream if None)
+        boost_db: Gain applied before decoding to help quiet dialogue
+
+    Returns:
+        1-D float32 array of samples in [-1, 1]
+    """
+    stream_map = f"0:{stream_index}" if stream_index is not None else "0:a:0"
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", file_path,
+        "-map", stream_map,
+        "-ac", "1",
+        "-ar", str(SAMPLE_RATE)
+    ]
+    if boost_db:
+        cmd.extend(["-af", f"volume={boost_db}dB"])
+    cmd.extend(["-f", "f32le", "-"])
+
+    process = run_process(cmd)
+    if process.returncode != 0:
+        raise RuntimeError(f"Audio extraction failed for {file_path}: {process.stderr.decode(errors='replace').strip()}")
+
+    pcm = np.frombuffer(process.stdout, dtype=np.float32)
+    logger.info(f"Extracted {len(pcm) / SAMPLE_RATE:.1f}s of audio from {file_path}")
+    return np.clip(pcm, -1.0, 1.0)
+
+
+def get_stream_bitrate(stream: Dict[str, Any]) -> Optional[int]:
+    """
+    Get an audio stream's bitrate in bits per second
+
+    Matroska usually only carries it in the BPS statistics tag.
+
+    Args:
+        stream: Audio stream object from ffprobe
+
+    Returns:
+        Bitrate, or None if the file does not say
+    """
+    tags = stream.get('tags', {})
+    for value in (stream.get('bit_rate'), tags.get('BPS'), tags.get('BPS-eng')):
+        try:
+            if value:
+                return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def audio_encoder_args(stream: Dict[str, Any], output_index: int) -> List[str]:
+    """
+    Build encoder options that re-encode a track like its source
+
+    The cleaned track keeps the source codec, bitrate, channel layout and
+    sample rate, so it drops in where the original was. Lossless formats
+    ffmpeg cannot encode become FLAC; lossy ones become E-AC-3.
+
+    Args:
+        stream: Source audio stream object from ffprobe
+        output_index: Index of the track among the output's audio streams
+
+    Returns:
+        ffmpeg arguments for that output audio stream
+    """
+    codec = stream.get('codec_name', '')
+    if codec == 'dts' and 'MA' in stream.get('profile', ''):
+        # DTS-HD MA is lossless; ffmpeg could only write the lossy core
+        encoder = 'flac'
+    elif codec in AUDIO_ENCODERS:
+        encoder = AUDIO_ENCODERS[codec]
+    else:
+        encoder = 'flac' if codec in LOSSLESS_CODECS else 'eac3'
+
+    args = [f"-c:a:{output_index}", encoder]
+    bitrate = get_stream_bitrate(stream)
+    if bitrate and encoder not in BITRATELESS_ENCODERS:
+        if encoder in ENCODER_MAX_BITRATES:
+            bitrate = min(bitrate, ENCODER_MAX_BITRATES[encoder])
+        args.extend([f"-b:a:{output_index}", str(bitrate)])
+    if stream.get('sample_rate'):
+        args.extend([f"-ar:a:{output_index}", str(stream['sample_rate'])])
+    if stream.get('channels'):
+        args.extend([f"-ac:a:{output_index}", str(stream['channels'])])
+    if encoder == 'dca':
+        args.extend(["-strict", "-2"])
+    return args
+
+
+def run_ffmpeg(cmd: List[str]) -> Dict[str, Any]:
+    """
+    Run ffmpeg and measure where its time went
+
+    The child is reaped with wait4() so its own CPU time is known even when
+    several jobs run at once. It belongs to the calling thread's job, so a
+    cancel or timeout kills it.
+
+    Args:
+        cmd: Full ffmpeg command line
+
+    Returns:
+        Dictionary with 'wall_seconds' and 'cpu_seconds'
+    """
+    started = time.monotonic()
+    with tempfile.TemporaryFile() as stderr:
+        process = spawn(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=stderr)
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        finally:
+            release(process)
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed: {stderr.read().decode(errors='replace').strip()}")
+    return {
+        'wall_seconds': time.monotonic() - started,
+        'cpu_seconds': usage.ru_utime + usage.ru_stime
+    }
+
+
+def mute_audio(file_path: str, output_path: str, plan: np.ndarray, info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Write a copy of the media file with every audio track muted
+
+    The plan comes from the dialogue track but all tracks share its
+    timeline, so the same mutes apply to the 5.1 mix, the stereo downmix
+    and any dubs or commentary. Everything is done in one pass over the
+    source: video, subtitles, attachments and chapters are stream-copied
+    and each audio track is decoded, muted and re-encoded like its source.
+    With nothing to mute, the whole file is a straight remux.
+
+    Args:
+        file_path: Path to the source media file
+        output_path: Path of the cleaned file to write
+        plan: Mute plan from muteplan.build_plan
+        info: Output of probe() for the source
+
+    Returns:
+        Timing dictionary splitting the run into encode and remux time
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y", "-ignore_unknown",
+        "-i", file_path,
+        "-map", "0",
+        "-map_metadata", "0",
+        "-map_chapters", "0",
+        "-c", "copy"
+    ]
+
+    script_path = None
+    audio_streams = get_audio_streams(info)
+    if len(plan):
+        audio_filter_str, script_path = audio_filter(plan)
+        for position, stream in enumerate(audio_streams):
+            if is_clean_track(stream):
+                continue
+            cmd.extend(audio_encoder_args(stream, position))
+            cmd.extend([f"-filter:a:{position}", audio_filter_str])
+    cmd.append(output_path)
+
+    logger.info(f"Muting {len(plan)} intervals on {len(audio_streams)} audio tracks into {output_path}")
+    try:
+        usage = run_ffmpeg(cmd)
+    finally:
+        remove_script(script_path)
+    return _mux_timings(usage, output_path, bool(len(plan)))
+
+
+def append_muted_track(file_path: str, output_path: str, plan: np.ndarray, info: Dict[str, Any],
+                       stream: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Write a copy of the media file with cleaned tracks added
+
+    Every source stream is stream-copied, and each audio track is mapped a
+    second time, muted and re-encoded, after the originals. The cleaned
+    copy of the dialogue track becomes the default, so players pick it up
+    while the originals stay one menu away. Cleaned tracks left by an
+    earlier run are dropped rather than stacked. The source is read once
+    however many tracks there are.
+
+    Args:
+        file_path: Path to the source media file
+        output_path: Path of the file to write
+        plan: Mute plan from muteplan.build_plan (must not be empty)
+        info: Output of probe() for the source
+        stream: Dialogue audio stream, whose cleaned copy becomes the default
+
+    Returns:
+        Timing dictionary splitting the run into encode and remux time
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y", "-ignore_unknown",
+        "-i", file_path,
+        "-map", "0"
+    ]
+    originals = []
+    for position, audio_stream in enumerate(get_audio_streams(info)):
+        if is_clean_track(audio_stream):
+            cmd.extend(["-map", f"-0:a:{position}"])
+        else:
+            originals.append(audio_stream)
+    for original in originals:
+        cmd.extend(["-map", f"0:{original['index']}"])
+    cmd.extend([
+        "-map_metadata", "0",
+        "-map_chapters", "0",
+        "-c", "copy",
+        "-disposition:a", "0"
+    ])
+
+    audio_filter_str, script_path = audio_filter(plan)
+    for offset, original in enumerate(originals):
+        output_index = len(originals) + offset
+        title = original.get('tags', {}).get('title')
+        cmd.extend(audio_encoder_args(original, output_index))
+        cmd.extend([
+            f"-filter:a:{output_index}", audio_filter_str,
+            f"-metadata:s:a:{output_index}",
+            f"title={title} - {CLEAN_TRACK_TITLE}" if title else f"title={CLEAN_TRACK_TITLE}"
+        ])
+        if original['index'] == stream['index']:
+            cmd.extend([f"-disposition:a:{output_index}", "default"])
+    cmd.append(output_path)
+
+    logger.info(f"Adding {len(originals)} cleaned tracks with {len(plan)} mutes into {output_path}")
+    try:
+        usage = run_ffmpeg(cmd)
+    finally:
+        remove_script(script_path)
+    return _mux_timings(usage, output_path, True)
+
+
+def remove_clean_tracks(file_path: str, output_path: str, info: Dict[str, Any],
+                        stream: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Write a copy of the media file without the cleaned tracks of an earlier run
+
+    Used when a file no longer needs muting, for example after a word was
+    taken off the swear list. Everything else is stream-copied, and the
+    dialogue track gets back the default flag the cleaned track took over.
+
+    Args:
+        file_path: Path to the source media file
+        output_path: Path of the file to write
+        info: Output of probe() for the source
+        stream: Dialogue audio stream, which becomes the default again
+
+    Returns:
+        Timing dictionary splitting the run into encode and remux time
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y", "-ignore_unknown",
+        "-i", file_path,
+        "-map", "0"
+    ]
+    originals = []
+    for position, audio_stream in enumerate(get_audio_streams(info)):
+        if is_clean_track(audio_stream):
+            cmd.extend(["-map", f"-0:a:{position}"])
+        else:
+            originals.append(audio_stream)
+    cmd.extend([
+        "-map_metadata", "0",
+        "-map_chapters", "0",
+        "-c", "copy",
+        "-disposition:a", "0"
+    ])
+    for output_index, original in enumerate(originals):
+        if original['index'] == stream['index']:
+            cmd.extend([f"-disposition:a:{output_index}", "default"])
+    cmd.append(output_path)
+
+    logger.info(f"Removing {len(get_audio_streams(info)) - len(originals)} cleaned tracks into {output_path}")
+    return _mux_timings(run_ffmpeg(cmd), output_path, False)
+
+
+def _mux_timings(usage: Dict[str, Any], output_path: str, encoded: bool) -> Dict[str, Any]:
+    """Split an ffmpeg run into encode and remux time"""
+    # Copying streams costs next to no CPU, so ffmpeg's CPU time is the
+    # encode and the rest of the wall time is the remux waiting on disk
+    size = os.path.getsize(output_path)
+    encode_seconds = min(usage['cpu_seconds'], usage['wall_seconds']) if encoded else 0.0
+    timings = {
+        'encode_seconds': round(encode_seconds, 2),
+        'remux_seconds': round(usage['wall_seconds'] - encode_seconds, 2),
+        'total_seconds': round(usage['wall_seconds'], 2),
+        'output_bytes': size,
+        'throughput_mb_s': round(size / 1e6 / usage['wall_seconds'], 1) if usage['wall_seconds'] else None
+    }
+    logger.info(f"Wrote {output_path} in {timings['total_seconds']}s "
+                f"(encode {timings['encode_seconds']}s, remux {timings['remux_seconds']}s)")
+    return timings
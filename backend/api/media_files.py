@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from backend.db import get_media_file, get_media_files, save_media_file
+from api.fingerprint import file_fingerprint
+from api.media import probe, get_duration, get_audio_streams
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.media_files')
+
+
+def _unpack(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a media_files row into a media record"""
+    record = dict(record)
+    record['info'] = json.loads(record.pop('probe') or '{}')
+    record['codecs'] = record['codecs'].split(',') if record.get('codecs') else []
+    return record
+
+
+def get_media_record(file_path: str) -> Dict[str, Any]:
+    """
+    Get ffprobe metadata and the fingerprint for a media file
+
+    Results are cached in the media_files table. A stat() decides whether
+    the cache is current; the file is only probed and fingerprinted again
+    when its size or mtime changed, so retries and later stages cost nothing.
+
+    Args:
+        file_path: Path to the media file
+
+    Returns:
+        Dictionary with 'file_path', 'size', 'mtime_ns', 'fingerprint',
+        'duration', 'audio_streams', 'codecs' and the full probe as 'info'
+    """
+    stat = os.stat(file_path)
+    cached = get_media_file(file_path)
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return _unpack(cached)
+
+    info = probe(file_path)
+    audio_streams = get_audio_streams(info)
+    record = {
+        'file_path': file_path,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'fingerprint': file_fingerprint(file_path),
+        'duration': get_duration(info),
+        'audio_streams': len(audio_streams),
+        'codecs': ','.join(s.get('codec_name', '') for s in info.get('streams', [])),
+        'probe': json.dumps(info)
+    }
+    save_media_file(record)
+    logger.info(f"{'Refreshed' if cached else 'Cached'} media metadata for {file_path}")
+    return _unpack(record)
+
+
+def get_cached_durations(file_paths: Iterable[str]) -> Dict[str, Optional[float]]:
+    """
+    Look up known durations without touching the files
+
+    Args:
+        file_paths: Media file paths
+
+    Returns:
+        Dictionary of path to duration in seconds (None if never probed)
+    """
+    file_paths = list(file_paths)
+    cached = get_media_files(file_paths)
+    return {path: cached[path]['duration'] if path in cached else None for path in file_paths}
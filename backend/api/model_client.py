@@ -0,0 +1,94 @@
+import logging
+import os
+import threading
+from multiprocessing.connection import AuthenticationError, Client
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from api.jobs import JobCancelled, check_cancelled
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.model_client')
+
+# Unix socket of the shared model server; workers use it whenever it exists
+MODEL_SOCKET = os.getenv('MODEL_SOCKET', str(Path(os.getenv('DATA_DIR', Path(__file__).parent.parent / 'data')) / 'model.sock'))
+
+# Seconds between cancellation checks while waiting for a reply
+REPLY_POLL = 1.0
+
+_local = threading.local()
+
+
+class ModelServerUnavailable(Exception):
+    """The model server could not be reached"""
+
+
+def authkey_path(socket_path: str) -> str:
+    """File holding the key clients authenticate to the server with"""
+    return f"{socket_path}.key"
+
+
+def model_server_available() -> bool:
+    """Check whether a model server is listening (or at least left its socket)"""
+    return os.path.exists(MODEL_SOCKET)
+
+
+def _connection():
+    """This thread's connection to the server, opened on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        try:
+            authkey = Path(authkey_path(MODEL_SOCKET)).read_bytes()
+            conn = Client(MODEL_SOCKET, family='AF_UNIX', authkey=authkey)
+        except (OSError, EOFError, AuthenticationError) as e:
+            raise ModelServerUnavailable(str(e)) from e
+        _local.conn = conn
+    return conn
+
+
+def _drop_connection() -> None:
+    conn = getattr(_local, 'conn', None)
+    _local.conn = None
+    if conn is not None:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+def remote_transcribe(audio: np.ndarray, model_size: str, language: Optional[str] = None,
+                      beam_size: int = 5) -> List[Dict[str, Any]]:
+    """
+    Transcribe one window of audio on the model server
+
+    Args:
+        audio: Mono float32 samples at the Whisper sample rate
+        model_size: Whisper model size
+        language: Two-letter language code, or None to auto-detect
+        beam_size: Beam width for decoding
+
+    Returns:
+        Word dicts ('text', 'start', 'end', 'probability') relative to the audio
+
+    Raises:
+        ModelServerUnavailable: If the server cannot be reached
+    """
+    conn = _connection()
+    try:
+        conn.send({'model': model_size, 'language': language, 'beam_size': beam_size, 'audio': audio})
+        while not conn.poll(REPLY_POLL):
+            check_cancelled()
+        reply = conn.recv()
+    except JobCancelled:
+        # The reply to the abandoned request must not reach the next one
+        _drop_connection()
+        raise
+    except (OSError, EOFError) as e:
+        _drop_connection()
+        raise ModelServerUnavailable(str(e)) from e
+    if 'error' in reply:
+        raise RuntimeError(f"Model server: {reply['error']}")
+    return reply['words']
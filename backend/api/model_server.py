@@ -0,0 +1,216 @@
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Listener
+from typing import Any, Dict, List
+
+import numpy as np
+
+try:
+    from faster_whisper import BatchedInferencePipeline
+except ImportError:
+    BatchedInferencePipeline = None
+
+from api.calibration import apply_calibration
+from api.media import SAMPLE_RATE
+from api.model_client import MODEL_SOCKET, authkey_path
+from api.transcriber import get_model, segment_words, transcribe_audio
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.model_server')
+
+# Most windows decoded in one inference call
+BATCH_SIZE = 8
+
+# How long the first request of a batch waits for others to join it
+BATCH_WAIT_SECONDS = 0.05
+
+# Longest window that can share a batch; Whisper's fixed input length
+BATCH_WINDOW_SECONDS = 30
+
+
+class _Request:
+    """A window waiting for inference, and the slot its reply goes into"""
+
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self.reply = None
+        self.done = threading.Event()
+
+    def finish(self, reply: Dict[str, Any]) -> None:
+        self.reply = reply
+        self.done.set()
+
+
+class ModelServer:
+    """
+    Serve Whisper inference to every worker from one copy of each model
+
+    Each model has a queue and a batcher thread. Windows that arrive within
+    batch_wait of each other, from any file, are decoded together in one
+    batched call, which keeps a CPU model busier than one window at a time.
+    """
+
+    def __init__(self, socket_path: str, batch_size: int = BATCH_SIZE,
+                 batch_wait: float = BATCH_WAIT_SECONDS):
+        self.socket_path = socket_path
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queues = {}
+        self._pipelines = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, model_size: str) -> queue.Queue:
+        """Queue of a model, starting its batcher on first use"""
+        with self._lock:
+            if model_size not in self._queues:
+                self._queues[model_size] = queue.Queue()
+                threading.Thread(target=self._batcher, args=(model_size,), daemon=True,
+                                 name=f"batcher-{model_size}").start()
+            return self._queues[model_size]
+
+    def _batcher(self, model_size: str) -> None:
+        requests = self._queues[model_size]
+        while True:
+            batch = [requests.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Only windows decoded the same way can share a call
+            groups = {}
+            for request in batch:
+                key = (request.message.get('language'), request.message.get('beam_size', 5))
+                groups.setdefault(key, []).append(request)
+            for (language, beam_size), group in groups.items():
+                self._run(model_size, group, language, beam_size)
+
+    def _run(self, model_size: str, group: List[_Request], language, beam_size: int) -> None:
+        """
+        Run one group of windows and hand every request its words
+
+        The batched pipeline pads or cuts every clip to one Whisper window,
+        so longer windows are decoded on their own, as a worker would.
+        """
+        limit = BATCH_WINDOW_SECONDS * SAMPLE_RATE
+        batchable = [request for request in group if len(request.message['audio']) <= limit]
+        sequential = [request for request in group if len(request.message['audio']) > limit]
+        if len(batchable) > 1 and BatchedInferencePipeline is not None:
+            try:
+                for request, words in zip(batchable, self._run_batched(model_size, batchable, language, beam_size)):
+                    request.finish({'words': words})
+                batchable = []
+            except Exception as e:
+                logger.warning(f"Batched inference failed, decoding {len(batchable)} windows one by one: {e}")
+
+        for request in batchable + sequential:
+            try:
+                words = transcribe_audio(get_model(model_size), request.message['audio'], language, beam_size)
+                request.finish({'words': words})
+            except Exception as e:
+                logger.error(f"Inference failed: {e}")
+                request.finish({'error': str(e)})
+
+    def _run_batched(self, model_size: str, group: List[_Request], language, beam_size: int) -> List[List[Dict[str, Any]]]:
+        """
+        Decode windows from several files in one call
+
+        The windows are laid end to end and passed as clip timestamps, so each
+        is one element of the batch; words are mapped back by their start time.
+        The pipeline takes clip timestamps in seconds, not samples.
+        """
+        model = get_model(model_size)
+        with self._lock:
+            # Rebuilt when a new calibration swapped the model
+            if self._pipelines.get(model_size, (None,))[0] is not model:
+                self._pipelines[model_size] = (model, BatchedInferencePipeline(model=model))
+            pipeline = self._pipelines[model_size][1]
+
+        audios = [request.message['audio'] for request in group]
+        offsets = np.cumsum([0] + [len(audio) for audio in audios])
+        starts = offsets / SAMPLE_RATE
+        clips = [{'start': float(starts[i]), 'end': float(starts[i + 1])} for i in range(len(audios))]
+        segments, _ = pipeline.transcribe(
+            np.concatenate(audios),
+            language=language,
+            beam_size=beam_size,
+            word_timestamps=True,
+            clip_timestamps=clips,
+            batch_size=len(group),
+            vad_filter=False
+        )
+
+        results = [[] for _ in group]
+        for word in segment_words(segments):
+            index = min(max(int(np.searchsorted(starts, word['start'], side='right')) - 1, 0), len(group) - 1)
+            results[index].append(dict(
+                word,
+                start=max(float(word['start'] - starts[index]), 0.0),
+                end=max(float(word['end'] - starts[index]), 0.0)
+            ))
+        return results
+
+    def _serve(self, conn) -> None:
+        """Answer one worker's requests until it disconnects"""
+        try:
+            while True:
+                message = conn.recv()
+                request = _Request(message)
+                self._queue(message['model']).put(request)
+                request.done.wait()
+                conn.send(request.reply)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def serve_forever(self) -> None:
+        if os.path.exists(self.socket_path):
+            # Left behind by a server that did not shut down cleanly
+            os.remove(self.socket_path)
+        authkey = os.urandom(32)
+        key_path = authkey_path(self.socket_path)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(authkey)
+
+        listener = Listener(self.socket_path, family='AF_UNIX', authkey=authkey)
+        logger.info(f"Model server listening on {self.socket_path} (batches of up to {self.batch_size})")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # A client with the wrong key, keep serving the others
+                    logger.warning(f"Rejected connection: {e}")
+                    continue
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            for path in (self.socket_path, key_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared Whisper model server for Bleeparr workers")
+    parser.add_argument('--socket', default=MODEL_SOCKET)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--batch-wait-ms', type=float, default=BATCH_WAIT_SECONDS * 1000)
+    args = parser.parse_args()
+    apply_calibration()
+    ModelServer(args.socket, args.batch_size, args.batch_wait_ms / 1000).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
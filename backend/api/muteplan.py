@@ -0,0 +1,148 @@
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.muteplan')
+
+# Plans longer than this are sent to ffmpeg as a command script instead of
+# an enable='between(...)+...' chain, which ffmpeg re-evaluates term by term
+# on every audio frame
+MAX_FILTER_TERMS = 32
+
+# Name of the volume filter instance the command script drives
+MUTE_FILTER_NAME = 'volume@bleeparr'
+
+
+def merge_regions(regions: Iterable[Tuple[float, float]], max_gap: float = 0.0) -> np.ndarray:
+    """
+    Merge overlapping or near-adjacent (start, end) spans
+
+    Args:
+        regions: Array-like of (start, end) pairs
+        max_gap: Spans separated by at most this many seconds are joined
+
+    Returns:
+        (n, 2) float64 array of merged, sorted spans
+    """
+    regions = np.asarray(regions, dtype=np.float64).reshape(-1, 2)
+    if not len(regions):
+        return regions
+    regions = regions[np.argsort(regions[:, 0], kind='stable')]
+    running_end = np.maximum.accumulate(regions[:, 1])
+    starts_new = np.concatenate(([True], regions[1:, 0] > running_end[:-1] + max_gap))
+    first = np.flatnonzero(starts_new)
+    last = np.concatenate((first[1:], [len(regions)])) - 1
+    return np.stack([regions[first, 0], running_end[last]], axis=1)
+
+
+def build_plan(hits: List[Dict[str, Any]], pre_buffer: float, post_buffer: float,
+               merge_gap: float = 200, duration: Optional[float] = None) -> np.ndarray:
+    """
+    Turn word hits into a minimal set of mute intervals
+
+    Pads every hit by the buffers, clips to the media, then sorts and
+    merges in one vectorized pass. Hits closer together than merge_gap are
+    joined, since a 100 ms blip of dialogue between two mutes is noise
+    rather than something a viewer can follow.
+
+    Args:
+        hits: Words to mute, each with 'start' and 'end' in seconds
+        pre_buffer: Milliseconds to mute before each word
+        post_buffer: Milliseconds to mute after each word
+        merge_gap: Join intervals separated by at most this many milliseconds
+        duration: Media duration in seconds, to clip the last interval
+
+    Returns:
+        (n, 2) float64 array of (start, end) seconds
+    """
+    if not hits:
+        return np.empty((0, 2), dtype=np.float64)
+    spans = np.fromiter(
+        (t for hit in hits for t in (hit['start'], hit['end'])),
+        dtype=np.float64,
+        count=2 * len(hits)
+    ).reshape(-1, 2)
+    spans[:, 0] -= pre_buffer / 1000.0
+    spans[:, 1] += post_buffer / 1000.0
+    np.clip(spans, 0.0, duration if duration else None, out=spans)
+    return merge_regions(spans, max_gap=merge_gap / 1000.0)
+
+
+def plan_stats(plan: np.ndarray) -> Dict[str, Any]:
+    """Summarize a plan for job results"""
+    return {
+        'intervals': int(len(plan)),
+        'muted_seconds': round(float((plan[:, 1] - plan[:, 0]).sum()), 2) if len(plan) else 0.0
+    }
+
+
+def between_filter(plan: np.ndarray) -> str:
+    """
+    Build an ffmpeg volume filter using a between() chain
+
+    Args:
+        plan: (n, 2) array of (start, end) seconds
+
+    Returns:
+        Filter string for -filter:a ('anull' if there is nothing to mute)
+    """
+    if not len(plan):
+        return "anull"
+    terms = '+'.join(f"between(t,{start:.3f},{end:.3f})" for start, end in plan)
+    return f"volume=enable='{terms}':volume=0"
+
+
+def sendcmd_script(plan: np.ndarray) -> str:
+    """
+    Build an asendcmd script that toggles the mute volume filter
+
+    Each interval costs two timed commands, so ffmpeg does constant work per
+    frame no matter how long the plan is.
+
+    Args:
+        plan: (n, 2) array of (start, end) seconds
+
+    Returns:
+        Script text for asendcmd
+    """
+    lines = []
+    for start, end in plan:
+        lines.append(f"{start:.3f} {MUTE_FILTER_NAME} volume 0;")
+        lines.append(f"{end:.3f} {MUTE_FILTER_NAME} volume 1;")
+    return '\n'.join(lines) + '\n'
+
+
+def audio_filter(plan: np.ndarray) -> Tuple[str, Optional[str]]:
+    """
+    Choose the cheapest ffmpeg filter for a plan
+
+    Short plans use an inline between() chain. Longer plans are written to
+    a temporary command script driven by asendcmd.
+
+    Args:
+        plan: (n, 2) array of (start, end) seconds
+
+    Returns:
+        Tuple of (filter string, script path or None). The caller removes the
+        script with remove_script() once ffmpeg has finished.
+    """
+    if len(plan) <= MAX_FILTER_TERMS:
+        return between_filter(plan), None
+
+    # mkstemp names never need filtergraph escaping
+    fd, script_path = tempfile.mkstemp(prefix='bleeparr_', suffix='.cmd')
+    with os.fdopen(fd, 'w') as f:
+        f.write(sendcmd_script(plan))
+    logger.info(f"Using command script for {len(plan)} mute intervals")
+    return f"asendcmd=f={script_path},{MUTE_FILTER_NAME}=volume=1", script_path
+
+
+def remove_script(script_path: Optional[str]) -> None:
+    """Delete a command script written by audio_filter"""
+    if script_path and os.path.exists(script_path):
+        os.remove(script_path)
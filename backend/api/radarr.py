@@ -27,6 +27,9 @@ class RadarrAPI:
         }
         self._last_queue_check = 0
         self._last_history_check = 0
+        # Why the last list request failed, None if it succeeded; lets callers
+        # tell an empty answer from an unreachable server
+        self.last_error = None
         self._monitored_movie_ids = set()
     
     def test_connection(self) -> Tuple[bool, str]:
@@ -52,8 +55,10 @@ class RadarrAPI:
         Get the list of all movies from Radarr
         
         Returns:
-            List of movie objects
+            List of movie objects; empty if the request failed, with the
+            reason in last_error
         """
+        self.last_error = None
         try:
             response = requests.get(f"{self.base_url}/api/v3/movie", headers=self.headers)
             if response.status_code == 200:
@@ -61,10 +66,12 @@ class RadarrAPI:
                 logger.info(f"Retrieved {len(movie_list)} movies from Radarr")
                 return movie_list
             else:
-                logger.error(f"Failed to get movie list: HTTP {response.status_code}")
+                self.last_error = f"Failed to get movie list: HTTP {response.status_code}"
+                logger.error(self.last_error)
                 return []
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error getting movie list: {str(e)}")
+            self.last_error = f"Error getting movie list: {str(e)}"
+            logger.error(self.last_error)
             return []
     
     def get_movie_by_id(self, movie_id: int) -> Optional[Dict[str, Any]]:
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query, BackgroundTasks, Body
 import os
+import json
 import requests
 import logging
 logger = logging.getLogger('bleeparr.routes')
-from backend.db import get_db
-from backend.tasks import add_to_queue, get_processing_status
+from backend.db import get_db, get_item_profile, set_item_profile, get_setting, set_setting, PROFILE_FIELDS
+from backend.schedule import parse_profiles, active_profile
+from backend.tasks import add_to_queue, bulk_enqueue, get_processing_status, cancel_queue_item, claim_backfill, run_backfill, BACKFILL_STATUS
 from typing import List, Dict, Any, Optional
 
 router = APIRouter()
@@ -54,6 +56,8 @@ def get_status():
         "processing": {
             "queue_size": len(processing_status["queue"]),
             "history_size": len(processing_status["history"]),
+            "profiles": processing_status["stats"]["profiles"],
+            "stages": processing_status["stats"]["stages"],
             "sonarr_monitoring": processing_status["sonarr_available"],
             "radarr_monitoring": processing_status["radarr_available"]
         }
@@ -204,6 +208,61 @@ def update_filtered_item(item_type: str, item_id: int, filtered: bool = Query(..
     conn.commit()
     return {"id": item_id, "type": item_type, "filtered": filtered}
 
+# Processing profiles for shows or movies
+@router.get("/api/profile/{item_type}/{item_id}")
+def get_profile(item_type: str, item_id: int):
+    if item_type not in ("show", "movie"):
+        raise HTTPException(status_code=400, detail="Invalid item type")
+    return {"id": item_id, "type": item_type, "profile": get_item_profile(item_id, item_type)}
+
+@router.put("/api/profile/{item_type}/{item_id}")
+def update_profile(item_type: str, item_id: int, profile: Dict[str, Any] = Body(...)):
+    if item_type not in ("show", "movie"):
+        raise HTTPException(status_code=400, detail="Invalid item type")
+    unknown = set(profile) - set(PROFILE_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown profile fields: {', '.join(sorted(unknown))}")
+    if profile.get("output_mode") not in (None, "file", "track", "sidecar"):
+        raise HTTPException(status_code=400, detail="Invalid output mode")
+    set_item_profile(item_id, item_type, profile)
+    return {"id": item_id, "type": item_type, "profile": get_item_profile(item_id, item_type)}
+
+# Queue the whole library at backfill priority
+@router.post("/api/backfill")
+def start_backfill(background_tasks: BackgroundTasks, roots: Optional[List[str]] = Body(None)):
+    # Claimed before the task is scheduled, so a second request cannot start another walk
+    if not claim_backfill():
+        raise HTTPException(status_code=409, detail="A backfill is already running")
+    background_tasks.add_task(run_backfill, roots, claimed=True)
+    return {"status": "started", "last": BACKFILL_STATUS["last"]}
+
+@router.get("/api/backfill")
+def get_backfill():
+    return {"status": "running" if BACKFILL_STATUS["running"] else "idle", "last": BACKFILL_STATUS["last"]}
+
+# Time-of-day schedule profiles for the worker pool
+@router.get("/api/schedule")
+def get_schedule():
+    text = get_setting("schedule_profiles", "[]")
+    try:
+        profiles = parse_profiles(text)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"Stored schedule profiles are invalid: {e}")
+    active = active_profile(text)
+    return {"profiles": profiles, "active": active.get("name") if active else None}
+
+@router.put("/api/schedule")
+def update_schedule(profiles: List[Dict[str, Any]] = Body(...)):
+    text = json.dumps(profiles)
+    try:
+        parse_profiles(text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Picked up by the worker pool within a minute, no restart needed
+    set_setting("schedule_profiles", text)
+    active = active_profile(text)
+    return {"profiles": profiles, "active": active.get("name") if active else None}
+
 # Get queue from Sonarr
 @router.get("/api/sonarr/queue")
 def get_sonarr_queue():
@@ -380,12 +439,46 @@ def process_movie(movie_id: int, background_tasks: BackgroundTasks, dry_run: boo
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Process many episodes, movies and series - Manual trigger
+@router.post("/api/process/bulk")
+def process_bulk(
+    episode_ids: List[int] = Body([]),
+    movie_ids: List[int] = Body([]),
+    series_ids: List[int] = Body([])
+):
+    """
+    Queue many items in one request
+    
+    Body: {"episode_ids": [...], "movie_ids": [...], "series_ids": [...]};
+    a series queues each of its episodes that has a file.
+    """
+    if not (episode_ids or movie_ids or series_ids):
+        raise HTTPException(status_code=400, detail="No episode, movie or series IDs given")
+    try:
+        items = bulk_enqueue(episode_ids, movie_ids, series_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "success": True,
+        "queued": sum(1 for item in items if item['status'] == 'queued'),
+        "items": items
+    }
+
 # Get processing queue and history
 @router.get("/api/processing")
 def get_processing():
     """Get current processing queue and history"""
     return get_processing_status()
 
+# Cancel a queued or running job
+@router.delete("/api/processing/{queue_id}")
+def cancel_processing(queue_id: int):
+    """Cancel a job; a running one is killed and its partial output removed"""
+    outcome = cancel_queue_item(queue_id)
+    if outcome is None:
+        raise HTTPException(status_code=404, detail=f"Queue item {queue_id} not found")
+    return {"status": "success", "outcome": outcome}
+
 # Process all episodes for a series
 @router.post("/api/process/series/{series_id}")
 def process_series(series_id: int, dry_run: bool = Query(False)):
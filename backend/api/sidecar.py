@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.sidecar')
+
+# EDL action code for "mute audio" (Kodi and MPlayer)
+EDL_MUTE = 1
+
+# Bump when the JSON layout changes
+JSON_VERSION = 1
+
+
+def sidecar_paths(file_path: str) -> Dict[str, str]:
+    """
+    Get the sidecar file paths for a media file
+
+    Players look for 'Movie.edl' next to 'Movie.mkv'.
+
+    Args:
+        file_path: Path to the media file
+
+    Returns:
+        Dictionary with 'edl' and 'json' paths
+    """
+    stem = os.path.splitext(file_path)[0]
+    return {
+        'edl': f"{stem}.edl",
+        'json': f"{stem}.bleeparr.json"
+    }
+
+
+def _write_atomic(path: str, content: str) -> None:
+    """Write a text file via a temporary file and rename"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def edl_content(plan: np.ndarray) -> str:
+    """
+    Render a mute plan as an EDL file
+
+    Args:
+        plan: (n, 2) array of (start, end) seconds
+
+    Returns:
+        EDL text, one 'start end action' line per interval
+    """
+    return ''.join(f"{start:.3f}\t{end:.3f}\t{EDL_MUTE}\n" for start, end in plan)
+
+
+def write_sidecars(file_path: str, plan: np.ndarray, hits: List[Dict[str, Any]],
+                   settings: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Write the mute list next to the media instead of rewriting it
+
+    Args:
+        file_path: Path to the media file
+        plan: Mute plan from muteplan.build_plan
+        hits: The words (or subtitle cues) the plan was built from
+        settings: Settings that shaped the plan (buffers, passes, ...)
+
+    Returns:
+        Dictionary with the 'edl' and 'json' paths written
+    """
+    paths = sidecar_paths(file_path)
+    _write_atomic(paths['edl'], edl_content(plan))
+    _write_atomic(paths['json'], json.dumps({
+        'version': JSON_VERSION,
+        'source': os.path.basename(file_path),
+        'settings': settings,
+        'intervals': [{'start': round(float(start), 3), 'end': round(float(end), 3)} for start, end in plan],
+        'hits': [
+            {
+                'start': round(float(hit['start']), 3),
+                'end': round(float(hit['end']), 3),
+                'text': hit.get('text'),
+                'pass': hit.get('pass')
+            }
+            for hit in hits
+        ]
+    }, indent=2))
+    logger.info(f"Wrote {len(plan)} mute intervals to {paths['edl']}")
+    return paths
@@ -8,6 +8,9 @@ from typing import List, Dict, Any, Optional, Tuple
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('bleeparr.sonarr')
 
+# IDs per bulk request, keeping URLs well under server limits
+BULK_CHUNK = 100
+
 class SonarrAPI:
     """Class to handle interactions with the Sonarr API"""
     
@@ -27,6 +30,9 @@ class SonarrAPI:
         }
         self._last_queue_check = 0
         self._last_history_check = 0
+        # Why the last list request failed, None if it succeeded; lets callers
+        # tell an empty answer from an unreachable server
+        self.last_error = None
         self._monitored_series_ids = set()
     
     def test_connection(self) -> Tuple[bool, str]:
@@ -52,8 +58,10 @@ class SonarrAPI:
         Get the list of all series from Sonarr
         
         Returns:
-            List of series objects
+            List of series objects; empty if the request failed, with the
+            reason in last_error
         """
+        self.last_error = None
         try:
             response = requests.get(f"{self.base_url}/api/v3/series", headers=self.headers)
             if response.status_code == 200:
@@ -61,10 +69,12 @@ class SonarrAPI:
                 logger.info(f"Retrieved {len(series_list)} series from Sonarr")
                 return series_list
             else:
-                logger.error(f"Failed to get series list: HTTP {response.status_code}")
+                self.last_error = f"Failed to get series list: HTTP {response.status_code}"
+                logger.error(self.last_error)
                 return []
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error getting series list: {str(e)}")
+            self.last_error = f"Error getting series list: {str(e)}"
+            logger.error(self.last_error)
             return []
     
     def get_series_by_id(self, series_id: int) -> Optional[Dict[str, Any]]:
@@ -98,6 +108,7 @@ class SonarrAPI:
         Returns:
             List of episode objects
         """
+        self.last_error = None
         try:
             response = requests.get(
                 f"{self.base_url}/api/v3/episode", 
@@ -109,10 +120,12 @@ class SonarrAPI:
                 logger.info(f"Retrieved {len(episodes)} episodes for series {series_id}")
                 return episodes
             else:
-                logger.error(f"Failed to get episodes for series {series_id}: HTTP {response.status_code}")
+                self.last_error = f"Failed to get episodes for series {series_id}: HTTP {response.status_code}"
+                logger.error(self.last_error)
                 return []
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error getting episodes for series {series_id}: {str(e)}")
+            self.last_error = f"Error getting episodes for series {series_id}: {str(e)}"
+            logger.error(self.last_error)
             return []
     
     def get_episode_file(self, episode_file_id: int) -> Optional[Dict[str, Any]]:
@@ -139,6 +152,91 @@ class SonarrAPI:
             logger.error(f"Error getting episode file {episode_file_id}: {str(e)}")
             return None
     
+    def get_episode_files(self, series_id: int) -> List[Dict[str, Any]]:
+        """
+        Get every episode file of a series in one request
+        
+        Args:
+            series_id: The Sonarr series ID
+            
+        Returns:
+            List of episode file objects
+        """
+        self.last_error = None
+        try:
+            response = requests.get(
+                f"{self.base_url}/api/v3/episodefile",
+                headers=self.headers,
+                params={'seriesId': series_id}
+            )
+            if response.status_code == 200:
+                return response.json()
+            else:
+                self.last_error = f"Failed to get episode files for series {series_id}: HTTP {response.status_code}"
+                logger.error(self.last_error)
+                return []
+        except requests.exceptions.RequestException as e:
+            self.last_error = f"Error getting episode files for series {series_id}: {str(e)}"
+            logger.error(self.last_error)
+            return []
+    
+    def _get_by_ids(self, endpoint: str, param: str,
+                    ids: List[int]) -> Tuple[List[Dict[str, Any]], Dict[int, str]]:
+        """
+        Fetch objects by id in chunks of BULK_CHUNK ids per request
+        
+        Returns:
+            Tuple of (objects found, {id: error} for every ID whose request failed)
+        """
+        results = []
+        failed = {}
+        ids = list(ids)
+        for start in range(0, len(ids), BULK_CHUNK):
+            chunk = ids[start:start + BULK_CHUNK]
+            error = None
+            try:
+                response = requests.get(
+                    f"{self.base_url}/api/v3/{endpoint}",
+                    headers=self.headers,
+                    params={param: chunk}
+                )
+                if response.status_code == 200:
+                    results.extend(response.json())
+                else:
+                    error = f"Failed to get {len(chunk)} {endpoint} records: HTTP {response.status_code}"
+            except requests.exceptions.RequestException as e:
+                error = f"Error getting {len(chunk)} {endpoint} records: {str(e)}"
+            if error:
+                logger.error(error)
+                failed.update(dict.fromkeys(chunk, error))
+        return results, failed
+    
+    def get_episodes_by_ids(self, episode_ids: List[int]) -> Tuple[List[Dict[str, Any]], Dict[int, str]]:
+        """
+        Get many episodes with a request per BULK_CHUNK ids
+        
+        Args:
+            episode_ids: Sonarr episode IDs
+            
+        Returns:
+            Tuple of (episode objects, {id: error} for every ID whose
+            request failed); IDs Sonarr does not know are in neither
+        """
+        return self._get_by_ids('episode', 'episodeIds', episode_ids)
+    
+    def get_episode_files_by_ids(self, episode_file_ids: List[int]) -> Tuple[List[Dict[str, Any]], Dict[int, str]]:
+        """
+        Get many episode files with a request per BULK_CHUNK ids
+        
+        Args:
+            episode_file_ids: Sonarr episode file IDs
+            
+        Returns:
+            Tuple of (episode file objects, {id: error} for every ID whose
+            request failed); IDs Sonarr does not know are in neither
+        """
+        return self._get_by_ids('episodefile', 'episodeFileIds', episode_file_ids)
+    
     def get_queue(self) -> List[Dict[str, Any]]:
         """
         Get the current download queue
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from api.jobs import check_cancelled
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.stages')
+
+# Pipeline stages in the order a job passes through them: decoding and
+# probing are I/O bound, Whisper is CPU bound, writing the output is I/O bound
+STAGES = ('extract', 'transcribe', 'mux')
+
+# Seconds between cancellation checks while waiting for a stage slot
+WAIT_POLL = 1.0
+
+
+class Stage:
+    """
+    Bounded pool of slots for one pipeline stage
+
+    Jobs wait for a slot in arrival order, so the queue schedule carries
+    through every stage. Busy and capacity time are integrated as slots are
+    taken and given back, which gives exact utilization even when the
+    limit changes at runtime.
+    """
+
+    def __init__(self, name: str, limit: int = 1):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self.waiting = deque()
+        self.jobs = 0
+        self.busy_seconds = 0.0
+        self.capacity_seconds = 0.0
+        self.wait_seconds = 0.0
+        self._last = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _advance(self) -> None:
+        """Account for the time since the last change; caller holds the lock"""
+        now = time.monotonic()
+        self.busy_seconds += (now - self._last) * self.active
+        self.capacity_seconds += (now - self._last) * self.limit
+        self._last = now
+
+    def set_limit(self, limit: int) -> None:
+        with self._cond:
+            self._advance()
+            self.limit = max(limit, 1)
+            self._cond.notify_all()
+
+    def acquire(self) -> None:
+        """Wait for a slot, raising JobCancelled if the job is cancelled meanwhile"""
+        ticket = object()
+        started = time.monotonic()
+        with self._cond:
+            self.waiting.append(ticket)
+            try:
+                while self.waiting[0] is not ticket or self.active >= self.limit:
+                    self._cond.wait(WAIT_POLL)
+                    check_cancelled()
+            except BaseException:
+                self.waiting.remove(ticket)
+                self._cond.notify_all()
+                raise
+            self.waiting.popleft()
+            self._advance()
+            self.active += 1
+            self.jobs += 1
+            self.wait_seconds += time.monotonic() - started
+            # The next in line may fit as well
+            self._cond.notify_all()
+
+    def release(self) -> None:
+        with self._cond:
+            self._advance()
+            self.active -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            self._advance()
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'waiting': len(self.waiting),
+                'jobs': self.jobs,
+                'busy_seconds': round(self.busy_seconds, 1),
+                'wait_seconds': round(self.wait_seconds, 1),
+                'utilization': round(self.busy_seconds / self.capacity_seconds, 3) if self.capacity_seconds else 0.0
+            }
+
+
+_stages = {name: Stage(name) for name in STAGES}
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Hold a slot of a pipeline stage for the duration of the block
+
+    A job may take a slot of another stage while holding one (a Whisper
+    pass that needs audio decoded), but the stage it waits for never waits
+    on another in turn, so slots cannot deadlock.
+    """
+    current = _stages[name]
+    current.acquire()
+    try:
+        yield
+    finally:
+        current.release()
+
+
+def configure_stages(limits: Dict[str, int]) -> None:
+    """Set the number of slots per stage; takes effect for the next waiting job"""
+    for name, limit in limits.items():
+        if _stages[name].limit != max(limit, 1):
+            logger.info(f"Stage {name}: {max(limit, 1)} slots")
+            _stages[name].set_limit(limit)
+
+
+def stage_stats() -> Dict[str, Dict[str, Any]]:
+    """Limit, occupancy and utilization of every stage since startup"""
+    return {name: _stages[name].stats() for name in STAGES}
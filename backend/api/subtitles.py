@@ -0,0 +1,134 @@
+import glob
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from api.jobs import run_process
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.subtitles')
+
+# Embedded subtitle codecs ffmpeg can convert to SRT
+TEXT_SUBTITLE_CODECS = {'subrip', 'srt', 'ass', 'ssa', 'mov_text', 'webvtt', 'text'}
+
+TIMESTAMP_PATTERN = re.compile(
+    r'(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})'
+)
+TAG_PATTERN = re.compile(r'<[^>]+>|\{[^}]+\}')
+
+
+def parse_srt(content: str) -> List[Dict[str, Any]]:
+    """
+    Parse SRT subtitle text into cues
+
+    Args:
+        content: Raw SRT file contents
+
+    Returns:
+        List of cues with 'start', 'end' (seconds) and 'text'
+    """
+    cues = []
+    for block in re.split(r'\r?\n\s*\r?\n', content.strip()):
+        lines = block.strip().splitlines()
+        for i, line in enumerate(lines):
+            match = TIMESTAMP_PATTERN.search(line)
+            if not match:
+                continue
+            h1, m1, s1, ms1, h2, m2, s2, ms2 = (int(g) for g in match.groups())
+            text = TAG_PATTERN.sub('', ' '.join(lines[i + 1:])).strip()
+            if text:
+                cues.append({
+                    'start': h1 * 3600 + m1 * 60 + s1 + ms1 / 1000.0,
+                    'end': h2 * 3600 + m2 * 60 + s2 + ms2 / 1000.0,
+                    'text': text
+                })
+            break
+    return cues
+
+
+def find_sidecar_subtitles(file_path: str, language: Optional[str] = None) -> Optional[str]:
+    """
+    Find an SRT file next to the media file
+
+    Matches 'Movie.srt' as well as language-tagged names such as
+    'Movie.en.srt'; a file tagged with the requested language is preferred.
+
+    Args:
+        file_path: Path to the media file
+        language: Preferred two-letter language code
+
+    Returns:
+        Path to the subtitle file or None
+    """
+    stem = os.path.splitext(file_path)[0]
+    candidates = sorted(glob.glob(glob.escape(stem) + '*.srt'))
+    if not candidates:
+        return None
+    if language:
+        for candidate in candidates:
+            if f".{language}." in os.path.basename(candidate).lower():
+                return candidate
+    return candidates[0]
+
+
+def extract_embedded_subtitles(file_path: str, streams: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Convert the first embedded text subtitle stream to SRT
+
+    Args:
+        file_path: Path to the media file
+        streams: Stream objects from ffprobe
+
+    Returns:
+        SRT contents or None if there is no usable text subtitle stream
+    """
+    for stream in streams:
+        if stream.get('codec_type') != 'subtitle' or stream.get('codec_name') not in TEXT_SUBTITLE_CODECS:
+            continue
+        cmd = [
+            "ffmpeg", "-nostdin", "-v", "error",
+            "-i", file_path,
+            "-map", f"0:{stream['index']}",
+            "-f", "srt", "-"
+        ]
+        process = run_process(cmd, text=True)
+        if process.returncode == 0 and process.stdout.strip():
+            return process.stdout
+        logger.warning(f"Could not extract subtitle stream {stream['index']} from {file_path}")
+    return None
+
+
+def load_subtitles(file_path: str, streams: List[Dict[str, Any]], language: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Load subtitle cues for a media file
+
+    Sidecar SRT files take priority over embedded text subtitles.
+
+    Args:
+        file_path: Path to the media file
+        streams: Stream objects from ffprobe
+        language: Preferred two-letter language code
+
+    Returns:
+        List of cues (empty if no subtitles are available)
+    """
+    sidecar = find_sidecar_subtitles(file_path, language)
+    if sidecar:
+        try:
+            with open(sidecar, 'r', encoding='utf-8', errors='replace') as f:
+                cues = parse_srt(f.read())
+            logger.info(f"Loaded {len(cues)} subtitle cues from {sidecar}")
+            return cues
+        except OSError as e:
+            logger.error(f"Error reading subtitles {sidecar}: {str(e)}")
+
+    content = extract_embedded_subtitles(file_path, streams)
+    if content:
+        cues = parse_srt(content)
+        logger.info(f"Loaded {len(cues)} embedded subtitle cues from {file_path}")
+        return cues
+
+    logger.info(f"No subtitles found for {file_path}")
+    return []
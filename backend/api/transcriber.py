@@ -0,0 +1,227 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+from api.jobs import check_cancelled
+from api.model_client import ModelServerUnavailable, model_server_available, remote_transcribe
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.transcriber')
+
+# Pass codes used in bleeptool strings mapped to Whisper model sizes
+PASS_MODELS = {
+    'S': 'small',
+    'M': 'medium'
+}
+
+# Used for model sizes that were never calibrated
+DEFAULT_COMPUTE_TYPE = 'int8'
+DEFAULT_BEAM_SIZE = 5
+
+_models = {}
+_models_lock = threading.Lock()
+
+# Model size -> calibrated 'compute_type', 'cpu_threads' and 'beam_size'
+_tuning = {}
+
+# Intra-op threads each transcribing job may use (0 = unlimited) and how
+# many jobs transcribe on one model at once
+_thread_budget = (0, 1)
+
+
+def _drop_stale_models() -> None:
+    """Forget models loaded with outdated settings; caller holds the lock"""
+    for key in [key for key in _models if key[1:] != _model_settings(key[0])]:
+        del _models[key]
+
+
+def set_tuning(tuning: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Use calibrated inference settings per model size
+
+    Models already loaded with other settings are dropped, so the next job
+    loads them the tuned way.
+    """
+    global _tuning
+    if tuning == _tuning:
+        return
+    with _models_lock:
+        _tuning = dict(tuning)
+        _drop_stale_models()
+
+
+def set_thread_budget(cpu_threads: int, num_workers: int = 1) -> None:
+    """
+    Cap inference threads per job and allow concurrent jobs on one model
+
+    Args:
+        cpu_threads: Intra-op threads per transcription (0 = no cap)
+        num_workers: Transcriptions one model instance runs in parallel
+    """
+    global _thread_budget
+    if (cpu_threads, num_workers) == _thread_budget:
+        return
+    with _models_lock:
+        _thread_budget = (cpu_threads, num_workers)
+        _drop_stale_models()
+
+
+def _model_settings(model_size: str) -> Tuple[str, int, int]:
+    """Compute type, threads (0 = CTranslate2 default) and workers for a model size"""
+    tuned = _tuning.get(model_size, {})
+    cpu_threads = int(tuned.get('cpu_threads', 0))
+    budget, num_workers = _thread_budget
+    if budget:
+        cpu_threads = min(cpu_threads, budget) if cpu_threads else budget
+    return tuned.get('compute_type', DEFAULT_COMPUTE_TYPE), cpu_threads, num_workers
+
+
+def tuned_beam_size(model_size: str) -> int:
+    """Beam width for a model size"""
+    return int(_tuning.get(model_size, {}).get('beam_size', DEFAULT_BEAM_SIZE))
+
+
+def get_model(model_size: str):
+    """
+    Load a Whisper model once and share it between jobs
+
+    The compute type and thread count come from the calibration, if the
+    model size was calibrated on this hardware, with threads capped by the
+    scheduler's per-job budget.
+
+    Args:
+        model_size: Whisper model size (e.g. 'small', 'medium')
+
+    Returns:
+        faster_whisper.WhisperModel instance
+    """
+    if WhisperModel is None:
+        raise RuntimeError("faster-whisper is not installed")
+
+    with _models_lock:
+        compute_type, cpu_threads, num_workers = _model_settings(model_size)
+        key = (model_size, compute_type, cpu_threads, num_workers)
+        if key not in _models:
+            logger.info(f"Loading Whisper model: {model_size} ({compute_type}, {cpu_threads or 'default'} threads, "
+                        f"{num_workers} workers)")
+            _models[key] = WhisperModel(model_size, device='cpu', compute_type=compute_type,
+                                        cpu_threads=cpu_threads, num_workers=num_workers)
+        return _models[key]
+
+
+def loaded_models() -> set:
+    """Model sizes currently held in memory"""
+    with _models_lock:
+        return {key[0] for key in _models}
+
+
+def segment_words(segments) -> List[Dict[str, Any]]:
+    """Flatten Whisper segments into word dicts with times relative to the audio"""
+    words = []
+    for segment in segments:
+        check_cancelled()
+        for word in segment.words or []:
+            words.append({
+                'text': word.word.strip(),
+                'start': word.start,
+                'end': word.end,
+                'probability': word.probability
+            })
+    return words
+
+
+def transcribe_audio(model, audio: np.ndarray, language: Optional[str] = None,
+                     beam_size: int = DEFAULT_BEAM_SIZE) -> List[Dict[str, Any]]:
+    """Transcribe one window of audio with word timestamps"""
+    segments, _ = model.transcribe(
+        audio,
+        language=language,
+        beam_size=beam_size,
+        word_timestamps=True,
+        condition_on_previous_text=False,
+        vad_filter=False
+    )
+    return segment_words(segments)
+
+
+def transcribe_windows(pcm: np.ndarray, sample_rate: int, windows: List[Tuple[float, float]],
+                       pass_name: str, language: Optional[str] = None,
+                       beam_size: Optional[int] = None, model_size: Optional[str] = None,
+                       checkpoint=None) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Transcribe selected windows of a recording with word timestamps
+
+    Only the given windows are decoded; word times are shifted back onto the
+    timeline of the full recording. When a model server is running, windows
+    are sent to it instead of loading the model in this process.
+
+    Args:
+        pcm: Mono float32 samples
+        sample_rate: Sample rate of pcm
+        windows: (start, end) spans in seconds to transcribe
+        pass_name: Pass code from PASS_MODELS ('S' or 'M')
+        language: Two-letter language code, or None to auto-detect
+        beam_size: Beam width for decoding (default: the calibrated width)
+        model_size: Whisper model size, instead of the pass's default from PASS_MODELS
+        checkpoint: ChunkCheckpoint recording finished windows; windows it already
+            holds are taken from it instead of being transcribed again
+
+    Returns:
+        Tuple of (words, elapsed_seconds). Each word has 'text', 'start',
+        'end', 'probability' and 'pass'.
+    """
+    model_size = model_size or PASS_MODELS[pass_name]
+    beam_size = beam_size or tuned_beam_size(model_size)
+    remote = model_server_available()
+    model = None if remote else get_model(model_size)
+    words = []
+    started = time.monotonic()
+    audio_seconds = 0.0
+
+    for start, end in windows:
+        check_cancelled()
+        if checkpoint is not None:
+            done = checkpoint.get((start, end))
+            if done is not None:
+                words.extend(done)
+                continue
+        audio = pcm[int(start * sample_rate):int(end * sample_rate)]
+        if not len(audio):
+            continue
+        raw_words = None
+        if remote:
+            try:
+                raw_words = remote_transcribe(audio, model_size, language, beam_size)
+            except ModelServerUnavailable as e:
+                logger.warning(f"Model server unavailable, loading {model_size} locally: {e}")
+                remote = False
+                model = get_model(model_size)
+        if raw_words is None:
+            raw_words = transcribe_audio(model, audio, language, beam_size)
+        window_words = [
+            {
+                'text': word['text'],
+                'start': round(start + word['start'], 3),
+                'end': round(start + word['end'], 3),
+                'probability': round(word['probability'], 3),
+                'pass': pass_name
+            }
+            for word in raw_words
+        ]
+        words.extend(window_words)
+        audio_seconds += end - start
+        if checkpoint is not None:
+            checkpoint.add((start, end), window_words)
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Pass {pass_name}: transcribed {audio_seconds:.1f}s of audio in {elapsed:.1f}s ({len(words)} words)")
+    return words, elapsed
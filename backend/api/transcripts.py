@@ -0,0 +1,181 @@
+import io
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.transcripts')
+
+TRANSCRIPT_DIR = Path(os.getenv('DATA_DIR', Path(__file__).parent.parent / 'data')) / 'transcripts'
+
+# Bump when the on-disk layout changes; older files are ignored
+FORMAT_VERSION = 1
+
+PASS_CODES = ['S', 'M']
+
+
+def transcript_path(fingerprint: str) -> Path:
+    """Get the cache file path for a file fingerprint"""
+    return TRANSCRIPT_DIR / fingerprint[:2] / f"{fingerprint}.npz"
+
+
+def _pack_text(texts: List[str]) -> Dict[str, np.ndarray]:
+    """Store strings as one UTF-8 blob plus end offsets"""
+    encoded = [t.encode('utf-8') for t in texts]
+    return {
+        'blob': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        'offsets': np.cumsum([len(e) for e in encoded], dtype=np.uint32)
+    }
+
+
+def _unpack_text(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """Inverse of _pack_text"""
+    data = blob.tobytes()
+    starts = np.concatenate(([0], offsets[:-1])) if len(offsets) else offsets
+    return [data[s:e].decode('utf-8') for s, e in zip(starts.tolist(), offsets.tolist())]
+
+
+def _unpack_spans(spans: np.ndarray) -> List[tuple]:
+    """Read (start, end) spans back at millisecond precision"""
+    return [(round(start, 3), round(end, 3)) for start, end in spans.tolist()]
+
+
+def save_transcript(fingerprint: str, transcript: Dict[str, Any]) -> None:
+    """
+    Persist a transcript in columnar form
+
+    Words are stored as parallel arrays (start/end as float32 seconds,
+    probability as float16, pass as uint8, text as a UTF-8 blob), which is
+    a fraction of the JSON size and loads without per-row parsing.
+
+    Args:
+        fingerprint: File fingerprint the transcript belongs to
+        transcript: Dictionary with 'words', 'cues', 'regions', 'm_windows' and 'meta'
+    """
+    words = transcript.get('words', [])
+    cues = transcript.get('cues', [])
+    word_text = _pack_text([w['text'] for w in words])
+    cue_text = _pack_text([c['text'] for c in cues])
+    meta = dict(transcript.get('meta', {}), version=FORMAT_VERSION, fingerprint=fingerprint)
+
+    columns = {
+        'word_start': np.array([w['start'] for w in words], dtype=np.float32),
+        'word_end': np.array([w['end'] for w in words], dtype=np.float32),
+        'word_probability': np.array([w['probability'] for w in words], dtype=np.float16),
+        'word_pass': np.array([PASS_CODES.index(w['pass']) for w in words], dtype=np.uint8),
+        'word_text': word_text['blob'],
+        'word_offsets': word_text['offsets'],
+        'cue_start': np.array([c['start'] for c in cues], dtype=np.float32),
+        'cue_end': np.array([c['end'] for c in cues], dtype=np.float32),
+        'cue_text': cue_text['blob'],
+        'cue_offsets': cue_text['offsets'],
+        'regions': np.array(transcript.get('regions', []), dtype=np.float64).reshape(-1, 2),
+        'm_windows': np.array(transcript.get('m_windows', []), dtype=np.float64).reshape(-1, 2),
+        'meta': np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+    }
+
+    path = transcript_path(fingerprint)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **columns)
+    # Write-then-rename so a crash never leaves a truncated cache file
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, path)
+    logger.info(f"Saved transcript with {len(words)} words for {fingerprint}")
+
+
+def load_transcript(fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a cached transcript
+
+    Args:
+        fingerprint: File fingerprint
+
+    Returns:
+        Transcript dictionary, or None if nothing usable is cached
+    """
+    path = transcript_path(fingerprint)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            if meta.get('version') != FORMAT_VERSION:
+                return None
+            word_text = _unpack_text(data['word_text'], data['word_offsets'])
+            cue_text = _unpack_text(data['cue_text'], data['cue_offsets'])
+            words = [
+                {
+                    'text': text,
+                    'start': round(float(start), 3),
+                    'end': round(float(end), 3),
+                    'probability': round(float(probability), 3),
+                    'pass': PASS_CODES[code]
+                }
+                for text, start, end, probability, code in zip(
+                    word_text,
+                    data['word_start'].tolist(),
+                    data['word_end'].tolist(),
+                    data['word_probability'].tolist(),
+                    data['word_pass'].tolist()
+                )
+            ]
+            cues = [
+                {'text': text, 'start': round(float(start), 3), 'end': round(float(end), 3)}
+                for text, start, end in zip(cue_text, data['cue_start'].tolist(), data['cue_end'].tolist())
+            ]
+            return {
+                'words': words,
+                'cues': cues,
+                'regions': _unpack_spans(data['regions']),
+                'm_windows': _unpack_spans(data['m_windows']),
+                'meta': meta
+            }
+    except Exception as e:
+        logger.error(f"Error loading transcript {path}: {str(e)}")
+        return None
+
+
+def shift_transcript(transcript: Dict[str, Any], offset: float, duration: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Move a transcript onto another release of the same audio
+
+    Args:
+        transcript: Transcript of the known release
+        offset: Seconds to add to every timestamp
+        duration: Length of the new release, to drop words that fall outside
+
+    Returns:
+        New transcript dictionary with shifted words, cues and spans
+    """
+    end_limit = duration if duration else float('inf')
+
+    def shift_items(items):
+        shifted = []
+        for item in items:
+            start, end = item['start'] + offset, item['end'] + offset
+            if start >= 0 and end <= end_limit:
+                shifted.append(dict(item, start=round(start, 3), end=round(end, 3)))
+        return shifted
+
+    def shift_spans(spans):
+        return [
+            (round(max(start + offset, 0.0), 3), round(min(end + offset, end_limit), 3))
+            for start, end in spans
+            if end + offset > 0 and start + offset < end_limit
+        ]
+
+    return {
+        'words': shift_items(transcript['words']),
+        'cues': shift_items(transcript['cues']),
+        'regions': shift_spans(transcript['regions']),
+        'm_windows': shift_spans(transcript['m_windows']),
+        'meta': dict(transcript['meta'])
+    }
@@ -0,0 +1,170 @@
+import logging
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from api.muteplan import merge_regions
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.vad')
+
+# Frames are analysed in blocks so the FFT never holds the whole film in memory
+FRAMES_PER_BLOCK = 20000
+
+
+def _frame_features(pcm: np.ndarray, sample_rate: int, frame_ms: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute per-frame log energy and speech-band energy ratio
+
+    Args:
+        pcm: Mono float32 samples
+        sample_rate: Sample rate of pcm
+        frame_ms: Frame length in milliseconds (frames do not overlap)
+
+    Returns:
+        Tuple of (log_energy_db, speech_band_ratio), one value per frame
+    """
+    frame_len = int(sample_rate * frame_ms / 1000)
+    n_frames = len(pcm) // frame_len
+    frames = pcm[:n_frames * frame_len].reshape(n_frames, frame_len)
+
+    freqs = np.fft.rfftfreq(frame_len, d=1.0 / sample_rate)
+    speech_band = (freqs >= 300) & (freqs <= 3400)
+    window = np.hanning(frame_len).astype(np.float32)
+
+    energy_db = np.empty(n_frames, dtype=np.float32)
+    band_ratio = np.empty(n_frames, dtype=np.float32)
+    for start in range(0, n_frames, FRAMES_PER_BLOCK):
+        block = frames[start:start + FRAMES_PER_BLOCK]
+        power = np.abs(np.fft.rfft(block * window, axis=1)) ** 2
+        total = power.sum(axis=1) + 1e-12
+        energy_db[start:start + len(block)] = 10 * np.log10(np.mean(block ** 2, axis=1) + 1e-12)
+        band_ratio[start:start + len(block)] = power[:, speech_band].sum(axis=1) / total
+
+    return energy_db, band_ratio
+
+
+def _moving_average(values: np.ndarray, width: int) -> np.ndarray:
+    """Centered moving average with edge padding"""
+    if width <= 1:
+        return values
+    kernel = np.ones(width, dtype=np.float32) / width
+    padded = np.pad(values, (width // 2, width - 1 - width // 2), mode='edge')
+    return np.convolve(padded, kernel, mode='valid')
+
+
+def _mask_to_regions(mask: np.ndarray) -> np.ndarray:
+    """Convert a boolean frame mask to an (n, 2) array of [start, end) frame indices"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return np.stack([starts, ends], axis=1)
+
+
+def detect_speech_regions(pcm: np.ndarray, sample_rate: int, frame_ms: int = 30,
+                          energy_margin_db: float = 12.0, min_band_ratio: float = 0.45,
+                          min_modulation_db: float = 3.0, min_speech_ms: int = 250,
+                          min_silence_ms: int = 400, pad_ms: int = 200) -> List[Tuple[float, float]]:
+    """
+    Find the spans of a recording that contain speech
+
+    Frames are classed as speech when they are well above the noise floor,
+    carry most of their energy in the 300-3400 Hz voice band, and show the
+    syllable-rate loudness modulation that separates dialogue from sustained
+    music or effects. The decision is smoothed, short gaps are bridged and
+    the result is padded so word onsets are never clipped.
+
+    Args:
+        pcm: Mono float32 samples
+        sample_rate: Sample rate of pcm
+        frame_ms: Analysis frame length in milliseconds
+        energy_margin_db: How far above the noise floor a frame must be
+        min_band_ratio: Minimum share of energy in the voice band
+        min_modulation_db: Minimum local loudness variation (std, dB)
+        min_speech_ms: Regions shorter than this are dropped
+        min_silence_ms: Gaps shorter than this are bridged
+        pad_ms: Padding added to both ends of every region
+
+    Returns:
+        List of (start, end) tuples in seconds, sorted and non-overlapping
+    """
+    if len(pcm) < sample_rate * frame_ms / 1000:
+        return []
+
+    energy_db, band_ratio = _frame_features(pcm, sample_rate, frame_ms)
+    frame_s = frame_ms / 1000.0
+
+    # Noise floor from the quietest decile, ignoring digital silence
+    audible = energy_db[energy_db > -90]
+    noise_floor = np.percentile(audible, 10) if len(audible) else -90.0
+    loud = energy_db > noise_floor + energy_margin_db
+
+    # Speech rises and falls ~4 times a second; music and room tone stay flat
+    modulation_width = max(1, int(0.4 / frame_s))
+    mean_db = _moving_average(energy_db, modulation_width)
+    modulation = np.sqrt(np.maximum(_moving_average(energy_db ** 2, modulation_width) - mean_db ** 2, 0))
+
+    voiced = _moving_average(band_ratio, max(1, int(0.2 / frame_s))) >= min_band_ratio
+    speech = loud & voiced & (modulation >= min_modulation_db)
+    speech = _moving_average(speech.astype(np.float32), max(1, int(0.15 / frame_s))) >= 0.5
+
+    regions = _mask_to_regions(speech)
+    if not len(regions):
+        return []
+
+    # Bridge short pauses between words, then drop blips
+    seconds = merge_regions(regions * frame_s, max_gap=min_silence_ms / 1000.0)
+    seconds = seconds[(seconds[:, 1] - seconds[:, 0]) * 1000 >= min_speech_ms]
+
+    duration = len(pcm) / sample_rate
+    seconds[:, 0] = np.maximum(seconds[:, 0] - pad_ms / 1000.0, 0.0)
+    seconds[:, 1] = np.minimum(seconds[:, 1] + pad_ms / 1000.0, duration)
+
+    # Padding can make neighbours touch again
+    return [(float(start), float(end)) for start, end in merge_regions(seconds)]
+
+
+def plan_chunks(regions: List[Tuple[float, float]], max_chunk_seconds: float = 30.0) -> List[Tuple[float, float]]:
+    """
+    Group speech regions into transcription windows
+
+    Whisper works on 30 second windows, so tiny regions are packed together
+    (including the short silence between them) instead of being decoded one
+    at a time. Regions longer than the limit get a window of their own.
+
+    Args:
+        regions: Speech regions in seconds
+        max_chunk_seconds: Target window length
+
+    Returns:
+        List of (start, end) windows in seconds
+    """
+    chunks = []
+    for start, end in regions:
+        if chunks and end - chunks[-1][0] <= max_chunk_seconds:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+    return chunks
+
+
+def speech_stats(regions: List[Tuple[float, float]], duration: float) -> Dict[str, Any]:
+    """
+    Summarize how much of a recording the VAD kept
+
+    Args:
+        regions: Speech regions in seconds
+        duration: Total duration in seconds
+
+    Returns:
+        Dictionary with region count, speech seconds and speech ratio
+    """
+    speech_seconds = float(sum(end - start for start, end in regions))
+    return {
+        'regions': len(regions),
+        'duration': round(duration, 2),
+        'speech_seconds': round(speech_seconds, 2),
+        'skipped_seconds': round(max(duration - speech_seconds, 0.0), 2),
+        'speech_ratio': round(speech_seconds / duration, 4) if duration else 0.0
+    }
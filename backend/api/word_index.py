@@ -0,0 +1,130 @@
+import logging
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from backend.db import save_word_index, get_indexed_files_with_tokens, get_word_index_entries
+from api.matcher import SwearMatcher, normalize_text
+from api.transcripts import load_transcript
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.word_index')
+
+# Same tolerance the FSM pass uses when matching words to subtitle cues
+CUE_SLACK = 0.5
+
+
+def index_transcript(fingerprint: str, item: Dict[str, Any]) -> int:
+    """
+    Add a stored transcript to the inverted word index
+
+    Every transcribed word is indexed with its own timestamps, and every
+    subtitle token with the span of its cue, so both word mutes and FSM
+    fallback mutes can be rebuilt without touching the media.
+
+    Args:
+        fingerprint: File fingerprint of the transcript
+        item: Queue item the file belongs to
+
+    Returns:
+        Number of index rows written
+    """
+    transcript = load_transcript(fingerprint)
+    if not transcript:
+        logger.warning(f"No stored transcript to index for {fingerprint}")
+        return 0
+
+    rows = []
+    for word in transcript['words']:
+        for token in normalize_text(word['text']).split():
+            rows.append((token, word['start'], word['end'], 'word'))
+    for cue in transcript['cues']:
+        for token in set(normalize_text(cue['text']).split()):
+            rows.append((token, cue['start'], cue['end'], 'cue'))
+
+    save_word_index(fingerprint, item, rows)
+    logger.info(f"Indexed {len(rows)} tokens for {item.get('file_path')}")
+    return len(rows)
+
+
+def diff_swears(old: Iterable[str], new: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+    """
+    Compare two swear lists
+
+    Args:
+        old: Previously applied words
+        new: Current words
+
+    Returns:
+        Tuple of (added, removed) word sets
+    """
+    old, new = set(old), set(new)
+    return new - old, old - new
+
+
+def build_mute_plan(fingerprint: str, phrases: Set[str], fallback: bool = True) -> List[Tuple[float, float]]:
+    """
+    Compute a file's mute plan straight from the index
+
+    Single words are looked up in the index. Multi-word phrases need word
+    order, which the index does not keep, so those are matched against the
+    stored transcript with the same matcher the engine uses.
+
+    Args:
+        fingerprint: File fingerprint
+        phrases: Normalized words and phrases to censor
+        fallback: Also mute whole subtitle cues nobody was heard saying (FSM)
+
+    Returns:
+        Sorted list of unpadded (start, end) spans to mute
+    """
+    single = {p for p in phrases if ' ' not in p}
+    multi = set(phrases) - single
+
+    entries = get_word_index_entries(fingerprint, single)
+    heard = [(start, end) for _, start, end, source in entries if source == 'word']
+    cues = [(start, end) for _, start, end, source in entries if source == 'cue']
+
+    if multi:
+        transcript = load_transcript(fingerprint)
+        if transcript:
+            matcher = SwearMatcher(list(multi))
+            heard.extend((hit['start'], hit['end']) for hit in matcher.match_words(transcript['words']))
+            cues.extend((cue['start'], cue['end']) for cue in transcript['cues'] if matcher.find(cue['text']))
+
+    plan = list(heard)
+    if fallback:
+        for start, end in cues:
+            confirmed = any(start - CUE_SLACK <= w_start <= end + CUE_SLACK for w_start, _ in heard)
+            if not confirmed:
+                plan.append((start, end))
+    return sorted(set(plan))
+
+
+def plan_swear_changes(old: Iterable[str], new: Iterable[str], fallback: bool = True) -> List[Dict[str, Any]]:
+    """
+    Work out which indexed files a swear list change affects
+
+    Args:
+        old: Previously applied words and phrases (normalized)
+        new: Current words and phrases (normalized)
+        fallback: Whether FSM cue mutes are part of the plan
+
+    Returns:
+        List of indexed file records, each with a 'mute_plan' for the new list
+    """
+    added, removed = diff_swears(old, new)
+    if not added and not removed:
+        return []
+
+    logger.info(f"Swear list changed: {len(added)} added, {len(removed)} removed")
+    new = set(new)
+    affected = {}
+    for phrase in added | removed:
+        # A phrase can only occur in files that contain every one of its words
+        for record in get_indexed_files_with_tokens(phrase.split()):
+            affected[record['fingerprint']] = record
+
+    for record in affected.values():
+        record['mute_plan'] = build_mute_plan(record['fingerprint'], new, fallback)
+    logger.info(f"{len(affected)} indexed files contain changed words")
+    return list(affected.values())
@@ -0,0 +1,201 @@
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from backend.db import get_db, replace_arr_files
+from api.sonarr import SonarrAPI
+from api.radarr import RadarrAPI
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.backfill')
+
+# Extensions the scanner treats as media
+MEDIA_EXTENSIONS = {'.mkv', '.mp4', '.m4v', '.avi', '.mov', '.ts', '.m2ts', '.wmv', '.webm'}
+
+# Series fetched from Sonarr at once while refreshing the mirror
+ARR_FETCH_WORKERS = 4
+
+
+def _filtered_ids(item_type):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM bleeparr_items WHERE type = ? AND filtered = 1", (item_type,))
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _mirrored_roots(item_type):
+    """Library roots of the files already mirrored for one type"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT DISTINCT root_folder FROM arr_files WHERE item_type = ? AND root_folder IS NOT NULL",
+            (item_type,)
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _root_folder(item):
+    """Library root an arr item lives under"""
+    return item.get('rootFolderPath') or os.path.dirname(item.get('path', '').rstrip('/')) or None
+
+
+class ArrFetchError(Exception):
+    """A Sonarr/Radarr list request failed, so its answer cannot replace the mirror"""
+
+
+def _episode_rows(url, api_key, series_ids):
+    """
+    Fetch the episode files of the filtered series
+
+    Raises:
+        ArrFetchError: If the series list or any series' episodes or files
+            could not be fetched
+    """
+    api = SonarrAPI(url, api_key)
+    series_list = [series for series in api.get_series_list() if series.get('id') in series_ids]
+    if api.last_error:
+        raise ArrFetchError(api.last_error)
+
+    def series_rows(series):
+        # A client per series, so last_error is this thread's own
+        client = SonarrAPI(url, api_key)
+        files = {f['id']: f['path'] for f in client.get_episode_files(series['id']) if f.get('path')}
+        episodes = [] if client.last_error else client.get_episodes_by_series_id(series['id'])
+        if client.last_error:
+            raise ArrFetchError(client.last_error)
+        rows = []
+        for episode in episodes:
+            path = files.get(episode.get('episodeFileId'))
+            if path:
+                rows.append({
+                    'file_path': path,
+                    'item_id': episode['id'],
+                    'parent_id': series['id'],
+                    'title': series.get('title'),
+                    'detail': f"S{episode.get('seasonNumber', 0):02d}E{episode.get('episodeNumber', 0):02d} - {episode.get('title', 'Unknown')}",
+                    'root_folder': _root_folder(series)
+                })
+        return rows
+
+    with ThreadPoolExecutor(max_workers=ARR_FETCH_WORKERS) as executor:
+        rows = [row for series_rows_ in executor.map(series_rows, series_list) for row in series_rows_]
+    logger.info(f"Mirrored {len(rows)} episode files from {len(series_list)} series")
+    return rows
+
+
+def _movie_rows(url, api_key, movie_ids):
+    """
+    Fetch the files of the filtered movies
+
+    Raises:
+        ArrFetchError: If the movie list could not be fetched
+    """
+    api = RadarrAPI(url, api_key)
+    movies = api.get_movie_list()
+    if api.last_error:
+        raise ArrFetchError(api.last_error)
+    rows = []
+    for movie in movies:
+        path = (movie.get('movieFile') or {}).get('path')
+        if movie.get('id') in movie_ids and path:
+            rows.append({
+                'file_path': path,
+                'item_id': movie['id'],
+                'parent_id': movie['id'],
+                'title': movie.get('title'),
+                'detail': f"{movie.get('year', '')}",
+                'root_folder': _root_folder(movie)
+            })
+    logger.info(f"Mirrored {len(rows)} movie files")
+    return rows
+
+
+def refresh_arr_mirror():
+    """
+    Mirror the file paths of every filtered series and movie
+
+    Radarr returns every movie with its file in one call; Sonarr needs
+    one call for a series' episodes and one for its files, made a few
+    series at a time. Each type is swapped in with one transaction. If
+    any request for a type fails, that type keeps its previous mirror
+    rather than losing the files the failed request would have listed.
+
+    Returns:
+        Set of library root folders the mirrored items live under
+    """
+    roots = set()
+    sources = (
+        ('show', 'SONARR', _episode_rows),
+        ('movie', 'RADARR', _movie_rows)
+    )
+    for item_type, prefix, fetch_rows in sources:
+        url, api_key = os.getenv(f"{prefix}_URL"), os.getenv(f"{prefix}_API_KEY")
+        ids = _filtered_ids(item_type)
+        if not (url and api_key and ids):
+            continue
+        try:
+            rows = fetch_rows(url, api_key, ids)
+        except ArrFetchError as e:
+            logger.error(f"Keeping the mirrored {item_type} files, {prefix.capitalize()} could not be read: {e}")
+            roots.update(_mirrored_roots(item_type))
+            continue
+        replace_arr_files(item_type, rows)
+        roots.update(row['root_folder'] for row in rows if row['root_folder'])
+
+    return roots
+
+
+def _scan_dir(path, skip_prefix):
+    """
+    List one directory
+
+    Returns:
+        Tuple of (media files as (path, size, mtime_ns), subdirectories)
+    """
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    # Hidden files include our own in-progress outputs
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif (entry.is_file()
+                      and os.path.splitext(entry.name)[1].lower() in MEDIA_EXTENSIONS
+                      and not (skip_prefix and entry.name.startswith(skip_prefix))):
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+    except OSError as e:
+        logger.warning(f"Cannot scan {path}: {e}")
+    return files, subdirs
+
+
+def scan_library(roots, workers=8, skip_prefix='clean_'):
+    """
+    Walk library roots in parallel
+
+    Every directory is listed by its own scandir() task as soon as its
+    parent has been read, so slow network mounts are read many
+    directories at a time. Cleaned copies (skip_prefix) are left out.
+
+    Args:
+        roots: Directories to walk
+        workers: Directories listed at once
+        skip_prefix: File name prefix of cleaned copies
+
+    Returns:
+        List of (path, size, mtime_ns) for every media file found
+    """
+    found = []
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='bleeparr-scan') as executor:
+        pending = {executor.submit(_scan_dir, root, skip_prefix) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                found.extend(files)
+                pending.update(executor.submit(_scan_dir, subdir, skip_prefix) for subdir in subdirs)
+    logger.info(f"Found {len(found)} media files under {len(roots)} library roots")
+    return found
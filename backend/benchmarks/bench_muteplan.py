@@ -0,0 +1,113 @@
+"""
+Benchmark the mute-plan builder on synthetic plans
+
+Compares the NumPy plan builder with a plain Python sort-and-merge loop on
+10k word hits, and reports the size of the resulting ffmpeg filter for the
+between() chain and the asendcmd script. If ffmpeg is installed, also times
+both filters over two hours of synthetic audio.
+
+Usage:
+    python backend/benchmarks/bench_muteplan.py [--hits 10000] [--duration 7200]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from api.muteplan import build_plan, between_filter, audio_filter, remove_script
+
+
+def synthetic_hits(count, duration, seed=0):
+    """Random word hits, clustered the way swearing clusters in dialogue"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, duration, size=max(count // 8, 1))
+    starts = np.sort(rng.choice(centers, size=count) + rng.normal(0, 4, size=count))
+    starts = np.clip(starts, 0, duration - 1)
+    lengths = rng.uniform(0.15, 0.6, size=count)
+    return [{'start': float(s), 'end': float(s + l)} for s, l in zip(starts, lengths)]
+
+
+def naive_plan(hits, pre_buffer, post_buffer, merge_gap):
+    """Reference implementation: Python loop over sorted, padded hits"""
+    spans = sorted(
+        (max(h['start'] - pre_buffer / 1000.0, 0.0), h['end'] + post_buffer / 1000.0)
+        for h in hits
+    )
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1] + merge_gap / 1000.0:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def timed(func, *args, repeat=5):
+    """Best wall time of several runs, in milliseconds"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+
+def time_ffmpeg(filter_str, duration):
+    """Run a filter over synthetic audio and return wall time in seconds"""
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+        "-filter:a", filter_str,
+        "-f", "null", "-"
+    ]
+    started = time.perf_counter()
+    subprocess.run(cmd, check=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mute-plan building")
+    parser.add_argument('--hits', type=int, default=10000)
+    parser.add_argument('--duration', type=float, default=7200)
+    parser.add_argument('--pre-buffer', type=float, default=100)
+    parser.add_argument('--post-buffer', type=float, default=100)
+    parser.add_argument('--merge-gap', type=float, default=200)
+    args = parser.parse_args()
+
+    hits = synthetic_hits(args.hits, args.duration)
+
+    plan, numpy_ms = timed(build_plan, hits, args.pre_buffer, args.post_buffer, args.merge_gap, args.duration)
+    reference, naive_ms = timed(naive_plan, hits, args.pre_buffer, args.post_buffer, args.merge_gap)
+    assert np.allclose(plan, np.array(reference)), "NumPy plan differs from reference"
+    unmerged = build_plan(hits, args.pre_buffer, args.post_buffer, 0, args.duration)
+
+    print(f"hits:                    {len(hits)}")
+    print(f"intervals (gap 0 ms):    {len(unmerged)}")
+    print(f"intervals (gap {args.merge_gap:g} ms): {len(plan)}")
+    print(f"build_plan:              {numpy_ms:.2f} ms")
+    print(f"python loop:             {naive_ms:.2f} ms")
+    print(f"between() chain:         {len(between_filter(unmerged)) / 1024:.1f} KiB unmerged, "
+          f"{len(between_filter(plan)) / 1024:.1f} KiB merged")
+
+    filter_str, script_path = audio_filter(plan)
+    try:
+        print(f"asendcmd script:         {os.path.getsize(script_path) / 1024:.1f} KiB" if script_path else
+              "asendcmd script:         not needed")
+        if shutil.which('ffmpeg'):
+            print(f"ffmpeg between() chain:  {time_ffmpeg(between_filter(plan), args.duration):.2f} s")
+            print(f"ffmpeg asendcmd:         {time_ffmpeg(filter_str, args.duration):.2f} s")
+        else:
+            print("ffmpeg not found, skipping filter timings")
+    finally:
+        remove_script(script_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import sqlite3
 from pathlib import Path
 import os
+import json
 import logging
 
 # Set up logging
@@ -10,10 +11,28 @@ logger = logging.getLogger('bleeparr.db')
 # Define database path
 DB_PATH = Path(__file__).parent / "bleeparr.db"
 
+# Rows per statement or transaction for bulk reads and writes
+SQL_BATCH_SIZE = 500
+
+# Per-series/movie overrides of the global engine settings, NULL = use global
+PROFILE_FIELDS = {
+    'bleeptool': 'TEXT',
+    'boost_db': 'REAL',
+    'small_model': 'TEXT',
+    'medium_model': 'TEXT',
+    'output_mode': 'TEXT'
+}
+
 def get_db():
     """Get a database connection"""
     return sqlite3.connect(DB_PATH)
 
+def _add_column(cursor, table, column, definition):
+    """Add a column to an existing table if it is missing"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 def init_db():
     """Initialize the database schema"""
     logger.info(f"Initializing database at {DB_PATH}")
@@ -64,6 +83,86 @@ def init_db():
             )
         """)
         
+        # Processing profile of a series or movie
+        for column, definition in PROFILE_FIELDS.items():
+            _add_column(cursor, 'bleeparr_items', column, definition)
+        
+        # Options for a queued job (e.g. a precomputed mute plan)
+        _add_column(cursor, 'processing_queue', 'options', 'TEXT')
+
+        # Inverted index of transcribed words, for targeted reprocessing
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS word_index (
+                token TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                start REAL NOT NULL,
+                end REAL NOT NULL,
+                source TEXT NOT NULL CHECK (source IN ('word', 'cue'))
+            )
+        """)
+
+        # Media files whose transcripts are in the word index
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS indexed_files (
+                fingerprint TEXT PRIMARY KEY,
+                item_id INTEGER NOT NULL,
+                item_type TEXT NOT NULL CHECK (item_type IN ('show', 'movie')),
+                file_path TEXT NOT NULL,
+                title TEXT NOT NULL,
+                detail TEXT,
+                parent_id INTEGER,
+                indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # ffprobe results and fingerprints, refreshed when size or mtime change
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS media_files (
+                file_path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                duration REAL,
+                audio_streams INTEGER,
+                codecs TEXT,
+                probe TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Local mirror of the files Sonarr/Radarr know, for resolving paths to ids
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS arr_files (
+                file_path TEXT PRIMARY KEY,
+                item_type TEXT NOT NULL CHECK (item_type IN ('show', 'movie')),
+                item_id INTEGER NOT NULL,
+                parent_id INTEGER,
+                title TEXT NOT NULL,
+                detail TEXT,
+                root_folder TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Which file content a history entry was for, and how long it took
+        _add_column(cursor, 'processing_history', 'fingerprint', 'TEXT')
+        _add_column(cursor, 'processing_history', 'output_fingerprint', 'TEXT')
+        _add_column(cursor, 'processing_history', 'duration', 'REAL')
+        _add_column(cursor, 'processing_history', 'elapsed_seconds', 'REAL')
+        
+        # Two-phase jobs: 'quick' subtitle-only clean, then 'refine'
+        _add_column(cursor, 'processing_history', 'phase', 'TEXT')
+        _add_column(cursor, 'processing_queue', 'priority', 'INTEGER NOT NULL DEFAULT 0')
+        
+        # Runs of a queued job that timed out
+        _add_column(cursor, 'processing_queue', 'attempts', 'INTEGER NOT NULL DEFAULT 0')
+        
+        # Whether a job ran with a series/movie profile instead of the globals
+        _add_column(cursor, 'processing_history', 'profiled', 'BOOLEAN NOT NULL DEFAULT 0')
+        
+        # Seconds spent in Whisper; zero when the words came from a cache, an index or subtitles
+        _add_column(cursor, 'processing_history', 'transcribe_seconds', 'REAL')
+        
         # Create table for application settings
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS settings (
@@ -87,7 +186,28 @@ def init_db():
             ('boost_db', '6'),
             ('pre_buffer', '100'),
             ('post_buffer', '100'),
-            ('bleeptool', 'S-M-FSM')
+            ('bleeptool', 'S-M-FSM'),
+            ('output_mode', 'file'),
+            ('quick_clean', '1'),
+            ('queue_aging_minutes', '60'),
+            ('max_concurrent_jobs', '1'),
+            ('schedule_profiles', '[]'),
+            ('transcribe_workers', '1'),
+            ('extract_workers', '1'),
+            ('mux_workers', '1'),
+            ('cpu_budget', '0'),
+            ('reserved_cores', '1'),
+            ('job_nice', '10'),
+            ('job_ionice', 'idle'),
+            ('auto_calibrate', '0'),
+            ('calibration_min_agreement', '0.95'),
+            ('min_free_disk_mb', '1024'),
+            ('max_load_per_cpu', '1.5'),
+            ('timeout_factor', '4'),
+            ('min_timeout_seconds', '600'),
+            ('max_attempts', '2'),
+            ('library_roots', ''),
+            ('backfill_scan_workers', '8')
         ]
         
         for key, value in default_settings:
@@ -96,6 +216,9 @@ def init_db():
         # Create indexes
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_bleeparr_items_type ON bleeparr_items (type)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_processing_history_item ON processing_history (item_id, item_type)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_word_index_token ON word_index (token)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_word_index_fingerprint ON word_index (fingerprint)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_media_files_fingerprint ON media_files (fingerprint)")
         
         conn.commit()
         logger.info("Database initialization complete")
@@ -136,8 +259,10 @@ def save_processing_history(item):
         cursor.execute(
             """
             INSERT INTO processing_history 
-            (item_id, item_type, file_path, title, detail, parent_id, swears_found, success, error, processed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            (item_id, item_type, file_path, title, detail, parent_id, swears_found, success, error,
+             fingerprint, output_fingerprint, duration, elapsed_seconds, phase, profiled, transcribe_seconds,
+             processed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             """,
             (
                 item.get('id'),
@@ -148,7 +273,14 @@ def save_processing_history(item):
                 item.get('parent_id'),
                 item.get('result', {}).get('swears_found', 0) if item.get('success', False) else 0,
                 1 if item.get('success', False) else 0,
-                item.get('result', {}).get('error', None) if not item.get('success', False) else None
+                item.get('result', {}).get('error', None) if not item.get('success', False) else None,
+                item.get('result', {}).get('fingerprint'),
+                item.get('result', {}).get('output_fingerprint'),
+                item.get('result', {}).get('duration'),
+                item.get('elapsed_seconds'),
+                item.get('result', {}).get('phase'),
+                1 if item.get('profiled') else 0,
+                item.get('result', {}).get('transcribe_seconds')
             )
         )
         conn.commit()
@@ -180,8 +312,8 @@ def add_to_processing_queue(item):
         cursor.execute(
             """
             INSERT INTO processing_queue 
-            (item_id, item_type, file_path, title, detail, parent_id, manual, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            (item_id, item_type, file_path, title, detail, parent_id, manual, options, priority, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             """,
             (
                 item.get('id'),
@@ -190,17 +322,62 @@ def add_to_processing_queue(item):
                 item.get('title'),
                 item.get('detail', ''),
                 item.get('parent_id'),
-                1 if item.get('manual', False) else 0
+                1 if item.get('manual', False) else 0,
+                json.dumps(item['options']) if item.get('options') else None,
+                item.get('priority', 0)
             )
         )
         conn.commit()
     return True
 
+def add_many_to_processing_queue(items, commit_every=SQL_BATCH_SIZE):
+    """
+    Add many items to the processing queue
+    
+    Rows are inserted in transactions of commit_every rows, so a library
+    backfill costs a handful of commits rather than one per file.
+    
+    Args:
+        items: Queue items as for add_to_processing_queue
+        commit_every: Rows per transaction, or None for a single transaction
+    
+    Returns:
+        Number of rows inserted
+    """
+    rows = [
+        (
+            item.get('id'),
+            item.get('type'),
+            item.get('file_path'),
+            item.get('title'),
+            item.get('detail', ''),
+            item.get('parent_id'),
+            1 if item.get('manual', False) else 0,
+            json.dumps(item['options']) if item.get('options') else None,
+            item.get('priority', 0)
+        )
+        for item in items
+    ]
+    with get_db() as conn:
+        cursor = conn.cursor()
+        step = commit_every or max(len(rows), 1)
+        for start in range(0, len(rows), step):
+            cursor.executemany(
+                """
+                INSERT INTO processing_queue 
+                (item_id, item_type, file_path, title, detail, parent_id, manual, options, priority, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                rows[start:start + step]
+            )
+            conn.commit()
+    return len(rows)
+
 def get_processing_queue():
     """Get all items in the processing queue"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM processing_queue ORDER BY created_at")
+        cursor.execute("SELECT * FROM processing_queue ORDER BY priority DESC, created_at")
         
         columns = [col[0] for col in cursor.description]
         return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -213,8 +390,35 @@ def remove_from_processing_queue(queue_id):
         conn.commit()
     return True
 
-def is_in_queue_or_history(item_id, item_type):
-    """Check if an item is in the queue or history"""
+def get_queue_item(queue_id):
+    """Get one processing queue row by id"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM processing_queue WHERE id = ?", (queue_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        columns = [col[0] for col in cursor.description]
+        return dict(zip(columns, row))
+
+def increment_queue_attempts(queue_id):
+    """Count a failed run of a queued job, returning the new attempt count"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE processing_queue SET attempts = attempts + 1 WHERE id = ?", (queue_id,))
+        cursor.execute("SELECT attempts FROM processing_queue WHERE id = ?", (queue_id,))
+        row = cursor.fetchone()
+        conn.commit()
+    return row[0] if row else 0
+
+def is_in_queue_or_history(item_id, item_type, fingerprint=None):
+    """
+    Check if an item is in the queue or history
+    
+    With a fingerprint, only history for that exact file content counts,
+    either as the source or as a cleaned file written in place, so an
+    upgraded release of an already cleaned episode is queued again.
+    """
     with get_db() as conn:
         cursor = conn.cursor()
         # Check queue
@@ -226,11 +430,288 @@ def is_in_queue_or_history(item_id, item_type):
             return True
             
         # Check history
-        cursor.execute(
-            "SELECT 1 FROM processing_history WHERE item_id = ? AND item_type = ? LIMIT 1", 
-            (item_id, item_type)
-        )
+        if fingerprint:
+            cursor.execute(
+                """
+                SELECT 1 FROM processing_history WHERE item_id = ? AND item_type = ?
+                AND (fingerprint = ? OR output_fingerprint = ?) LIMIT 1
+                """,
+                (item_id, item_type, fingerprint, fingerprint)
+            )
+        else:
+            cursor.execute(
+                "SELECT 1 FROM processing_history WHERE item_id = ? AND item_type = ? LIMIT 1", 
+                (item_id, item_type)
+            )
         if cursor.fetchone():
             return True
             
     return False
+
+def is_in_queue(item_id, item_type):
+    """Check if an item is waiting in the queue"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT 1 FROM processing_queue WHERE item_id = ? AND item_type = ? LIMIT 1",
+            (item_id, item_type)
+        )
+        return cursor.fetchone() is not None
+
+def save_word_index(fingerprint, item, rows):
+    """
+    Replace the word index entries for a media file
+    
+    Args:
+        fingerprint: File fingerprint of the transcript
+        item: Queue item the file belongs to (id, type, file_path, title, detail, parent_id)
+        rows: List of (token, start, end, source) tuples
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM word_index WHERE fingerprint = ?", (fingerprint,))
+        cursor.executemany(
+            "INSERT INTO word_index (token, fingerprint, start, end, source) VALUES (?, ?, ?, ?, ?)",
+            [(token, fingerprint, start, end, source) for token, start, end, source in rows]
+        )
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO indexed_files
+            (fingerprint, item_id, item_type, file_path, title, detail, parent_id, indexed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            (
+                fingerprint,
+                item.get('id'),
+                item.get('type'),
+                item.get('file_path'),
+                item.get('title'),
+                item.get('detail', ''),
+                item.get('parent_id')
+            )
+        )
+        conn.commit()
+    return True
+
+def get_indexed_files_with_tokens(tokens):
+    """Get the indexed files that contain all of the given tokens"""
+    tokens = list(set(tokens))
+    if not tokens:
+        return []
+    with get_db() as conn:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(tokens))
+        cursor.execute(
+            f"""
+            SELECT * FROM indexed_files WHERE fingerprint IN (
+                SELECT fingerprint FROM word_index WHERE token IN ({placeholders})
+                GROUP BY fingerprint HAVING COUNT(DISTINCT token) = ?
+            )
+            """,
+            tokens + [len(tokens)]
+        )
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def get_word_index_entries(fingerprint, tokens):
+    """Get (token, start, end, source) index rows for a file, limited to the given tokens"""
+    tokens = list(tokens)
+    if not tokens:
+        return []
+    with get_db() as conn:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(tokens))
+        cursor.execute(
+            f"SELECT token, start, end, source FROM word_index WHERE fingerprint = ? AND token IN ({placeholders}) ORDER BY start",
+            [fingerprint] + tokens
+        )
+        return cursor.fetchall()
+
+def get_media_file(file_path):
+    """Get the cached media record for a path"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM media_files WHERE file_path = ?", (file_path,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        columns = [col[0] for col in cursor.description]
+        return dict(zip(columns, row))
+
+def get_media_files(file_paths):
+    """Get cached media records for several paths, keyed by path"""
+    file_paths = list(file_paths)
+    records = {}
+    with get_db() as conn:
+        cursor = conn.cursor()
+        # Stay under SQLite's bound-parameter limit on library-sized lists
+        for start in range(0, len(file_paths), SQL_BATCH_SIZE):
+            batch = file_paths[start:start + SQL_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(f"SELECT * FROM media_files WHERE file_path IN ({placeholders})", batch)
+            columns = [col[0] for col in cursor.description]
+            records.update((row[0], dict(zip(columns, row))) for row in cursor.fetchall())
+    return records
+
+def save_media_file(record):
+    """Insert or refresh the cached media record for a path"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO media_files
+            (file_path, size, mtime_ns, fingerprint, duration, audio_streams, codecs, probe, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            (
+                record['file_path'],
+                record['size'],
+                record['mtime_ns'],
+                record['fingerprint'],
+                record.get('duration'),
+                record.get('audio_streams'),
+                record.get('codecs'),
+                record.get('probe')
+            )
+        )
+        conn.commit()
+    return True
+
+def get_processing_rate(limit=50):
+    """
+    Median seconds of processing per second of media over recent successful jobs
+    
+    Only jobs that ran Whisper count. Quick cleans, index re-mutes and jobs
+    served from a cached transcript or subtitles finish in seconds, and
+    would make a real transcription look like it should too.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT elapsed_seconds / duration FROM processing_history
+            WHERE success = 1 AND duration > 0 AND elapsed_seconds > 0 AND transcribe_seconds > 0
+            AND (phase IS NULL OR phase != 'quick')
+            ORDER BY processed_at DESC LIMIT ?
+            """,
+            (limit,)
+        )
+        rates = sorted(row[0] for row in cursor.fetchall())
+    if not rates:
+        return None
+    return rates[len(rates) // 2]
+
+def get_indexed_fingerprints(item_id, item_type):
+    """Get the fingerprints of every indexed file (release) of an item"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT fingerprint FROM indexed_files WHERE item_id = ? AND item_type = ? ORDER BY indexed_at DESC",
+            (item_id, item_type)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+def get_dedupe_index():
+    """
+    Everything needed to tell whether a file was already handled, in three queries
+    
+    Returns:
+        Tuple of (queued (item_id, item_type) pairs, (item_id, item_type)
+        pairs with history, fingerprints with history as source or output)
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT item_id, item_type FROM processing_queue")
+        queued = set(cursor.fetchall())
+        cursor.execute("SELECT DISTINCT item_id, item_type FROM processing_history")
+        history = set(cursor.fetchall())
+        cursor.execute(
+            "SELECT fingerprint FROM processing_history WHERE fingerprint IS NOT NULL "
+            "UNION SELECT output_fingerprint FROM processing_history WHERE output_fingerprint IS NOT NULL"
+        )
+        fingerprints = {row[0] for row in cursor.fetchall()}
+    return queued, history, fingerprints
+
+def replace_arr_files(item_type, rows):
+    """Replace the mirrored arr files of one type in a single transaction"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM arr_files WHERE item_type = ?", (item_type,))
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO arr_files
+            (file_path, item_type, item_id, parent_id, title, detail, root_folder, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """,
+            [
+                (row['file_path'], item_type, row['item_id'], row.get('parent_id'),
+                 row['title'], row.get('detail', ''), row.get('root_folder'))
+                for row in rows
+            ]
+        )
+        conn.commit()
+
+def get_arr_files():
+    """Get the mirrored arr files, keyed by path"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM arr_files")
+        columns = [col[0] for col in cursor.description]
+        return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+def get_item_profile(item_id, item_type):
+    """Get the profile overrides set for a series or movie (only non-NULL fields)"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {', '.join(PROFILE_FIELDS)} FROM bleeparr_items WHERE id = ? AND type = ?",
+            (item_id, item_type)
+        )
+        row = cursor.fetchone()
+    if not row:
+        return {}
+    return {field: value for field, value in zip(PROFILE_FIELDS, row) if value is not None}
+
+def set_item_profile(item_id, item_type, profile):
+    """Replace the profile overrides of a series or movie"""
+    values = [profile.get(field) for field in PROFILE_FIELDS]
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT OR IGNORE INTO bleeparr_items (id, type) VALUES (?, ?)", (item_id, item_type))
+        cursor.execute(
+            f"""
+            UPDATE bleeparr_items SET {', '.join(f'{field} = ?' for field in PROFILE_FIELDS)},
+            updated_at = CURRENT_TIMESTAMP WHERE id = ? AND type = ?
+            """,
+            values + [item_id, item_type]
+        )
+        conn.commit()
+    return True
+
+def get_profile_savings():
+    """
+    Estimate the processing time profiles saved
+    
+    Each profiled job is compared with the median seconds-per-media-second
+    of recent jobs that ran on the global settings.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT profiled, duration, elapsed_seconds FROM processing_history
+            WHERE success = 1 AND duration > 0 AND elapsed_seconds > 0
+            AND (phase IS NULL OR phase != 'quick')
+            ORDER BY processed_at DESC LIMIT 1000
+            """
+        )
+        rows = cursor.fetchall()
+    baseline = sorted(elapsed / duration for profiled, duration, elapsed in rows if not profiled)
+    profiled = [(duration, elapsed) for flag, duration, elapsed in rows if flag]
+    if not baseline:
+        return {'profiled_jobs': len(profiled), 'time_saved_seconds': None}
+    rate = baseline[len(baseline) // 2]
+    return {
+        'profiled_jobs': len(profiled),
+        'time_saved_seconds': round(sum(max(duration * rate - elapsed, 0.0) for duration, elapsed in profiled), 1)
+    }
@@ -0,0 +1,151 @@
+import json
+import logging
+import math
+from datetime import datetime, time
+
+from api.jobs import IONICE_CLASSES
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bleeparr.schedule')
+
+# Job classes a profile can admit, by queue priority class
+JOB_CLASSES = ('manual', 'auto', 'refine', 'backfill')
+
+# Settings a profile may override while it is active
+PROFILE_SETTINGS = (
+    'max_concurrent_jobs', 'transcribe_workers', 'extract_workers', 'mux_workers',
+    'cpu_budget', 'reserved_cores', 'job_nice', 'job_ionice',
+    'max_load_per_cpu', 'min_free_disk_mb'
+)
+
+# Type and (minimum, maximum) of each numeric setting a profile can set
+NUMERIC_SETTINGS = {
+    'max_concurrent_jobs': (int, 1, None),
+    'transcribe_workers': (int, 1, None),
+    'extract_workers': (int, 1, None),
+    'mux_workers': (int, 1, None),
+    'cpu_budget': (int, 0, None),
+    'reserved_cores': (int, 0, None),
+    'job_nice': (int, 0, 19),
+    'max_load_per_cpu': (float, 0.1, None),
+    'min_free_disk_mb': (float, 0, None)
+}
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def _parse_time(value):
+    """Parse 'HH:MM' into a time"""
+    hours, minutes = value.split(':')
+    return time(int(hours), int(minutes))
+
+
+def _setting_error(key, value):
+    """Why a scheduled setting value would break the worker pool, or None if it is valid"""
+    if key == 'job_ionice':
+        if value not in IONICE_CLASSES:
+            return f"must be one of {', '.join(IONICE_CLASSES)}"
+        return None
+    kind, minimum, maximum = NUMERIC_SETTINGS[key]
+    described = "a whole number" if kind is int else "a number"
+    try:
+        if isinstance(value, bool):
+            raise ValueError(value)
+        number = kind(str(value))
+    except ValueError:
+        return f"must be {described}"
+    if not math.isfinite(number) or number < minimum or (maximum is not None and number > maximum):
+        bounds = f"from {minimum} to {maximum}" if maximum is not None else f"of at least {minimum}"
+        return f"must be {described} {bounds}"
+    return None
+
+
+def parse_profiles(text):
+    """
+    Parse and validate schedule profiles
+
+    Profiles are a JSON list, tried in order, for example:
+    [{"name": "evening", "start": "17:00", "end": "23:00",
+      "settings": {"max_concurrent_jobs": 1},
+      "classes": ["manual", "auto", "refine"]},
+     {"name": "overnight", "start": "23:00", "end": "07:00",
+      "settings": {"max_concurrent_jobs": 6}}]
+
+    A window may wrap past midnight. 'days' optionally limits a profile to
+    some weekdays (of the day the window starts), 'classes' to some job
+    classes; without 'classes' every class is admitted.
+
+    Args:
+        text: JSON from the schedule_profiles setting
+
+    Returns:
+        List of profile dictionaries
+
+    Raises:
+        ValueError: If a profile is malformed, or sets a value the worker
+            pool could not use
+    """
+    profiles = json.loads(text or '[]')
+    if not isinstance(profiles, list):
+        raise ValueError("Schedule profiles must be a list")
+    for index, profile in enumerate(profiles):
+        name = profile.get('name') or f"profile {index + 1}"
+        try:
+            _parse_time(profile['start'])
+            _parse_time(profile['end'])
+        except (KeyError, ValueError, AttributeError):
+            raise ValueError(f"{name}: 'start' and 'end' must be HH:MM")
+        unknown = set(profile.get('settings', {})) - set(PROFILE_SETTINGS)
+        if unknown:
+            raise ValueError(f"{name}: settings that cannot be scheduled: {', '.join(sorted(unknown))}")
+        for key, value in profile.get('settings', {}).items():
+            error = _setting_error(key, value)
+            if error:
+                raise ValueError(f"{name}: {key} {error}")
+        unknown = set(profile.get('classes', JOB_CLASSES)) - set(JOB_CLASSES)
+        if unknown:
+            raise ValueError(f"{name}: unknown job classes: {', '.join(sorted(unknown))}")
+        unknown = set(day.lower() for day in profile.get('days', DAYS)) - set(DAYS)
+        if unknown:
+            raise ValueError(f"{name}: unknown days: {', '.join(sorted(unknown))}")
+    return profiles
+
+
+def _is_active(profile, now):
+    """Check whether now falls inside a profile's window"""
+    start, end = _parse_time(profile['start']), _parse_time(profile['end'])
+    current = now.time()
+    days = [day.lower() for day in profile.get('days', DAYS)]
+    today = DAYS[now.weekday()]
+    yesterday = DAYS[(now.weekday() - 1) % 7]
+    if start <= end:
+        return start <= current < end and today in days
+    # Wraps past midnight: the part after midnight belongs to the day it started
+    if current >= start:
+        return today in days
+    return current < end and yesterday in days
+
+
+def active_profile(text, now=None):
+    """
+    Find the schedule profile in force
+
+    Args:
+        text: JSON from the schedule_profiles setting
+        now: Time to evaluate at (default: now, local time)
+
+    Returns:
+        The first matching profile, or None outside every window (or if the
+        profiles are invalid, which is logged)
+    """
+    try:
+        profiles = parse_profiles(text)
+    except ValueError as e:
+        logger.error(f"Ignoring schedule profiles: {e}")
+        return None
+    now = now or datetime.now()
+    for profile in profiles:
+        if _is_active(profile, now):
+            return profile
+    return None
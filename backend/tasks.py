@@ -1,14 +1,30 @@
 import asyncio
+import heapq
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import time
 import logging
 import os
+import json
 from datetime import datetime, timedelta
-from backend.db import get_db
+from backend.db import get_db, get_setting, set_setting, is_in_queue
 from backend.db import add_to_processing_queue, get_processing_queue, remove_from_processing_queue, is_in_queue_or_history, save_processing_history, get_processing_history
+from backend.db import get_processing_rate, get_indexed_fingerprints, get_item_profile, get_profile_savings
+from backend.db import get_queue_item, increment_queue_attempts
+from backend.db import add_many_to_processing_queue, get_dedupe_index, get_arr_files, get_media_files
+from backend.backfill import refresh_arr_mirror, scan_library
 from api.sonarr import SonarrAPI
 from api.radarr import RadarrAPI
 from api.bleeparr_core import process_episode, process_movie
+from api.matcher import get_matcher
+from api.media_files import get_media_record, get_cached_durations
+from backend.admission import job_requirements, check_admission
+from backend.schedule import JOB_CLASSES, active_profile
+from api.jobs import start_job, finish_job, cancel_job, running_jobs
+from api.stages import configure_stages, stage_stats
+from api.calibration import apply_calibration, calibration_needed, calibration_stale, run_calibration
+from api.transcriber import WhisperModel, set_thread_budget
+from api.word_index import index_transcript, plan_swear_changes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -18,20 +34,67 @@ logger = logging.getLogger('bleeparr.tasks')
 POLL_INTERVAL = 300  # 5 minutes in seconds
 SONARR_AVAILABLE = True
 RADARR_AVAILABLE = False  # Set to True if Radarr is available and configured
-PROCESSING_QUEUE = []
-PROCESSING_HISTORY = []
 MAX_HISTORY = 100
 
+# Priority classes of queued jobs, highest first. Refine jobs wait behind
+# every new import's quick clean, backfill behind everything else.
+PRIORITY_MANUAL = 1
+PRIORITY_AUTO = 0
+PRIORITY_REFINE = -1
+PRIORITY_BACKFILL = -2
+
+# Job class of each priority, as named in schedule profiles
+JOB_CLASS_NAMES = {
+    PRIORITY_MANUAL: 'manual',
+    PRIORITY_AUTO: 'auto',
+    PRIORITY_REFINE: 'refine',
+    PRIORITY_BACKFILL: 'backfill'
+}
+
+# Seconds between schedule profile checks while jobs are running
+SCHEDULE_RECHECK_SECONDS = 60
+
+# Name of the schedule profile in force, None outside every profile
+ACTIVE_PROFILE = {'name': None}
+
+# Progress and outcome of the library backfill
+BACKFILL_STATUS = {'running': False, 'last': None}
+BACKFILL_LOCK = threading.Lock()
+
+# Queue id -> why the admission check is holding the job back
+DEFERRED = {}
+
+# Seconds of processing per second of media assumed before any job has finished
+DEFAULT_PROCESSING_RATE = 1.0
+
+# Jobs run on their own threads, which are reniced and stay that way
+JOB_EXECUTOR = ThreadPoolExecutor(thread_name_prefix='bleeparr-job')
+
+# Thread budget handed to the jobs started in the current cycle
+THREAD_BUDGET = {}
+
 def polling_task():
     """Thread function for running the polling loop"""
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     loop.run_until_complete(poll_loop())
 
+def _queue_finished(task):
+    """Log a queue worker that stopped on an error"""
+    if not task.cancelled() and task.exception():
+        logger.error(f"Error processing queue: {task.exception()}")
+
 async def poll_loop():
-    """Main polling loop that runs continuously"""
+    """
+    Main polling loop that runs continuously
+    
+    The queue worker runs as its own task, so Sonarr and Radarr are still
+    polled every POLL_INTERVAL while a long backfill is being worked off,
+    and new imports join the queue ahead of it.
+    """
     logger.info("Starting polling loop")
     last_poll = datetime.now() - timedelta(minutes=10)  # Start by running immediately
+    queue_task = None
     
     while True:
         try:
@@ -49,8 +112,15 @@ async def poll_loop():
                     logger.info("Polling Radarr for new movies...")
                     await poll_radarr()
                 
-                # Process any items in the queue
-                await process_queue()
+                # Re-clean only the files a swears.txt edit affects
+                check_swear_list()
+                
+                # Process any items in the queue, unless the worker is still at it
+                if queue_task is None or queue_task.done():
+                    # Tune inference for this CPU before it transcribes anything
+                    await ensure_calibration()
+                    queue_task = asyncio.create_task(process_queue())
+                    queue_task.add_done_callback(_queue_finished)
                 
                 logger.info("Polling cycle complete")
         
@@ -60,6 +130,23 @@ async def poll_loop():
         # Sleep before next iteration check
         await asyncio.sleep(10)  # Check every 10 seconds if it's time to poll again
 
+async def ensure_calibration():
+    """
+    Calibrate Whisper inference when this hardware has not been measured yet
+    
+    With auto_calibrate on, runs on first start. Whatever that flag says, a
+    stored calibration is redone after the container moves to a different
+    CPU, since the old tuning no longer applies. Then applies the stored
+    settings (a calibration run from the command line is picked up here too).
+    """
+    wanted = calibration_stale() or (get_setting('auto_calibrate', '0') == '1' and calibration_needed())
+    if wanted and WhisperModel is not None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, run_calibration)
+        except Exception as e:
+            logger.error(f"Calibration failed, using default inference settings: {e}")
+    apply_calibration()
+
 async def poll_sonarr():
     """Check Sonarr for new downloads or imports and queue them for processing"""
     try:
@@ -132,9 +219,8 @@ async def poll_sonarr():
                         'timestamp': datetime.now().isoformat()
                     }
                     
-                    # Add to queue if not already in queue or recently processed
-                    if not is_in_queue_or_history(queue_item):
-                        PROCESSING_QUEUE.append(queue_item)
+                    # Add to queue unless this exact file is already queued or cleaned
+                    if queue_if_new(queue_item):
                         logger.info(f"Queued episode for processing: {series_title} - {episode_info}")
         
     except Exception as e:
@@ -196,32 +282,221 @@ async def poll_radarr():
                         'timestamp': datetime.now().isoformat()
                     }
                     
-                    # Add to queue if not already in queue or recently processed
-                    if not is_in_queue_or_history(queue_item):
-                        PROCESSING_QUEUE.append(queue_item)
+                    # Add to queue unless this exact file is already queued or cleaned
+                    if queue_if_new(queue_item):
                         logger.info(f"Queued movie for processing: {movie_title}")
         
     except Exception as e:
         logger.error(f"Error polling Radarr: {e}")
 
-def is_in_queue_or_history(item):
-    """Check if an item is already in the queue or has been recently processed"""
-    item_path = item.get('file_path')
+def queue_if_new(queue_item):
+    """
+    Queue an item unless this exact file is already queued or cleaned
+    
+    History is matched on the file fingerprint as well as the item id, so
+    an upgraded release of a cleaned episode is queued while the same file
+    seen again is not.
+    """
+    fingerprint = None
+    try:
+        fingerprint = get_media_record(queue_item['file_path'])['fingerprint']
+    except Exception as e:
+        logger.warning(f"Could not fingerprint {queue_item['file_path']}: {e}")
+    
+    if is_in_queue_or_history(queue_item['id'], queue_item['type'], fingerprint):
+        return False
+    queue_item['options'] = dict(
+        profile_options(queue_item['type'], queue_item['id'], queue_item.get('parent_id')),
+        **(queue_item.get('options') or {})
+    )
+    add_to_processing_queue(queue_item)
+    return True
+
+def profile_options(item_type, item_id, parent_id=None):
+    """
+    Resolve the processing profile of an item into engine options
+    
+    Episodes use their series' profile, movies their own.
+    """
+    profile = get_item_profile(parent_id if item_type == 'show' and parent_id else item_id, item_type)
+    if not profile:
+        return {}
+    options = {'profiled': True}
+    for field in ('bleeptool', 'boost_db', 'output_mode'):
+        if field in profile:
+            options[field] = profile[field]
+    models = {code: profile[field] for code, field in (('S', 'small_model'), ('M', 'medium_model')) if field in profile}
+    if models:
+        options['models'] = models
+    return options
+
+def engine_options():
+    """Engine settings from the settings table, as process_file keyword arguments"""
+    return {
+        'boost_db': float(get_setting('boost_db', '6')),
+        'pre_buffer': float(get_setting('pre_buffer', '100')),
+        'post_buffer': float(get_setting('post_buffer', '100')),
+        'bleeptool': get_setting('bleeptool', 'S-M-FSM'),
+        'output_mode': get_setting('output_mode', 'file')
+    }
+
+def swears_path():
+    """The swear list jobs clean with, and that swear list edits are detected in"""
+    return get_setting('swears_file', os.getenv('SWEARS_FILE', 'swears.txt'))
+
+def wants_quick_clean(options, priority=PRIORITY_AUTO):
+    """Check whether a job should start with a subtitle-only quick clean"""
+    if options.get('phase') or options.get('mute_plan') is not None:
+        return False
+    # Nobody is waiting to watch a backfilled file
+    if get_setting('quick_clean', '1') != '1' or priority == PRIORITY_BACKFILL:
+        return False
+    passes = options.get('bleeptool', 'S-M-FSM').upper().split('-')
+    return 'S' in passes or 'M' in passes
+
+def queue_refine(item, result, options):
+    """Queue the Whisper phase that replaces a quick clean, with the same queued options"""
+    # Track mode rewrote (and may have moved) the source, refine that file
+    file_path = item['file_path']
+    if result.get('output_mode') == 'track' and result.get('output_path'):
+        file_path = result['output_path']
+    add_to_processing_queue({
+        'type': item['item_type'],
+        'file_path': file_path,
+        'title': item['title'],
+        'detail': item['detail'],
+        'id': item['item_id'],
+        'parent_id': item['parent_id'],
+        'priority': PRIORITY_REFINE,
+        'options': dict(options, phase='refine')
+    })
+    logger.info(f"Queued refined clean for {item['title']} - {item['detail']}")
+
+def schedule_queue(queue_items):
+    """
+    Order queued items the way the worker will run them
+    
+    Higher priority classes go first. Every queue_aging_minutes of waiting
+    lifts an item one class, so backfill is never starved for good. Within
+    a class the shortest expected job goes first, from cached durations.
+    
+    Returns:
+        The items sorted, each annotated with 'expected_seconds' and
+        'effective_priority'
+    """
+    durations = get_cached_durations(item['file_path'] for item in queue_items)
+    known = [d for d in durations.values() if d]
+    # Never probed yet: assume a typical file rather than jumping the queue
+    typical = sum(known) / len(known) if known else 0.0
+    rate = get_processing_rate()
+    aging_seconds = float(get_setting('queue_aging_minutes', '60')) * 60
+    now = datetime.utcnow()
+    
+    for item in queue_items:
+        item['duration'] = durations.get(item['file_path'])
+        expected = (item['duration'] or typical) * rate if rate else None
+        item['expected_seconds'] = round(expected, 1) if expected is not None else None
+        waited = (now - datetime.strptime(item['created_at'], '%Y-%m-%d %H:%M:%S')).total_seconds()
+        boost = int(waited // aging_seconds) if aging_seconds > 0 else 0
+        priority = item.get('priority') or 0
+        item['effective_priority'] = max(priority, min(priority + boost, PRIORITY_MANUAL))
     
-    # Check queue
-    for queue_item in PROCESSING_QUEUE:
-        if queue_item.get('file_path') == item_path:
-            return True
+    return sorted(
+        queue_items,
+        key=lambda item: (-item['effective_priority'], item['duration'] or typical, item['created_at'], item['id'])
+    )
+
+def job_options(item):
+    """Engine options a queued item will run with"""
+    options = engine_options()
+    if item.get('options'):
+        options.update(json.loads(item['options']))
+    # Earlier releases of the same episode or movie can lend their transcript
+    options.setdefault('releases', get_indexed_fingerprints(item['item_id'], item['item_type']))
+    if wants_quick_clean(options, item.get('priority')):
+        options['phase'] = 'quick'
+    return options
+
+def pool_setting(key, default, profile=None):
+    """A worker-pool setting, as overridden by the active schedule profile"""
+    if profile and key in profile.get('settings', {}):
+        return str(profile['settings'][key])
+    return get_setting(key, default)
+
+def current_profile():
+    """The schedule profile in force, logging when it changes"""
+    profile = active_profile(get_setting('schedule_profiles', '[]'))
+    name = profile.get('name', f"{profile['start']}-{profile['end']}") if profile else None
+    if name != ACTIVE_PROFILE['name']:
+        logger.info(f"Schedule profile: {name or 'none (using global settings)'}")
+        ACTIVE_PROFILE['name'] = name
+    return profile
+
+def fail_queue_item(item, error):
+    """Record a queued item as failed without running it and take it off the queue"""
+    logger.error(f"Failed {item['title']} - {item['detail']}: {error}")
+    save_processing_history({
+        'id': item['item_id'],
+        'type': item['item_type'],
+        'file_path': item['file_path'],
+        'title': item['title'],
+        'detail': item['detail'],
+        'parent_id': item['parent_id'],
+        'success': False,
+        'result': {'success': False, 'error': error}
+    })
+    remove_from_processing_queue(item['id'])
+    DEFERRED.pop(item['id'], None)
+
+def admit_job(item, options, running, profile=None):
+    """
+    Check whether a queued item can start next to the running jobs
     
-    # Check history
-    for history_item in PROCESSING_HISTORY:
-        if history_item.get('file_path') == item_path:
-            return True
+    An item whose file can no longer be read (deleted or moved since it
+    was queued) is failed and removed, so it cannot hold up the queue.
     
-    return False
+    Returns:
+        Tuple of (requirements, deferral reason or None); both are None if
+        the item was failed and removed
+    """
+    if profile:
+        job_class = JOB_CLASS_NAMES.get(item.get('priority'), 'auto')
+        if job_class not in profile.get('classes', JOB_CLASSES):
+            return None, f"{job_class.capitalize()} jobs are paused by the '{ACTIVE_PROFILE['name']}' schedule"
+    try:
+        media = get_media_record(item['file_path'])
+    except Exception as e:
+        logger.warning(f"Could not read media metadata for {item['file_path']}: {e}")
+        media = None
+    try:
+        requirements = job_requirements(item, options, media, get_setting('output_directory', ''))
+    except OSError as e:
+        fail_queue_item(item, f"Cannot read {item['file_path']}: {e}")
+        return None, None
+    reason = check_admission(
+        requirements,
+        list(running.values()),
+        min_free_disk_mb=float(pool_setting('min_free_disk_mb', '1024', profile)),
+        max_load_per_cpu=float(pool_setting('max_load_per_cpu', '1.5', profile))
+    )
+    return requirements, reason
 
 async def process_queue():
-    """Process items in the queue"""
+    """
+    Process items in the queue
+    
+    Jobs run as a pipeline: while one file is in Whisper, the next can be
+    decoded and the previous one muxed, within the job cap and stage slots
+    of pool_limits(). Before each
+    start the schedule is re-read, so a manual request queued mid-run goes
+    next, and the admission check defers jobs the host has no memory, disk
+    or CPU for. Deferred jobs are retried whenever a running job finishes.
+    
+    The active schedule profile can lower or raise the pool sizes and
+    pause job classes. It is re-checked at least every minute while jobs
+    run, so a new window takes effect without a restart: shrinking lets
+    running jobs finish, growing starts more at once.
+    """
     queue_items = get_processing_queue()
     logger.info(f"Checking processing queue, currently contains {len(queue_items)} items")
     
@@ -230,61 +505,294 @@ async def process_queue():
     
     logger.info(f"Processing queue with {len(queue_items)} items")
     
-    for item in queue_items:
-        try:
-            logger.info(f"Processing {item['item_type']}: {item['title']} - {item['detail']}")
+    loop = asyncio.get_running_loop()
+    running = {}
+    requirements = {}
+    attempted = set()
+    while True:
+        profile = current_profile()
+        max_jobs, limits = pool_limits(profile)
+        configure_stages(limits)
+        budget = thread_budget(limits, profile)
+        if budget != THREAD_BUDGET:
+            logger.info(f"Thread budget: {budget['cores']} cores, {budget['inference_threads']} inference threads "
+                        f"per transcription, {budget['ffmpeg_threads']} per ffmpeg")
+            THREAD_BUDGET.clear()
+            THREAD_BUDGET.update(budget)
+        # Every transcribing job shares one model instance
+        set_thread_budget(budget['inference_threads'], limits['transcribe'])
+        pending = [item for item in get_processing_queue() if item['id'] not in attempted]
+        for item in schedule_queue(pending):
+            if len(running) >= max_jobs:
+                break
+            options = job_options(item)
+            needs, reason = admit_job(item, options, requirements, profile)
+            if needs is None and reason is None:
+                # Failed and removed, move on to the next candidate
+                attempted.add(item['id'])
+                continue
+            if reason:
+                if DEFERRED.get(item['id'], {}).get('reason') != reason:
+                    logger.info(f"Deferring {item['title']} - {item['detail']}: {reason}")
+                DEFERRED[item['id']] = {'reason': reason, 'since': DEFERRED.get(item['id'], {}).get('since', datetime.now().isoformat())}
+                continue
+            DEFERRED.pop(item['id'], None)
+            attempted.add(item['id'])
+            future = loop.run_in_executor(JOB_EXECUTOR, process_item, item, options, budget)
+            running[future] = item
+            requirements[future] = needs
+        
+        if not running:
+            # Everything left is deferred, try again next cycle
+            return
+        done, _ = await asyncio.wait(running, timeout=SCHEDULE_RECHECK_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            running.pop(future)
+            requirements.pop(future)
+
+def pool_limits(profile=None):
+    """
+    Job cap and per-stage slots of the worker pool
+    
+    max_concurrent_jobs caps the jobs in flight and defaults to one file at
+    a time. Inside that cap, transcribe_workers, extract_workers and
+    mux_workers bound each stage, so with max_concurrent_jobs at 3 the next
+    file decodes and the previous one muxes while one is in Whisper.
+    
+    Returns:
+        Tuple of (max_jobs, slots per stage)
+    """
+    max_jobs = max(int(pool_setting('max_concurrent_jobs', '1', profile)), 1)
+    limits = {
+        stage: min(max(int(pool_setting(key, '1', profile)), 1), max_jobs)
+        for stage, key in (('extract', 'extract_workers'), ('transcribe', 'transcribe_workers'), ('mux', 'mux_workers'))
+    }
+    return max_jobs, limits
+
+def usable_cores():
+    """CPUs this process may run on (respects affinity and cpusets)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def thread_budget(limits, profile=None):
+    """
+    Split the global core budget between the jobs that can run at once
+    
+    The budget is cpu_budget cores, or every usable core minus
+    reserved_cores so the API and the poller stay responsive. Each ffmpeg
+    gets a small share, since audio decode and filtering barely scale, and
+    the transcribe slots divide what is left, so a full pipeline never asks
+    for more threads than the budget.
+    
+    Args:
+        limits: Slots per pipeline stage
+        profile: Active schedule profile, whose settings take precedence
+        
+    Returns:
+        Dictionary with 'cores', 'inference_threads', 'ffmpeg_threads',
+        'nice' and 'ionice'
+    """
+    cores = int(pool_setting('cpu_budget', '0', profile)) or usable_cores() - int(pool_setting('reserved_cores', '1', profile))
+    cores = max(cores, 1)
+    io_slots = limits['extract'] + limits['mux']
+    ffmpeg_threads = max(cores // (2 * (io_slots + limits['transcribe'])), 1)
+    inference_threads = max((cores - io_slots * ffmpeg_threads) // limits['transcribe'], 1)
+    return {
+        'cores': cores,
+        'inference_threads': inference_threads,
+        'ffmpeg_threads': ffmpeg_threads,
+        'nice': int(pool_setting('job_nice', '10', profile)),
+        'ionice': pool_setting('job_ionice', 'idle', profile)
+    }
+
+def job_timeout(item):
+    """
+    Watchdog timeout for a job
+    
+    A generous multiple of how long the file should take at the recent
+    processing rate, never below min_timeout_seconds.
+    """
+    minimum = float(get_setting('min_timeout_seconds', '600'))
+    duration = get_cached_durations([item['file_path']]).get(item['file_path'])
+    if not duration:
+        return None
+    # Whisper on CPU runs at about real time before any history exists
+    rate = get_processing_rate() or DEFAULT_PROCESSING_RATE
+    return max(minimum, duration * rate * float(get_setting('timeout_factor', '4')))
+
+def cancel_queue_item(queue_id):
+    """
+    Cancel a queued or running job
+    
+    A running job has its process tree killed and its partial output
+    removed by the engine; a waiting job is just taken off the queue.
+    
+    Returns:
+        'cancelled', 'removed', or None if there is no such queue item
+    """
+    if cancel_job(queue_id, "Cancelled by user"):
+        return 'cancelled'
+    if not get_queue_item(queue_id):
+        return None
+    remove_from_processing_queue(queue_id)
+    DEFERRED.pop(queue_id, None)
+    logger.info(f"Removed queue item {queue_id}")
+    return 'removed'
+
+def process_item(item, options, budget=None):
+    """Run one queued item through the engine and record the outcome"""
+    job = start_job(item['id'], job_timeout(item), budget)
+    try:
+        logger.info(f"Processing {item['item_type']}: {item['title']} - {item['detail']}")
+        
+        options = dict(options)
+        profiled = options.pop('profiled', False)
+        
+        result = None
+        started = time.monotonic()
+        if item['item_type'] == 'show':
+            result = process_episode(
+                item['file_path'],
+                item['title'],
+                item['detail'],
+                swears_file=swears_path(),
+                **options
+            )
+        elif item['item_type'] == 'movie':
+            result = process_movie(
+                item['file_path'],
+                item['title'],
+                swears_file=swears_path(),
+                **options
+            )
+        
+        # Add to history and remove from queue
+        if result:
+            process_result = {
+                'id': item['item_id'],
+                'type': item['item_type'],
+                'file_path': item['file_path'],
+                'title': item['title'],
+                'detail': item['detail'],
+                'parent_id': item['parent_id'],
+                'success': result.get('success', False),
+                'result': result,
+                'elapsed_seconds': round(time.monotonic() - started, 1),
+                'profiled': profiled
+            }
             
-            result = None
-            if item['item_type'] == 'show':
-                result = process_episode(
-                    item['file_path'],
-                    item['title'],
-                    item['detail']
-                )
-            elif item['item_type'] == 'movie':
-                result = process_movie(
-                    item['file_path'],
-                    item['title']
-                )
+            # Save to history
+            save_processing_history(process_result)
             
-            # Add to history and remove from queue
-            if result:
-                process_result = {
-                    'id': item['item_id'],
-                    'type': item['item_type'],
-                    'file_path': item['file_path'],
-                    'title': item['title'],
-                    'detail': item['detail'],
-                    'parent_id': item['parent_id'],
-                    'success': result.get('success', False),
-                    'result': result
-                }
-                
-                # Save to history
-                save_processing_history(process_result)
-                
-                # Log result
-                if result.get('success'):
-                    logger.info(f"Successfully processed {item['item_type']}: {item['title']} - {item['detail']}")
-                    logger.info(f"Found {result.get('swears_found', 0)} swear words")
-                else:
-                    logger.error(f"Failed to process {item['item_type']}: {item['title']} - {item['detail']}")
-                    logger.error(f"Error: {result.get('error', 'Unknown error')}")
-                
-                # Remove from queue
-                remove_from_processing_queue(item['id'])
-        
-        except Exception as e:
-            logger.error(f"Error processing queue item: {e}")
+            # The quick clean is out, queue the full one behind everything else
+            if result.get('success') and result.get('phase') == 'quick':
+                queue_refine(item, result, json.loads(item['options']) if item.get('options') else {})
+            
+            # Keep the word index in step with the stored transcript
+            if result.get('transcript_saved'):
+                try:
+                    index_transcript(result['fingerprint'], process_result)
+                except Exception as e:
+                    logger.error(f"Error indexing transcript for {item['file_path']}: {e}")
+            
+            # Log result
+            if result.get('success'):
+                logger.info(f"Successfully processed {item['item_type']}: {item['title']} - {item['detail']}")
+                logger.info(f"Found {result.get('swears_found', 0)} swear words")
+            else:
+                logger.error(f"Failed to process {item['item_type']}: {item['title']} - {item['detail']}")
+                logger.error(f"Error: {result.get('error', 'Unknown error')}")
+            
+            # Timed out runs go back to the queue until max_attempts is used up
+            if result.get('timed_out'):
+                attempts = increment_queue_attempts(item['id'])
+                if attempts < int(get_setting('max_attempts', '2')):
+                    logger.info(f"Will retry {item['title']} - {item['detail']} (attempt {attempts + 1})")
+                    return
+            
+            # Remove from queue
+            remove_from_processing_queue(item['id'])
+    
+    except Exception as e:
+        logger.error(f"Error processing queue item: {e}")
+    finally:
+        finish_job(job)
+
+def check_swear_list():
+    """Requeue indexed files affected by a change to the swear list"""
+    swears_file = swears_path()
+    if not os.path.exists(swears_file):
+        return
+    
+    current = sorted(get_matcher(swears_file).phrases)
+    snapshot = get_setting('swears_snapshot')
+    if snapshot is None:
+        # First run, nothing was cleaned against an older list
+        set_setting('swears_snapshot', json.dumps(current))
+        return
+    
+    previous = json.loads(snapshot)
+    if previous == current:
+        return
+    
+    fallback = 'FSM' in get_setting('bleeptool', 'S-M-FSM').upper().split('-')
+    requeued = 0
+    for record in plan_swear_changes(previous, current, fallback):
+        if is_in_queue(record['item_id'], record['item_type']):
+            continue
+        if not os.path.exists(record['file_path']):
+            logger.warning(f"Indexed file no longer exists: {record['file_path']}")
+            continue
+        add_to_processing_queue({
+            'type': record['item_type'],
+            'file_path': record['file_path'],
+            'title': record['title'],
+            'detail': record['detail'],
+            'id': record['item_id'],
+            'parent_id': record['parent_id'],
+            'options': dict(
+                profile_options(record['item_type'], record['item_id'], record['parent_id']),
+                mute_plan=record['mute_plan']
+            )
+        })
+        requeued += 1
+    
+    set_setting('swears_snapshot', json.dumps(current))
+    logger.info(f"Swear list changed, requeued {requeued} affected files")
 
 def get_processing_status():
     """Get current processing status"""
-    queue = get_processing_queue()
+    queue = schedule_queue(get_processing_queue())
     history = get_processing_history(limit=20)
+    running = running_jobs()
+    
+    # Positions and start times in the order the worker will take them. Jobs
+    # run side by side, so each item starts when the earliest of the pool's
+    # slots frees up; running jobs hold a slot for what they have left.
+    max_jobs, _ = pool_limits(current_profile())
+    slots = [
+        max((item['expected_seconds'] or 0.0) - (time.monotonic() - running[item['id']].started), 0.0)
+        for item in queue if item['id'] in running
+    ]
+    heapq.heapify(slots)
+    now = datetime.now()
+    for position, item in enumerate(queue, 1):
+        item['position'] = position
+        item['running'] = item['id'] in running
+        eta = 0.0
+        if not item['running']:
+            while len(slots) >= max_jobs:
+                eta = heapq.heappop(slots)
+            heapq.heappush(slots, eta + (item['expected_seconds'] or 0.0))
+        item['eta_seconds'] = round(eta, 1) if item['expected_seconds'] is not None else None
+        item['expected_start'] = (now + timedelta(seconds=eta)).isoformat() if item['eta_seconds'] is not None else None
+        item['deferred'] = DEFERRED.get(item['id'])
     
     return {
         'queue': queue,
         'history': history,
+        'stats': {'profiles': get_profile_savings(), 'stages': stage_stats(), 'threads': dict(THREAD_BUDGET), 'schedule': ACTIVE_PROFILE['name']},
         'sonarr_available': SONARR_AVAILABLE,
         'radarr_available': RADARR_AVAILABLE
     }
@@ -298,17 +806,297 @@ def add_to_queue(item_type, item_id, file_path, title, detail="", parent_id=None
         'detail': detail,
         'id': item_id,
         'parent_id': parent_id or item_id,
-        'manual': True
+        'manual': True,
+        'priority': PRIORITY_MANUAL
     }
     
-    if not is_in_queue_or_history(item_id, item_type):
-        add_to_processing_queue(queue_item)
+    if queue_if_new(queue_item):
         logger.info(f"Manually queued {item_type} for processing: {title}")
         return True
     else:
         logger.info(f"Item already in queue or recently processed: {title}")
         return False
 
+def handled_status(key, record, size, mtime_ns, queued, history, fingerprints):
+    """
+    Tell whether a file was already handled, from get_dedupe_index() sets
+    
+    A cached media record still matching the file's size and mtime gives
+    its fingerprint without reading the file; without one, any history for
+    the item counts.
+    
+    Returns:
+        'already_queued', 'already_processed', or None if the file is new
+    """
+    if key in queued:
+        return 'already_queued'
+    if record and record['size'] == size and record['mtime_ns'] == mtime_ns:
+        if record['fingerprint'] in fingerprints:
+            return 'already_processed'
+    elif key in history:
+        return 'already_processed'
+    return None
+
+def _episode_detail(episode):
+    return f"S{episode.get('seasonNumber', 0):02d}E{episode.get('episodeNumber', 0):02d} - {episode.get('title', 'Unknown')}"
+
+def _resolve_bulk_items(episode_ids, movie_ids, series_ids):
+    """
+    Resolve ids to files with batched Sonarr/Radarr calls
+    
+    Episodes are fetched by id and their files by file id, a request per
+    hundred ids each; series titles come from one series list. Series are
+    expanded to every episode that has a file, with one call for their
+    episodes and one for their files. Movies all come from one movie list.
+    Items whose lookup failed (timeout, server error) get status 'error'
+    and the message as 'error', so they are not mistaken for unknown ids.
+    
+    Returns:
+        List of per-item dictionaries with 'type', 'id', 'parent_id',
+        'title', 'detail', 'file_path' and a 'status' for unresolved items
+    """
+    results = []
+    episode_ids = list(dict.fromkeys(int(i) for i in episode_ids))
+    series_ids = list(dict.fromkeys(int(i) for i in series_ids))
+    movie_ids = list(dict.fromkeys(int(i) for i in movie_ids))
+    
+    if episode_ids or series_ids:
+        url, api_key = os.getenv("SONARR_URL"), os.getenv("SONARR_API_KEY")
+        if not url or not api_key:
+            results.extend({'type': 'show', 'id': i, 'status': 'not_configured'} for i in episode_ids)
+            results.extend({'type': 'series', 'id': i, 'status': 'not_configured'} for i in series_ids)
+        else:
+            api = SonarrAPI(url, api_key)
+            series_titles = {series['id']: series.get('title') for series in api.get_series_list()}
+            series_error = api.last_error
+            
+            episodes, failed = api.get_episodes_by_ids(episode_ids) if episode_ids else ([], {})
+            episodes = {episode['id']: episode for episode in episodes}
+            file_ids = [episode['episodeFileId'] for episode in episodes.values() if episode.get('episodeFileId')]
+            files, failed_files = api.get_episode_files_by_ids(file_ids) if file_ids else ([], {})
+            files = {f['id']: f.get('path') for f in files}
+            for episode_id in episode_ids:
+                episode = episodes.get(episode_id)
+                if not episode:
+                    if episode_id in failed:
+                        results.append({'type': 'show', 'id': episode_id, 'status': 'error', 'error': failed[episode_id]})
+                    else:
+                        results.append({'type': 'show', 'id': episode_id, 'status': 'not_found'})
+                    continue
+                item = {
+                    'type': 'show',
+                    'id': episode_id,
+                    'parent_id': episode.get('seriesId') or episode_id,
+                    'title': series_titles.get(episode.get('seriesId'), 'Unknown Series'),
+                    'detail': _episode_detail(episode),
+                    'file_path': files.get(episode.get('episodeFileId'))
+                }
+                if episode.get('episodeFileId') in failed_files:
+                    item.update(status='error', error=failed_files[episode['episodeFileId']])
+                elif not item['file_path']:
+                    item['status'] = 'no_file'
+                results.append(item)
+            
+            for series_id in series_ids:
+                if series_id not in series_titles:
+                    if series_error:
+                        results.append({'type': 'series', 'id': series_id, 'status': 'error', 'error': series_error})
+                    else:
+                        results.append({'type': 'series', 'id': series_id, 'status': 'not_found'})
+                    continue
+                files = {f['id']: f.get('path') for f in api.get_episode_files(series_id) if f.get('path')}
+                error = api.last_error
+                series_episodes = api.get_episodes_by_series_id(series_id) if not error else []
+                error = error or api.last_error
+                if error:
+                    results.append({'type': 'series', 'id': series_id, 'title': series_titles[series_id],
+                                    'status': 'error', 'error': error})
+                    continue
+                for episode in series_episodes:
+                    path = files.get(episode.get('episodeFileId'))
+                    if path and episode['id'] not in episodes:
+                        results.append({
+                            'type': 'show',
+                            'id': episode['id'],
+                            'parent_id': series_id,
+                            'title': series_titles[series_id],
+                            'detail': _episode_detail(episode),
+                            'file_path': path
+                        })
+    
+    if movie_ids:
+        url, api_key = os.getenv("RADARR_URL"), os.getenv("RADARR_API_KEY")
+        if not url or not api_key:
+            results.extend({'type': 'movie', 'id': i, 'status': 'not_configured'} for i in movie_ids)
+        else:
+            api = RadarrAPI(url, api_key)
+            movies = {movie['id']: movie for movie in api.get_movie_list()}
+            if api.last_error:
+                results.extend({'type': 'movie', 'id': i, 'status': 'error', 'error': api.last_error} for i in movie_ids)
+                movie_ids = []
+            for movie_id in movie_ids:
+                movie = movies.get(movie_id)
+                if not movie:
+                    results.append({'type': 'movie', 'id': movie_id, 'status': 'not_found'})
+                    continue
+                item = {
+                    'type': 'movie',
+                    'id': movie_id,
+                    'parent_id': movie_id,
+                    'title': movie.get('title', 'Unknown Movie'),
+                    'detail': f"{movie.get('year', '')}",
+                    'file_path': (movie.get('movieFile') or {}).get('path')
+                }
+                if not item['file_path']:
+                    item['status'] = 'no_file'
+                results.append(item)
+    return results
+
+def bulk_enqueue(episode_ids=(), movie_ids=(), series_ids=()):
+    """
+    Manually queue many episodes, movies and whole series at once
+    
+    Files are resolved with batched arr calls, checked against the queue
+    and history from three queries (fingerprinting only files that have
+    history but no fresh cache record, as queue_if_new would), and every
+    new row is inserted in a single transaction.
+    
+    Args:
+        episode_ids: Sonarr episode IDs
+        movie_ids: Radarr movie IDs
+        series_ids: Sonarr series IDs, expanded to their episodes with files
+        
+    Returns:
+        List with a dictionary per item: 'type', 'id', 'status' ('queued',
+        'already_queued', 'already_processed', 'no_file', 'not_found',
+        'not_configured' or 'error', with the message as 'error') and, once
+        resolved, 'title', 'detail', 'file_path'
+    """
+    results = _resolve_bulk_items(episode_ids, movie_ids, series_ids)
+    pending = [item for item in results if 'status' not in item]
+    cached = get_media_files(item['file_path'] for item in pending)
+    queued, history, fingerprints = get_dedupe_index()
+    
+    items = []
+    profiles = {}
+    for item in pending:
+        key = (item['id'], item['type'])
+        path = item['file_path']
+        record = cached.get(path)
+        try:
+            stat = os.stat(path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size = mtime_ns = None
+        if key in history and key not in queued and not record and size is not None:
+            # Previously cleaned item without a cached record: fingerprint it
+            try:
+                record = get_media_record(path)
+            except Exception as e:
+                logger.warning(f"Could not fingerprint {path}: {e}")
+        item['status'] = handled_status(key, record, size, mtime_ns, queued, history, fingerprints)
+        if item['status']:
+            continue
+        
+        profile_key = (item['type'], item['parent_id'] if item['type'] == 'show' else item['id'])
+        if profile_key not in profiles:
+            profiles[profile_key] = profile_options(item['type'], item['id'], item['parent_id'])
+        items.append(dict(item, manual=True, priority=PRIORITY_MANUAL, options=profiles[profile_key]))
+        item['status'] = 'queued'
+        queued.add(key)
+    
+    add_many_to_processing_queue(items, commit_every=None)
+    logger.info(f"Bulk queued {len(items)} of {len(results)} items")
+    return [{field: item[field] for field in ('type', 'id', 'status', 'error', 'title', 'detail', 'file_path') if field in item}
+            for item in results]
+
+def claim_backfill():
+    """Mark a backfill as running, unless one already is; returns whether it was claimed"""
+    with BACKFILL_LOCK:
+        if BACKFILL_STATUS['running']:
+            return False
+        BACKFILL_STATUS['running'] = True
+        return True
+
+def run_backfill(roots=None, claimed=False):
+    """
+    Queue every not yet cleaned file in the library at backfill priority
+    
+    The arr mirror is refreshed, the library roots are walked in parallel,
+    and each media file is resolved to its episode or movie through the
+    mirror. Files whose item is already queued, whose fingerprint (known
+    from the media cache without reading the file) is in the history, or
+    whose item has history but was never fingerprinted are skipped. The
+    rest are inserted in a few large transactions.
+    
+    Args:
+        roots: Directories to walk (default: the library_roots setting,
+            separated by os.pathsep, or the arr root folders)
+        claimed: The caller already took the run with claim_backfill()
+            
+    Returns:
+        Summary dictionary, or None if a backfill is already running
+    """
+    if not claimed and not claim_backfill():
+        return None
+    started = time.monotonic()
+    try:
+        mirror_roots = refresh_arr_mirror()
+        roots = roots or [root for root in get_setting('library_roots', '').split(os.pathsep) if root] or sorted(mirror_roots)
+        files = scan_library(
+            roots,
+            int(get_setting('backfill_scan_workers', '8')),
+            get_setting('output_prefix', 'clean_')
+        )
+        arr_files = get_arr_files()
+        cached = get_media_files(path for path, _, _ in files)
+        queued, history, fingerprints = get_dedupe_index()
+        
+        items = []
+        profiles = {}
+        unmatched = done = 0
+        for path, size, mtime_ns in files:
+            arr = arr_files.get(path)
+            if not arr:
+                # Not a filtered item, or unknown to Sonarr/Radarr
+                unmatched += 1
+                continue
+            key = (arr['item_id'], arr['item_type'])
+            if handled_status(key, cached.get(path), size, mtime_ns, queued, history, fingerprints):
+                done += 1
+                continue
+            
+            profile_key = (arr['item_type'], arr['parent_id'] if arr['item_type'] == 'show' else arr['item_id'])
+            if profile_key not in profiles:
+                profiles[profile_key] = profile_options(arr['item_type'], arr['item_id'], arr['parent_id'])
+            items.append({
+                'type': arr['item_type'],
+                'file_path': path,
+                'title': arr['title'],
+                'detail': arr['detail'],
+                'id': arr['item_id'],
+                'parent_id': arr['parent_id'],
+                'priority': PRIORITY_BACKFILL,
+                'options': profiles[profile_key]
+            })
+            queued.add(key)
+        
+        add_many_to_processing_queue(items)
+        summary = {
+            'roots': roots,
+            'files': len(files),
+            'queued': len(items),
+            'already_done': done,
+            'unmatched': unmatched,
+            'seconds': round(time.monotonic() - started, 1),
+            'finished_at': datetime.now().isoformat()
+        }
+        logger.info(f"Backfill queued {len(items)} of {len(files)} files ({done} already done, {unmatched} not in a filtered series or movie)")
+        BACKFILL_STATUS['last'] = summary
+        return summary
+    finally:
+        BACKFILL_STATUS['running'] = False
+
 def start_polling_loop():
     """Start the background polling thread"""
     thread = threading.Thread(target=polling_task, daemon=True)
@@ -0,0 +1,129 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The app runs with both the repo root and backend/ on the path
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / 'backend'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+# Keep the model client off any real model server socket
+os.environ.setdefault('MODEL_SOCKET', str(ROOT / 'tests' / 'no-model-server.sock'))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh database with the default settings"""
+    import backend.db
+    monkeypatch.setattr(backend.db, 'DB_PATH', tmp_path / 'bleeparr.db')
+    backend.db.init_db()
+    return backend.db
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    """Create a small stand-in media file"""
+    def create(name, size=1024):
+        path = tmp_path / 'library' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'\0' * size)
+        return str(path)
+    return create
+
+
+class FakeArr:
+    """Calls made, and the calls that fail as an unreachable server would"""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+        self.last_error = None
+
+    def __call__(self, url, api_key):
+        return self
+
+    def _call(self, name, *args):
+        self.calls.append((name,) + args if args else name)
+        self.last_error = f"{name}: HTTP 503" if name in self.failing else None
+        return self.last_error is None
+
+
+class FakeSonarr(FakeArr):
+    """SonarrAPI stand-in serving a fixed library"""
+
+    def __init__(self, series, episodes, files):
+        super().__init__()
+        self.series = series
+        self.episodes = episodes
+        self.files = files
+
+    def get_series_list(self):
+        return list(self.series) if self._call('series') else []
+
+    def get_episodes_by_series_id(self, series_id):
+        return [e for e in self.episodes if e['seriesId'] == series_id] if self._call('episodes', series_id) else []
+
+    def get_episode_files(self, series_id):
+        return [f for f in self.files if f['seriesId'] == series_id] if self._call('episodefiles', series_id) else []
+
+    def get_episodes_by_ids(self, episode_ids):
+        if not self._call('episode_ids', tuple(episode_ids)):
+            return [], dict.fromkeys(episode_ids, self.last_error)
+        return [e for e in self.episodes if e['id'] in episode_ids], {}
+
+    def get_episode_files_by_ids(self, file_ids):
+        if not self._call('episodefile_ids', tuple(file_ids)):
+            return [], dict.fromkeys(file_ids, self.last_error)
+        return [f for f in self.files if f['id'] in file_ids], {}
+
+
+class FakeRadarr(FakeArr):
+    """RadarrAPI stand-in serving a fixed library"""
+
+    def __init__(self, movies):
+        super().__init__()
+        self.movies = movies
+
+    def get_movie_list(self):
+        return list(self.movies) if self._call('movies') else []
+
+
+@pytest.fixture
+def arr(monkeypatch, media_file):
+    """
+    A small Sonarr/Radarr library with real files on disk
+
+    Series 1 has episodes 11 and 12 with files and 13 without; movie 7 has
+    a file and movie 8 does not.
+    """
+    from backend import backfill, tasks
+
+    ep11 = media_file('Show/S01E01.mkv')
+    ep12 = media_file('Show/S01E02.mkv')
+    movie = media_file('Movie/Movie.mkv')
+    sonarr = FakeSonarr(
+        series=[{'id': 1, 'title': 'Show', 'path': os.path.dirname(ep11)}],
+        episodes=[
+            {'id': 11, 'seriesId': 1, 'seasonNumber': 1, 'episodeNumber': 1, 'title': 'One', 'episodeFileId': 111},
+            {'id': 12, 'seriesId': 1, 'seasonNumber': 1, 'episodeNumber': 2, 'title': 'Two', 'episodeFileId': 112},
+            {'id': 13, 'seriesId': 1, 'seasonNumber': 1, 'episodeNumber': 3, 'title': 'Three', 'episodeFileId': 0}
+        ],
+        files=[
+            {'id': 111, 'seriesId': 1, 'path': ep11},
+            {'id': 112, 'seriesId': 1, 'path': ep12}
+        ]
+    )
+    radarr = FakeRadarr([
+        {'id': 7, 'title': 'Movie', 'year': 2001, 'path': os.path.dirname(movie), 'movieFile': {'path': movie}},
+        {'id': 8, 'title': 'Missing', 'year': 2002}
+    ])
+    for module in (backfill, tasks):
+        monkeypatch.setattr(module, 'SonarrAPI', sonarr)
+        monkeypatch.setattr(module, 'RadarrAPI', radarr)
+    for key, value in (('SONARR_URL', 'http://sonarr'), ('SONARR_API_KEY', 'key'),
+                       ('RADARR_URL', 'http://radarr'), ('RADARR_API_KEY', 'key')):
+        monkeypatch.setenv(key, value)
+    return {'sonarr': sonarr, 'radarr': radarr, 'paths': {11: ep11, 12: ep12, 7: movie}}
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from api import acoustic
+from api.acoustic import acoustic_fingerprint, find_offset, load_acoustic, save_acoustic
+from api.media import SAMPLE_RATE
+
+
+@pytest.fixture
+def programme():
+    """Noise whose spectrum changes every 100 ms, like a soundtrack"""
+    rng = np.random.default_rng(1)
+
+    def make(seconds):
+        samples = int(seconds * SAMPLE_RATE)
+        loudness = np.repeat(rng.random(int(seconds * 10) + 1), SAMPLE_RATE // 10)[:samples]
+        return (rng.standard_normal(samples) * loudness).astype(np.float32)
+    return make
+
+
+def fingerprint(pcm):
+    return acoustic_fingerprint(pcm, SAMPLE_RATE)
+
+
+def test_release_with_a_longer_intro_is_found(programme):
+    known = programme(150)
+    # Another release: quieter, re-encoded, with 2.5 s more in front
+    rng = np.random.default_rng(2)
+    new = np.concatenate([programme(2.5), known * 0.5 + rng.standard_normal(len(known)).astype(np.float32) * 0.01])
+    assert find_offset(fingerprint(known), fingerprint(new)) == 2.5
+
+
+def test_trimmed_release_gets_a_negative_offset(programme):
+    known = programme(150)
+    assert find_offset(fingerprint(known), fingerprint(known[3 * SAMPLE_RATE:])) == -3.0
+
+
+def test_different_audio_does_not_match(programme):
+    assert find_offset(fingerprint(programme(150)), fingerprint(programme(150))) is None
+
+
+def test_recordings_shorter_than_the_probe_are_not_compared(programme):
+    known = programme(150)
+    assert find_offset(fingerprint(known), fingerprint(known[:30 * SAMPLE_RATE])) is None
+
+
+def test_fingerprint_is_stored_and_loaded(programme, tmp_path, monkeypatch):
+    monkeypatch.setattr(acoustic, 'ACOUSTIC_DIR', tmp_path)
+    prints = fingerprint(programme(5))
+    assert prints.dtype == np.uint32 and len(prints) == pytest.approx(5 / acoustic.HOP_SECONDS, abs=3)
+    save_acoustic('ab12', prints)
+    assert np.array_equal(load_acoustic('ab12'), prints)
+    assert load_acoustic('cd34') is None
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import requests
+
+from api import sonarr
+from api.radarr import RadarrAPI
+from api.sonarr import BULK_CHUNK, SonarrAPI
+
+
+def test_get_by_ids_chunks_and_reports_failed_chunks(monkeypatch):
+    calls = []
+
+    def get(url, headers=None, params=None):
+        ids = params['episodeIds']
+        calls.append(ids)
+        if len(calls) == 2:
+            raise requests.exceptions.ReadTimeout("timed out")
+        return SimpleNamespace(status_code=200, json=lambda: [{'id': i} for i in ids if i % 2])
+
+    monkeypatch.setattr(sonarr.requests, 'get', get)
+    ids = list(range(BULK_CHUNK * 2 + 5))
+    episodes, failed = SonarrAPI('http://sonarr', 'key').get_episodes_by_ids(ids)
+
+    assert [len(chunk) for chunk in calls] == [BULK_CHUNK, BULK_CHUNK, 5]
+    assert sorted(failed) == ids[BULK_CHUNK:BULK_CHUNK * 2]
+    assert 'timed out' in failed[BULK_CHUNK]
+    assert [e['id'] for e in episodes] == [i for i in ids if i % 2 and i not in failed]
+
+
+def test_list_calls_record_their_error(monkeypatch):
+    responses = iter([SimpleNamespace(status_code=503), SimpleNamespace(status_code=200, json=lambda: [])])
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: next(responses))
+    api = RadarrAPI('http://radarr', 'key')
+    assert api.get_movie_list() == [] and 'HTTP 503' in api.last_error
+    # An empty library is not an error
+    assert api.get_movie_list() == [] and api.last_error is None
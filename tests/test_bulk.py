@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+
+import pytest
+
+from backend import tasks
+from backend.tasks import PRIORITY_BACKFILL, PRIORITY_MANUAL
+
+
+def statuses(items):
+    return {(item['type'], item['id']): item['status'] for item in items}
+
+
+def test_bulk_enqueue_reports_every_item(db, arr):
+    items = tasks.bulk_enqueue(episode_ids=[11, 13, 99], movie_ids=[7, 8, 9], series_ids=[1, 5])
+    assert statuses(items) == {
+        ('show', 11): 'queued',
+        ('show', 13): 'no_file',
+        ('show', 99): 'not_found',
+        ('show', 12): 'queued',
+        ('series', 5): 'not_found',
+        ('movie', 7): 'queued',
+        ('movie', 8): 'no_file',
+        ('movie', 9): 'not_found'
+    }
+    queued = db.get_processing_queue()
+    assert sorted((row['item_type'], row['item_id']) for row in queued) == [('movie', 7), ('show', 11), ('show', 12)]
+    assert all(row['manual'] and row['priority'] == PRIORITY_MANUAL for row in queued)
+    assert {row['file_path'] for row in queued} == set(arr['paths'].values())
+    # Episode 11 was asked for directly and through its series, but queued once
+    assert len([item for item in items if item['id'] == 11]) == 1
+
+
+def test_bulk_enqueue_batches_arr_calls(db, arr):
+    tasks.bulk_enqueue(episode_ids=[11, 12, 13], movie_ids=[7, 8])
+    assert arr['sonarr'].calls == ['series', ('episode_ids', (11, 12, 13)), ('episodefile_ids', (111, 112))]
+    assert arr['radarr'].calls == ['movies']
+
+
+def test_bulk_enqueue_skips_queued_and_cleaned_files(db, arr):
+    tasks.bulk_enqueue(episode_ids=[11])
+    path = arr['paths'][7]
+    stat = os.stat(path)
+    db.save_media_file({'file_path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'fingerprint': 'fp7'})
+    db.save_processing_history({'id': 7, 'type': 'movie', 'file_path': path, 'title': 'Movie', 'success': True,
+                                'result': {'fingerprint': 'fp7'}})
+
+    items = tasks.bulk_enqueue(episode_ids=[11], movie_ids=[7])
+    assert statuses(items) == {('show', 11): 'already_queued', ('movie', 7): 'already_processed'}
+    assert len(db.get_processing_queue()) == 1
+
+
+def test_bulk_enqueue_requeues_an_upgraded_release(db, arr):
+    path = arr['paths'][7]
+    db.save_processing_history({'id': 7, 'type': 'movie', 'file_path': path, 'title': 'Movie', 'success': True,
+                                'result': {'fingerprint': 'old-release'}})
+    stat = os.stat(path)
+    db.save_media_file({'file_path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'fingerprint': 'new-release'})
+    assert statuses(tasks.bulk_enqueue(movie_ids=[7])) == {('movie', 7): 'queued'}
+
+
+def test_backfill_queues_library_once(db, arr, tmp_path, media_file):
+    with db.get_db() as conn:
+        conn.executemany("INSERT INTO bleeparr_items (id, type, filtered) VALUES (?, ?, 1)", [(1, 'show'), (7, 'movie')])
+    # Neither an arr file nor a cleaned copy is queued
+    media_file('Unknown/Other.mkv')
+    media_file('Show/clean_S01E01.mkv')
+
+    summary = tasks.run_backfill([str(tmp_path / 'library')])
+    assert summary['files'] == 4
+    assert summary['queued'] == 3
+    assert summary['unmatched'] == 1
+    queued = db.get_processing_queue()
+    assert sorted((row['item_type'], row['item_id']) for row in queued) == [('movie', 7), ('show', 11), ('show', 12)]
+    assert all(row['priority'] == PRIORITY_BACKFILL for row in queued)
+
+    again = tasks.run_backfill([str(tmp_path / 'library')])
+    assert again['queued'] == 0 and again['already_done'] == 3
+
+
+def test_bulk_enqueue_reports_failed_lookups_as_errors(db, arr):
+    arr['sonarr'].failing = {'episode_ids', 'episodefiles'}
+    arr['radarr'].failing = {'movies'}
+    items = tasks.bulk_enqueue(episode_ids=[11, 99], movie_ids=[7], series_ids=[1])
+    assert statuses(items) == {
+        ('show', 11): 'error',
+        ('show', 99): 'error',
+        ('series', 1): 'error',
+        ('movie', 7): 'error'
+    }
+    assert all('HTTP 503' in item['error'] for item in items)
+    assert db.get_processing_queue() == []
+
+
+def test_bulk_enqueue_file_lookup_failure_is_an_error(db, arr):
+    arr['sonarr'].failing = {'episodefile_ids'}
+    assert statuses(tasks.bulk_enqueue(episode_ids=[11, 13])) == {('show', 11): 'error', ('show', 13): 'no_file'}
+
+
+def test_second_backfill_request_gets_409(db, monkeypatch):
+    from fastapi import BackgroundTasks, HTTPException
+    from api.routes import start_backfill
+
+    monkeypatch.setitem(tasks.BACKFILL_STATUS, 'running', False)
+    first = BackgroundTasks()
+    assert start_backfill(first, None)['status'] == 'started'
+    with pytest.raises(HTTPException) as e:
+        start_backfill(BackgroundTasks(), None)
+    assert e.value.status_code == 409
+    assert len(first.tasks) == 1 and first.tasks[0].kwargs == {'claimed': True}
+
+
+def test_concurrent_backfills_walk_once(db, monkeypatch):
+    monkeypatch.setitem(tasks.BACKFILL_STATUS, 'running', False)
+    release = threading.Event()
+    walks = []
+
+    def refresh_arr_mirror():
+        walks.append(threading.current_thread().name)
+        release.wait(5)
+        return set()
+
+    monkeypatch.setattr(tasks, 'refresh_arr_mirror', refresh_arr_mirror)
+    monkeypatch.setattr(tasks, 'scan_library', lambda *args: [])
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(tasks.run_backfill(['/nowhere']))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while not walks:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(walks) == 1
+    assert sum(result is not None for result in results) == 1
+    assert tasks.BACKFILL_STATUS['running'] is False
+
+
+@pytest.mark.parametrize('failing', [{'series'}, {'episodefiles'}, {'episodes'}, {'movies'}])
+def test_failed_arr_fetch_keeps_the_mirror(db, arr, failing):
+    from backend.backfill import refresh_arr_mirror
+
+    with db.get_db() as conn:
+        conn.executemany("INSERT INTO bleeparr_items (id, type, filtered) VALUES (?, ?, 1)", [(1, 'show'), (7, 'movie')])
+    roots = refresh_arr_mirror()
+    mirrored = db.get_arr_files()
+    assert len(mirrored) == 3
+
+    arr['sonarr'].failing = arr['radarr'].failing = failing
+    assert refresh_arr_mirror() == roots
+    assert db.get_arr_files().keys() == mirrored.keys()
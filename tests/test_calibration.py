@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from api import calibration
+from backend import tasks
+from api.media import SAMPLE_RATE
+
+# Seconds per clip for each compute type; fewer threads and smaller beams are slower and faster
+COSTS = {'float32': 10.0, 'int16': 7.0, 'int8_float32': 5.0, 'int8': 4.0}
+
+
+class FakeModel:
+    def __init__(self, model_size, device, compute_type, cpu_threads):
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+
+
+@pytest.fixture
+def fake_whisper(monkeypatch):
+    """Whisper stand-in whose speed and transcript depend on the settings"""
+    clock = {'now': 0.0}
+    state = {'words': {}}
+
+    def transcribe_audio(model, audio, language=None, beam_size=None):
+        clock['now'] += COSTS[model.compute_type] * (1.0 if model.cpu_threads > 1 else 1.5) * (beam_size or 5) / 5
+        text = state['words'].get(model.compute_type, state['words'].get('default', ''))
+        return [{'text': word, 'start': 0.0, 'end': 0.1, 'probability': 1.0} for word in text.split()]
+
+    monkeypatch.setattr(calibration, 'WhisperModel', FakeModel)
+    monkeypatch.setattr(calibration, 'transcribe_audio', transcribe_audio)
+    monkeypatch.setattr(calibration.time, 'perf_counter', lambda: clock['now'])
+    return state
+
+
+def test_faster_settings_must_agree_with_the_reference(fake_whisper):
+    fake_whisper['words'] = {'default': 'and so my fellow americans ask not', 'int8': 'and so my yellow'}
+    best = calibration.calibrate_model('small', np.zeros(SAMPLE_RATE, dtype=np.float32), min_agreement=0.95)
+    # int8 is fastest but garbles the words, int8_float32 agrees
+    assert best['compute_type'] == 'int8_float32'
+    assert best['agreement'] == 1.0
+
+
+def test_wordless_clip_only_tunes_threads(fake_whisper):
+    fake_whisper['words'] = {'default': ''}
+    best = calibration.calibrate_model('small', np.zeros(SAMPLE_RATE, dtype=np.float32), min_agreement=0.95)
+    assert best['compute_type'] == calibration.REFERENCE_COMPUTE_TYPE
+    assert best['beam_size'] == calibration.DEFAULT_BEAM_SIZE
+
+
+def test_bundled_clip_is_real_speech_audio():
+    clip = calibration.default_clip()
+    assert clip.dtype == np.float32
+    assert 10 * SAMPLE_RATE < len(clip) <= calibration.CLIP_SECONDS * SAMPLE_RATE
+    # Speech, not silence or a synthetic tone at full scale
+    assert 0.01 < np.sqrt(np.mean(clip ** 2)) < 0.5
+
+
+def test_auto_calibration_is_off_by_default(db):
+    assert db.get_setting('auto_calibrate') == '0'
+
+
+@pytest.mark.parametrize('stored_hardware, auto, runs', [
+    (None, '0', 0),
+    (None, '1', 1),
+    ('this-cpu', '0', 0),
+    ('old-cpu', '0', 1),
+    ('old-cpu', '1', 1)
+])
+def test_hardware_change_recalibrates_whatever_the_flag(db, monkeypatch, stored_hardware, auto, runs):
+    monkeypatch.setattr(calibration, 'hardware_id', lambda: 'this-cpu')
+    monkeypatch.setattr(tasks, 'WhisperModel', object)
+    calls = []
+    monkeypatch.setattr(tasks, 'run_calibration', lambda: calls.append(1))
+    db.set_setting('auto_calibrate', auto)
+    if stored_hardware:
+        models = {size: {'compute_type': 'int8'} for size in calibration.PASS_MODELS.values()}
+        db.set_setting(calibration.TUNING_SETTING, json.dumps({'hardware': stored_hardware, 'models': models}))
+    asyncio.run(tasks.ensure_calibration())
+    assert len(calls) == runs
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from api import checkpoints, transcriber
+from api.checkpoints import ChunkCheckpoint, clear_checkpoints
+
+FINGERPRINT = 'ab' + '0' * 38
+SAMPLE_RATE = 16000
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, 'CHECKPOINT_DIR', tmp_path / 'checkpoints')
+    return tmp_path / 'checkpoints'
+
+
+def test_checkpoint_survives_reload_and_torn_line():
+    checkpoint = ChunkCheckpoint(FINGERPRINT, 'S-small-0')
+    checkpoint.add((0.0, 10.0), [{'text': 'one', 'start': 1.0, 'end': 1.5}])
+    checkpoint.add((10.0, 20.00001), [])
+    with open(checkpoint.path, 'a') as f:
+        # A write cut short by a crash
+        f.write('{"window": [20.0, 30.0], "wor')
+
+    reloaded = ChunkCheckpoint(FINGERPRINT, 'S-small-0')
+    assert reloaded.get((0.0, 10.0)) == [{'text': 'one', 'start': 1.0, 'end': 1.5}]
+    assert reloaded.get((10.0, 20.0)) == []
+    assert reloaded.get((20.0, 30.0)) is None
+
+    clear_checkpoints(FINGERPRINT)
+    assert ChunkCheckpoint(FINGERPRINT, 'S-small-0').done == {}
+
+
+def test_transcription_resumes_after_last_finished_window(monkeypatch):
+    pcm = np.zeros(SAMPLE_RATE * 30, dtype=np.float32)
+    windows = [(0.0, 10.0), (10.0, 20.0), (20.0, 30.0)]
+    decoded = []
+
+    def fake_transcribe(model, audio, language=None, beam_size=None):
+        if crash_after is not None and len(decoded) == crash_after:
+            raise RuntimeError("killed")
+        decoded.append(len(audio))
+        return [{'text': f"word{len(decoded)}", 'start': 1.0, 'end': 2.0, 'probability': 0.9}]
+
+    monkeypatch.setattr(transcriber, 'get_model', lambda size: object())
+    monkeypatch.setattr(transcriber, 'transcribe_audio', fake_transcribe)
+
+    crash_after = 2
+    with pytest.raises(RuntimeError):
+        transcriber.transcribe_windows(pcm, SAMPLE_RATE, windows, 'S', checkpoint=ChunkCheckpoint(FINGERPRINT, 'S'))
+    assert len(decoded) == 2
+
+    crash_after = None
+    words, _ = transcriber.transcribe_windows(pcm, SAMPLE_RATE, windows, 'S', checkpoint=ChunkCheckpoint(FINGERPRINT, 'S'))
+    # Only the third window was decoded again
+    assert len(decoded) == 3
+    assert [(w['text'], w['start']) for w in words] == [('word1', 1.0), ('word2', 11.0), ('word3', 21.0)]
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from api import bleeparr_core, jobs
+from api.jobs import JobCancelled, run_process, running_jobs
+from backend import tasks
+
+
+def history(db, item_id, elapsed, duration=3600, **result):
+    db.save_processing_history({'id': item_id, 'type': 'movie', 'file_path': f"/media/{item_id}.mkv",
+                                'title': f"Item {item_id}", 'success': True, 'elapsed_seconds': elapsed,
+                                'result': dict(result, duration=duration)})
+
+
+def mixed_history(db):
+    """Refines at half real time, outnumbered by jobs that never ran Whisper"""
+    for item_id in range(10):
+        history(db, item_id, 20, phase='quick')
+        history(db, 100 + item_id, 1800, phase='refine', transcribe_seconds=1500)
+    for item_id in range(3):
+        history(db, 200 + item_id, 15, mute_plan_source='index')
+    history(db, 300, 30, transcript_cached=True, transcribe_seconds=0)
+
+
+def test_processing_rate_only_counts_whisper_runs(db):
+    mixed_history(db)
+    assert db.get_processing_rate() == 0.5
+
+
+def test_timeout_of_a_long_refine_is_not_shrunk_by_quick_jobs(db):
+    mixed_history(db)
+    db.save_media_file({'file_path': '/media/film.mkv', 'size': 1, 'mtime_ns': 1, 'fingerprint': 'fp',
+                        'duration': 7200})
+    # Four times half an hour of processing per hour of film
+    assert tasks.job_timeout({'file_path': '/media/film.mkv'}) == 7200 * 0.5 * 4
+
+
+@pytest.fixture
+def stuck_engine(monkeypatch):
+    """Engine stand-in whose run hangs in a subprocess until its job is stopped"""
+    def process_file(self, file_path, dry_run=False, **options):
+        try:
+            run_process(['sleep', '30'])
+        except JobCancelled as e:
+            return {'success': False, 'error': e.reason, 'cancelled': not e.timed_out, 'timed_out': e.timed_out,
+                    'file_path': file_path}
+        return {'success': True, 'file_path': file_path}
+
+    monkeypatch.setattr(bleeparr_core.Bleeparr, 'process_file', process_file)
+
+
+def start_item(db):
+    """Run the only queued item on a worker thread, once its subprocess is up"""
+    [item] = db.get_processing_queue()
+    worker = threading.Thread(target=tasks.process_item, args=(item, tasks.engine_options()))
+    worker.start()
+    deadline = time.monotonic() + 5
+    while not (item['id'] in running_jobs() and running_jobs()[item['id']].processes):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return item, worker
+
+
+def test_cancelling_a_running_job_kills_its_processes(db, stuck_engine, media_file):
+    path = media_file('Movie/Movie.mkv')
+    db.add_to_processing_queue({'id': 1, 'type': 'movie', 'file_path': path, 'title': 'Movie', 'parent_id': 1})
+    item, worker = start_item(db)
+    [process] = running_jobs()[item['id']].processes
+
+    assert tasks.cancel_queue_item(item['id']) == 'cancelled'
+    worker.join(5)
+    assert not worker.is_alive() and process.poll() is not None
+    assert db.get_processing_queue() == [] and running_jobs() == {}
+    [record] = db.get_processing_history()
+    assert not record['success']
+
+
+def test_cancelling_a_waiting_job_takes_it_off_the_queue(db):
+    db.add_to_processing_queue({'id': 1, 'type': 'movie', 'file_path': '/media/1.mkv', 'title': 'Movie',
+                                'parent_id': 1})
+    [item] = db.get_processing_queue()
+    assert tasks.cancel_queue_item(item['id']) == 'removed'
+    assert db.get_processing_queue() == []
+    assert tasks.cancel_queue_item(item['id']) is None
+
+
+def test_watchdog_stops_an_overrunning_job_and_it_is_retried(db, stuck_engine, media_file, monkeypatch):
+    monkeypatch.setattr(jobs, 'WATCHDOG_INTERVAL', 0.05)
+    db.set_setting('min_timeout_seconds', '0.5')
+    db.set_setting('max_attempts', '2')
+    path = media_file('Movie/Movie.mkv')
+    db.save_media_file({'file_path': path, 'size': 1, 'mtime_ns': 1, 'fingerprint': 'fp', 'duration': 0.01})
+    db.add_to_processing_queue({'id': 1, 'type': 'movie', 'file_path': path, 'title': 'Movie', 'parent_id': 1})
+
+    # The first timeout leaves the item queued for another attempt
+    item, worker = start_item(db)
+    worker.join(5)
+    assert not worker.is_alive()
+    [item] = db.get_processing_queue()
+    assert item['attempts'] == 1
+
+    # The last one gives up on it
+    item, worker = start_item(db)
+    worker.join(5)
+    assert db.get_processing_queue() == []
+    assert [record['success'] for record in db.get_processing_history()] == [False, False]
@@ -0,0 +1,48 @@
+import os
+
+from api.matcher import SwearMatcher, get_matcher, normalize_text
+
+
+def test_normalize_folds_case_accents_and_punctuation():
+    assert normalize_text("Don't") == 'dont'
+    assert normalize_text('FÜCK!').split() == ['fuck']
+    assert normalize_text('mother-fudger').split() == ['mother', 'fudger']
+
+
+def test_longest_phrase_wins_and_scanning_resumes_after_it():
+    matcher = SwearMatcher(['gun', 'son of a gun', 'darn', '  ', 'Darn'])
+    assert len(matcher) == 3
+    assert matcher.find('You son of a gun, darn it') == ['son of a gun', 'darn']
+    assert matcher.find('son of a') == []
+    assert matcher.match_tokens('a gun gun'.split()) == [(1, 1, 'gun'), (2, 2, 'gun')]
+
+
+def test_word_hits_span_the_words_a_phrase_came_from():
+    words = [
+        {'text': ' Son', 'start': 1.0, 'end': 1.2, 'probability': 0.8, 'pass': 'S'},
+        {'text': ' of', 'start': 1.2, 'end': 1.3, 'probability': 0.9, 'pass': 'S'},
+        {'text': ' a-gun!', 'start': 1.3, 'end': 1.9, 'probability': 0.7, 'pass': 'S'},
+        {'text': ' fine', 'start': 2.0, 'end': 2.4, 'probability': 0.9, 'pass': 'S'}
+    ]
+    assert SwearMatcher(['son of a gun']).match_words(words) == [
+        {'text': 'son of a gun', 'start': 1.0, 'end': 1.9, 'probability': 0.8, 'pass': 'S'}
+    ]
+
+
+def test_matcher_is_shared_until_the_file_changes(tmp_path):
+    swears = tmp_path / 'swears.txt'
+    swears.write_text('darn\n')
+    first = get_matcher(str(swears))
+    assert get_matcher(str(swears)) is first
+
+    # Touched without a change: same matcher
+    os.utime(swears, ns=(1, 1))
+    assert get_matcher(str(swears)) is first
+
+    swears.write_text('darn\nheck\n')
+    second = get_matcher(str(swears))
+    assert second is not first and second.phrases == {'darn', 'heck'}
+
+
+def test_missing_file_matches_nothing(tmp_path):
+    assert len(get_matcher(str(tmp_path / 'missing.txt'))) == 0
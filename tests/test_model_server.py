@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from api import model_server
+from api.media import SAMPLE_RATE
+from api.model_server import BATCH_WINDOW_SECONDS, ModelServer, _Request
+from api.transcriber import transcribe_audio
+
+
+def words_for(seconds, offset=0.0):
+    """One word per second of audio, like dialogue that never stops"""
+    words = [SimpleNamespace(word=f" w{i}", start=offset + i, end=offset + i + 0.5, probability=0.9)
+             for i in range(int(seconds))]
+    return [SimpleNamespace(words=words)]
+
+
+class FakeModel:
+    def transcribe(self, audio, **kwargs):
+        return words_for(len(audio) / SAMPLE_RATE), None
+
+
+class FakePipeline:
+    """
+    Batched pipeline with faster-whisper 1.2.1's clip contract
+
+    Clip timestamps are seconds, scaled to samples by the sampling rate, and
+    each clip is decoded as one 30 s window at its offset in the audio. A
+    clip past the end of the audio silently decodes nothing.
+    """
+    calls = []
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, clip_timestamps, batch_size, sampling_rate=SAMPLE_RATE, **kwargs):
+        FakePipeline.calls.append(len(clip_timestamps))
+        segments = []
+        for clip in clip_timestamps:
+            start, end = (int(clip[key] * sampling_rate) for key in ('start', 'end'))
+            seconds = min(len(audio[start:end]) / sampling_rate, BATCH_WINDOW_SECONDS)
+            segments.extend(words_for(seconds, start / sampling_rate))
+        return segments, None
+
+
+@pytest.fixture
+def server(monkeypatch):
+    model = FakeModel()
+    FakePipeline.calls = []
+    monkeypatch.setattr(model_server, 'BatchedInferencePipeline', FakePipeline)
+    monkeypatch.setattr(model_server, 'get_model', lambda size: model)
+    return ModelServer('/nonexistent.sock'), model
+
+
+def run(server, lengths):
+    requests = [_Request({'model': 'small', 'audio': np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)})
+                for seconds in lengths]
+    server._run('small', requests, None, 5)
+    return requests
+
+
+def test_long_window_matches_in_process_transcription(server):
+    server, model = server
+    requests = run(server, [45, 12, 20])
+    for request in requests:
+        local = transcribe_audio(model, request.message['audio'])
+        assert len(request.reply['words']) == len(local)
+        assert [w['start'] for w in request.reply['words']] == [w['start'] for w in local]
+    # The two short windows still shared one batched call
+    assert FakePipeline.calls == [2]
+
+
+def test_short_windows_are_batched_and_mapped_back(server):
+    server, _ = server
+    requests = run(server, [10, 25, 30])
+    assert FakePipeline.calls == [3]
+    assert [len(r.reply['words']) for r in requests] == [10, 25, 30]
+    assert requests[1].reply['words'][0]['start'] == 0.0
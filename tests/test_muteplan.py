@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+
+from api.matcher import SwearMatcher
+from api.muteplan import MAX_FILTER_TERMS, audio_filter, between_filter, build_plan, merge_regions, remove_script
+
+
+def test_merge_regions_joins_overlaps_and_small_gaps():
+    merged = merge_regions([(5.0, 6.0), (1.0, 2.0), (1.5, 3.0), (3.1, 4.0)], max_gap=0.2)
+    assert merged.tolist() == [[1.0, 4.0], [5.0, 6.0]]
+
+
+def test_merge_regions_keeps_contained_spans_inside():
+    assert merge_regions([(0.0, 10.0), (2.0, 3.0), (11.0, 12.0)]).tolist() == [[0.0, 10.0], [11.0, 12.0]]
+
+
+def test_build_plan_pads_clips_and_merges():
+    hits = [{'start': 0.05, 'end': 0.5}, {'start': 0.6, 'end': 1.0}, {'start': 9.8, 'end': 9.95}]
+    plan = build_plan(hits, pre_buffer=100, post_buffer=100, merge_gap=0, duration=10.0)
+    # First hit clipped at 0, first two joined by their padding, last clipped at the duration
+    assert np.allclose(plan, [[0.0, 1.1], [9.7, 10.0]])
+
+
+def test_build_plan_merge_gap_is_in_milliseconds():
+    hits = [{'start': 1.0, 'end': 1.2}, {'start': 1.45, 'end': 1.6}]
+    assert len(build_plan(hits, 0, 0, merge_gap=200)) == 2
+    assert len(build_plan(hits, 0, 0, merge_gap=300)) == 1
+
+
+def test_build_plan_without_hits_is_empty():
+    plan = build_plan([], 100, 100)
+    assert plan.shape == (0, 2)
+    assert between_filter(plan) == 'anull'
+
+
+def test_plan_from_matched_words():
+    matcher = SwearMatcher(['damn', 'son of a bitch'])
+    words = [
+        {'text': 'you', 'start': 0.0, 'end': 0.2},
+        {'text': 'son', 'start': 0.3, 'end': 0.5},
+        {'text': 'of', 'start': 0.5, 'end': 0.6},
+        {'text': 'a', 'start': 0.6, 'end': 0.7},
+        {'text': 'bitch!', 'start': 0.7, 'end': 1.0},
+        {'text': 'Damn.', 'start': 3.0, 'end': 3.4}
+    ]
+    hits = matcher.match_words(words)
+    assert [hit['text'] for hit in hits] == ['son of a bitch', 'damn']
+    plan = build_plan(hits, 0, 0, merge_gap=0)
+    assert plan.tolist() == [[0.3, 1.0], [3.0, 3.4]]
+
+
+def test_audio_filter_switches_to_command_script():
+    short = build_plan([{'start': i, 'end': i + 0.5} for i in range(MAX_FILTER_TERMS)], 0, 0, merge_gap=0)
+    filter_string, script = audio_filter(short)
+    assert script is None and filter_string.startswith('volume=enable=')
+
+    long = build_plan([{'start': i, 'end': i + 0.5} for i in range(MAX_FILTER_TERMS + 1)], 0, 0, merge_gap=0)
+    filter_string, script = audio_filter(long)
+    try:
+        assert filter_string.startswith('asendcmd=')
+        with open(script) as f:
+            assert len(f.read().splitlines()) == 2 * len(long)
+    finally:
+        remove_script(script)
+    assert not os.path.exists(script)
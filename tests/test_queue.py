@@ -0,0 +1,241 @@
+import asyncio
+import time
+
+import pytest
+
+from backend import admission, tasks
+from backend.admission import MB, check_admission, job_requirements
+from backend.tasks import PRIORITY_AUTO, PRIORITY_BACKFILL, PRIORITY_MANUAL
+
+
+def queue(db, item_id, path, priority=PRIORITY_AUTO, duration=None, item_type='movie'):
+    db.add_to_processing_queue({
+        'id': item_id, 'type': item_type, 'file_path': path, 'title': f"Item {item_id}",
+        'parent_id': item_id, 'priority': priority
+    })
+    if duration is not None:
+        db.save_media_file({'file_path': path, 'size': 1, 'mtime_ns': 1, 'fingerprint': f"fp{item_id}",
+                            'duration': duration})
+
+
+def order(db):
+    return [item['item_id'] for item in tasks.schedule_queue(db.get_processing_queue())]
+
+
+def test_priority_classes_then_shortest_first(db):
+    queue(db, 1, '/media/backfill.mkv', PRIORITY_BACKFILL, duration=60)
+    queue(db, 2, '/media/long.mkv', PRIORITY_AUTO, duration=7200)
+    queue(db, 3, '/media/short.mkv', PRIORITY_AUTO, duration=1200)
+    queue(db, 4, '/media/manual.mkv', PRIORITY_MANUAL, duration=9000)
+    assert order(db) == [4, 3, 2, 1]
+
+
+def test_unprobed_items_count_as_typical_length(db):
+    queue(db, 1, '/media/a.mkv', duration=1000)
+    queue(db, 2, '/media/b.mkv', duration=3000)
+    queue(db, 3, '/media/unknown.mkv')
+    # Average of the known durations, between the two
+    assert order(db) == [1, 3, 2]
+
+
+def test_waiting_lifts_an_item_one_class_per_aging_period(db):
+    db.set_setting('queue_aging_minutes', '60')
+    queue(db, 1, '/media/auto.mkv', PRIORITY_AUTO, duration=60)
+    queue(db, 2, '/media/backfill.mkv', PRIORITY_BACKFILL, duration=30)
+    with db.get_db() as conn:
+        conn.execute("UPDATE processing_queue SET created_at = datetime('now', '-150 minutes') WHERE item_id = 2")
+    items = tasks.schedule_queue(db.get_processing_queue())
+    assert [item['item_id'] for item in items] == [2, 1]
+    # Two periods from backfill lands in auto, never above manual
+    assert items[0]['effective_priority'] == PRIORITY_AUTO
+
+
+@pytest.fixture
+def host(monkeypatch):
+    """A host with 4 GB of memory, 100 GB of disk and no load"""
+    state = {'memory_mb': 4096, 'disk_bytes': 100 * 1024 * MB, 'load': 0.0}
+    monkeypatch.setattr(admission, 'available_memory_mb', lambda: state['memory_mb'])
+    monkeypatch.setattr(admission, 'free_disk_bytes', lambda path: state['disk_bytes'])
+    monkeypatch.setattr(admission, 'loaded_models', lambda: set())
+    monkeypatch.setattr(admission.os, 'getloadavg', lambda: (state['load'] * (admission.os.cpu_count() or 1), 0, 0))
+    return state
+
+
+def requirements(memory_mb=500, models=('small',), disk_gb=2, output_dir='/media'):
+    return {'memory_mb': memory_mb, 'models': set(models), 'disk_bytes': disk_gb * 1024 * MB, 'output_dir': output_dir}
+
+
+def test_first_job_only_needs_disk(host):
+    host['memory_mb'] = 10
+    assert check_admission(requirements(), []) is None
+    host['disk_bytes'] = 1 * 1024 * MB
+    assert 'GB' in check_admission(requirements(), [])
+
+
+def test_shared_models_are_counted_once(host):
+    running = [requirements(memory_mb=500, models=('medium',))]
+    # A second medium job only needs its own working memory
+    assert check_admission(requirements(memory_mb=500, models=('medium',)), running) is None
+    # large-v3 would need another 3.6 GB
+    assert 'memory' in check_admission(requirements(memory_mb=500, models=('large-v3',)), running)
+
+
+def test_disk_reserved_by_running_jobs_is_subtracted(host):
+    host['disk_bytes'] = 5.5 * 1024 * MB
+    running = [requirements(disk_gb=3)]
+    assert check_admission(requirements(disk_gb=2), running) is not None
+    assert check_admission(requirements(disk_gb=2, output_dir='/other'), running) is None
+
+
+def test_high_load_defers_additional_jobs(host):
+    host['load'] = 3.0
+    assert check_admission(requirements(), []) is None
+    assert 'Load average' in check_admission(requirements(), [requirements(models=())])
+
+
+def test_job_requirements_from_cached_media(monkeypatch):
+    monkeypatch.setattr(admission, 'model_server_available', lambda: False)
+    item = {'file_path': '/media/movie.mkv'}
+    media = {'size': 3 * 1024 * MB, 'duration': 600.0}
+    needs = job_requirements(item, {'bleeptool': 'S-M'}, media)
+    assert needs['models'] == {'small', 'medium'}
+    assert needs['disk_bytes'] == media['size'] and needs['output_dir'] == '/media'
+    assert needs['memory_mb'] > 600 * 16000 * 4 / MB
+
+    sidecar = job_requirements(item, {'bleeptool': 'S', 'output_mode': 'sidecar', 'phase': 'quick'}, media)
+    assert sidecar['models'] == set() and sidecar['disk_bytes'] == 0
+
+
+def test_missing_file_is_failed_and_does_not_block_the_queue(db, media_file, monkeypatch):
+    present = media_file('present.mkv')
+    queue(db, 1, '/media/deleted.mkv', PRIORITY_MANUAL)
+    queue(db, 2, present, PRIORITY_AUTO)
+    ran = []
+
+    def fake_process_item(item, options, budget=None):
+        ran.append(item['item_id'])
+        db.remove_from_processing_queue(item['id'])
+
+    monkeypatch.setattr(tasks, 'process_item', fake_process_item)
+    monkeypatch.setattr(tasks, 'check_admission', lambda *args, **kwargs: None)
+    asyncio.run(tasks.process_queue())
+
+    assert ran == [2]
+    assert db.get_processing_queue() == []
+    history = db.get_processing_history()
+    assert [(row['item_id'], row['success']) for row in history] == [(1, 0)]
+    assert '/media/deleted.mkv' in history[0]['error']
+
+
+def test_pool_defaults_to_one_job_at_a_time(db):
+    assert tasks.pool_limits() == (1, {'extract': 1, 'transcribe': 1, 'mux': 1})
+    db.set_setting('max_concurrent_jobs', '3')
+    db.set_setting('transcribe_workers', '5')
+    assert tasks.pool_limits() == (3, {'extract': 1, 'transcribe': 3, 'mux': 1})
+    # A schedule profile overrides the global cap
+    assert tasks.pool_limits({'settings': {'max_concurrent_jobs': 2}})[0] == 2
+
+
+def threads(cores=None, reserved=None, **limits):
+    """Thread budget on a 16 core host for the given stage slots"""
+    budget = tasks.thread_budget(dict({'extract': 1, 'transcribe': 1, 'mux': 1}, **limits),
+                                 {'settings': {key: value for key, value in
+                                               (('cpu_budget', cores), ('reserved_cores', reserved))
+                                               if value is not None}})
+    return budget['cores'], budget['inference_threads'], budget['ffmpeg_threads']
+
+
+@pytest.fixture
+def sixteen_cores(db, monkeypatch):
+    monkeypatch.setattr(tasks, 'usable_cores', lambda: 16)
+
+
+def test_thread_budget_keeps_a_core_for_the_api(sixteen_cores):
+    assert threads() == (15, 11, 2)
+    assert threads(reserved=0) == (16, 12, 2)
+    assert threads(cores=8) == (8, 6, 1)
+
+
+def test_thread_budget_is_never_below_one_thread(sixteen_cores):
+    assert threads(reserved=20) == (1, 1, 1)
+    assert threads(cores=2, extract=3, transcribe=3, mux=3) == (2, 1, 1)
+
+
+# With at least a core per slot
+@pytest.mark.parametrize('cores', [9, 15, 32])
+@pytest.mark.parametrize('limits', [
+    {'extract': 1, 'transcribe': 1, 'mux': 1},
+    {'extract': 2, 'transcribe': 3, 'mux': 1},
+    {'extract': 3, 'transcribe': 3, 'mux': 3}
+])
+def test_full_pipeline_stays_within_the_budget(sixteen_cores, cores, limits):
+    budget, inference, ffmpeg = threads(cores=cores, **limits)
+    assert inference * limits['transcribe'] + ffmpeg * (limits['extract'] + limits['mux']) <= budget
+
+
+def test_default_settings_never_overlap_jobs(db, media_file, monkeypatch):
+    for item_id in range(3):
+        queue(db, item_id, media_file(f"file{item_id}.mkv"))
+    active = []
+    peak = []
+
+    def fake_process_item(item, options, budget=None):
+        active.append(item['id'])
+        peak.append(len(active))
+        time.sleep(0.05)
+        active.remove(item['id'])
+        db.remove_from_processing_queue(item['id'])
+
+    monkeypatch.setattr(tasks, 'process_item', fake_process_item)
+    monkeypatch.setattr(tasks, 'check_admission', lambda *args, **kwargs: None)
+    asyncio.run(tasks.process_queue())
+    assert len(peak) == 3 and max(peak) == 1
+
+
+def test_eta_accounts_for_parallel_jobs(db):
+    # One second of processing per second of media
+    db.save_processing_history({'id': 99, 'type': 'movie', 'file_path': '/media/old.mkv', 'title': 'Old',
+                                'success': True, 'elapsed_seconds': 600,
+                                'result': {'duration': 600, 'transcribe_seconds': 500}})
+    for item_id, duration in ((1, 100), (2, 100), (3, 300), (4, 100)):
+        queue(db, item_id, f"/media/{item_id}.mkv", duration=duration)
+
+    def etas():
+        return [(item['item_id'], item['eta_seconds']) for item in tasks.get_processing_status()['queue']]
+
+    assert etas() == [(1, 0.0), (2, 100.0), (4, 200.0), (3, 300.0)]
+    db.set_setting('max_concurrent_jobs', '2')
+    assert etas() == [(1, 0.0), (2, 0.0), (4, 100.0), (3, 100.0)]
+
+
+def test_polling_continues_while_the_queue_is_worked_off(db, monkeypatch):
+    real_sleep = asyncio.sleep
+    polls = []
+    queue_runs = []
+
+    async def poll_sonarr():
+        polls.append(time.monotonic())
+
+    async def process_queue():
+        # A backfill that outlasts several poll intervals
+        queue_runs.append(time.monotonic())
+        await real_sleep(10)
+
+    async def ensure_calibration():
+        pass
+
+    monkeypatch.setattr(tasks, 'POLL_INTERVAL', 0)
+    monkeypatch.setattr(tasks, 'poll_sonarr', poll_sonarr)
+    monkeypatch.setattr(tasks, 'process_queue', process_queue)
+    monkeypatch.setattr(tasks, 'ensure_calibration', ensure_calibration)
+    monkeypatch.setattr(tasks, 'check_swear_list', lambda: None)
+    monkeypatch.setattr(tasks.asyncio, 'sleep', lambda seconds: real_sleep(0.01))
+
+    async def main():
+        loop = asyncio.create_task(tasks.poll_loop())
+        while len(polls) < 3:
+            await real_sleep(0.01)
+        loop.cancel()
+
+    asyncio.run(main())
+    assert len(polls) >= 3 and len(queue_runs) == 1
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from api import bleeparr_core
+from backend import tasks
+from backend.tasks import PRIORITY_AUTO, PRIORITY_BACKFILL, PRIORITY_MANUAL, PRIORITY_REFINE
+
+
+@pytest.mark.parametrize('options, priority, quick_clean, wanted', [
+    ({}, PRIORITY_AUTO, '1', True),
+    ({}, PRIORITY_MANUAL, '1', True),
+    ({'bleeptool': 'fsm'}, PRIORITY_AUTO, '1', False),
+    ({'bleeptool': 's-fsm'}, PRIORITY_AUTO, '1', True),
+    ({}, PRIORITY_BACKFILL, '1', False),
+    ({}, PRIORITY_AUTO, '0', False),
+    ({'phase': 'refine'}, PRIORITY_REFINE, '1', False),
+    ({'mute_plan': []}, PRIORITY_AUTO, '1', False)
+])
+def test_wants_quick_clean(db, options, priority, quick_clean, wanted):
+    db.set_setting('quick_clean', quick_clean)
+    assert tasks.wants_quick_clean(options, priority) is wanted
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Engine stand-in recording each run's phase and answering as the real one does"""
+    runs = []
+
+    def process_file(self, file_path, dry_run=False, phase=None, output_mode='file', **options):
+        runs.append(dict(options, phase=phase, output_mode=output_mode, file_path=file_path))
+        result = {'success': True, 'phase': phase, 'file_path': file_path, 'output_mode': output_mode}
+        if output_mode == 'track':
+            result['output_path'] = file_path.rsplit('.', 1)[0] + '.mkv'
+        return result
+
+    monkeypatch.setattr(bleeparr_core.Bleeparr, 'process_file', process_file)
+    return runs
+
+
+def run_queue(db):
+    """Work the queue in order the way the worker does, until it is empty"""
+    ran = []
+    while db.get_processing_queue():
+        item = tasks.schedule_queue(db.get_processing_queue())[0]
+        ran.append(item['priority'])
+        tasks.process_item(item, tasks.job_options(item))
+    return ran
+
+
+def test_quick_clean_hands_over_to_a_refine_behind_the_queue(db, engine, media_file):
+    path = media_file('Show/S01E01.mkv')
+    db.add_to_processing_queue({'id': 1, 'type': 'show', 'file_path': path, 'title': 'Show', 'detail': 'S01E01',
+                                'parent_id': 9, 'options': {'boost_db': 3.0}})
+    assert run_queue(db) == [PRIORITY_AUTO, PRIORITY_REFINE]
+    assert [(run['phase'], run['boost_db']) for run in engine] == [('quick', 3.0), ('refine', 3.0)]
+
+    history = db.get_processing_history()
+    assert len(history) == 2 and all(record['success'] for record in history)
+
+
+def test_backfill_and_disabled_quick_clean_run_once(db, engine, media_file):
+    db.add_to_processing_queue({'id': 1, 'type': 'movie', 'file_path': media_file('A/A.mkv'), 'title': 'A',
+                                'parent_id': 1, 'priority': PRIORITY_BACKFILL})
+    assert run_queue(db) == [PRIORITY_BACKFILL]
+
+    db.set_setting('quick_clean', '0')
+    db.add_to_processing_queue({'id': 2, 'type': 'movie', 'file_path': media_file('B/B.mkv'), 'title': 'B',
+                                'parent_id': 2})
+    assert run_queue(db) == [PRIORITY_AUTO]
+    assert [run['phase'] for run in engine] == [None, None]
+
+
+def test_refine_follows_a_track_mode_file_that_moved(db, engine, media_file):
+    path = media_file('Movie/Movie.mp4')
+    db.add_to_processing_queue({'id': 5, 'type': 'movie', 'file_path': path, 'title': 'Movie', 'parent_id': 5,
+                                'options': {'output_mode': 'track'}})
+    [item] = db.get_processing_queue()
+    tasks.process_item(item, tasks.job_options(item))
+    [refine] = db.get_processing_queue()
+    assert refine['file_path'] == path[:-len('.mp4')] + '.mkv'
+    assert refine['priority'] == PRIORITY_REFINE
+    assert json.loads(refine['options']) == {'output_mode': 'track', 'phase': 'refine'}
+
+
+def test_failed_quick_clean_queues_no_refine(db, monkeypatch, media_file):
+    monkeypatch.setattr(bleeparr_core.Bleeparr, 'process_file',
+                        lambda self, file_path, **options: {'success': False, 'phase': options.get('phase'),
+                                                            'error': 'No audio stream'})
+    db.add_to_processing_queue({'id': 1, 'type': 'movie', 'file_path': media_file('A/A.mkv'), 'title': 'A',
+                                'parent_id': 1})
+    [item] = db.get_processing_queue()
+    tasks.process_item(item, tasks.job_options(item))
+    assert db.get_processing_queue() == []
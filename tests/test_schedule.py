@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from backend.schedule import active_profile, parse_profiles
+
+
+def profile(**settings):
+    return json.dumps([{'name': 'night', 'start': '23:00', 'end': '07:00', 'settings': settings}])
+
+
+# 2026-10-16 is a Friday
+@pytest.mark.parametrize('now, active', [
+    ('2026-10-16 22:59', None),
+    ('2026-10-16 23:00', 'night'),
+    ('2026-10-17 03:00', 'night'),
+    ('2026-10-17 07:00', None),
+    ('2026-10-17 12:00', 'day')
+])
+def test_windows_wrap_past_midnight(now, active):
+    profiles = json.dumps([
+        {'name': 'night', 'start': '23:00', 'end': '07:00'},
+        {'name': 'day', 'start': '09:00', 'end': '17:00'}
+    ])
+    found = active_profile(profiles, datetime.strptime(now, '%Y-%m-%d %H:%M'))
+    assert (found and found['name']) == active
+
+
+@pytest.mark.parametrize('now, active', [
+    ('2026-10-16 23:30', True),
+    # Saturday morning is still Friday night
+    ('2026-10-17 02:00', True),
+    ('2026-10-17 23:30', False),
+    ('2026-10-16 02:00', False)
+])
+def test_days_belong_to_the_day_a_window_starts(now, active):
+    profiles = json.dumps([{'name': 'friday', 'start': '23:00', 'end': '07:00', 'days': ['Fri']}])
+    assert bool(active_profile(profiles, datetime.strptime(now, '%Y-%m-%d %H:%M'))) is active
+
+
+def test_invalid_profiles_are_ignored():
+    assert active_profile(profile(max_concurrent_jobs=0), datetime(2026, 10, 16, 23, 30)) is None
+
+
+@pytest.mark.parametrize('settings', [
+    {'max_concurrent_jobs': 'lots'},
+    {'max_concurrent_jobs': 0},
+    {'transcribe_workers': 1.5},
+    {'reserved_cores': -1},
+    {'job_nice': 20},
+    {'job_ionice': 'realtime'},
+    {'max_load_per_cpu': 0},
+    {'min_free_disk_mb': 'plenty'}
+])
+def test_values_the_pool_cannot_use_are_rejected(settings):
+    key = next(iter(settings))
+    with pytest.raises(ValueError, match=f"night: {key}"):
+        parse_profiles(profile(**settings))
+
+
+def test_valid_values_are_accepted(db):
+    from backend import tasks
+
+    [night] = parse_profiles(profile(max_concurrent_jobs='4', cpu_budget=0, job_ionice='best-effort',
+                                     max_load_per_cpu=2.5))
+    assert tasks.pool_limits(night)[0] == 4
+
+
+def test_put_schedule_answers_400_and_keeps_the_stored_profiles(db):
+    from fastapi import HTTPException
+    from api.routes import update_schedule
+
+    with pytest.raises(HTTPException) as e:
+        update_schedule(json.loads(profile(max_concurrent_jobs='lots')))
+    assert e.value.status_code == 400 and 'max_concurrent_jobs' in e.value.detail
+    assert db.get_setting('schedule_profiles', '[]') == '[]'
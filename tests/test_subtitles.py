@@ -0,0 +1,41 @@
+from api.subtitles import find_sidecar_subtitles, parse_srt
+
+SRT = """1
+00:00:01,000 --> 00:00:02,500
+<i>Hello</i> there
+
+2
+00:00:03,000 --> 00:00:04,000
+
+
+3
+01:02:03.250 --> 01:02:04.000
+{\\an8}Two
+lines
+"""
+
+
+def test_parse_srt_cues():
+    cues = parse_srt(SRT)
+    assert cues == [
+        {'start': 1.0, 'end': 2.5, 'text': 'Hello there'},
+        {'start': 3723.25, 'end': 3724.0, 'text': 'Two lines'}
+    ]
+
+
+def test_parse_srt_windows_line_endings():
+    assert parse_srt(SRT.replace('\n', '\r\n')) == parse_srt(SRT)
+
+
+def test_parse_srt_ignores_garbage():
+    assert parse_srt('not a subtitle file') == []
+
+
+def test_sidecar_prefers_requested_language(tmp_path):
+    media = tmp_path / 'Movie (2001).mkv'
+    media.write_bytes(b'')
+    for name in ('Movie (2001).de.srt', 'Movie (2001).en.srt'):
+        (tmp_path / name).write_text(SRT)
+    assert find_sidecar_subtitles(str(media), 'en').endswith('.en.srt')
+    assert find_sidecar_subtitles(str(media)).endswith('.de.srt')
+    assert find_sidecar_subtitles(str(tmp_path / 'Other.mkv')) is None
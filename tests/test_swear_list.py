@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from api import bleeparr_core, transcripts
+from api.word_index import diff_swears, index_transcript, plan_swear_changes
+from backend import tasks
+from backend.db import get_indexed_files_with_tokens
+
+
+def test_jobs_clean_with_the_configured_swear_list(db, media_file, tmp_path, monkeypatch):
+    swears = tmp_path / 'custom-swears.txt'
+    swears.write_text('darn\n')
+    db.set_setting('swears_file', str(swears))
+    used = []
+
+    def process_file(self, file_path, dry_run=False, **options):
+        used.append(self.swears_file)
+        return {'success': True, 'file_path': file_path}
+
+    monkeypatch.setattr(bleeparr_core.Bleeparr, 'process_file', process_file)
+    path = media_file('Movie/Movie.mkv')
+    db.add_to_processing_queue({'id': 7, 'type': 'movie', 'file_path': path, 'title': 'Movie', 'parent_id': 7})
+    [item] = db.get_processing_queue()
+    tasks.process_item(item, tasks.engine_options())
+    assert used == [str(swears)] == [tasks.swears_path()]
+
+
+@pytest.fixture
+def indexed(db, monkeypatch, tmp_path):
+    """Store and index a transcript for a file: (fingerprint, words as (text, start), cues)"""
+    monkeypatch.setattr(transcripts, 'TRANSCRIPT_DIR', tmp_path / 'transcripts')
+
+    def index(fingerprint, item_id, words, cues=(), path=None):
+        transcripts.save_transcript(fingerprint, {
+            'words': [{'text': text, 'start': start, 'end': start + 0.4, 'probability': 0.9, 'pass': 'S'}
+                      for text, start in words],
+            'cues': [{'text': text, 'start': start, 'end': end} for text, start, end in cues],
+            'meta': {}
+        })
+        item = {'id': item_id, 'type': 'show', 'file_path': path or f"/media/{item_id}.mkv",
+                'title': 'Show', 'detail': f"S01E{item_id:02d}", 'parent_id': 1}
+        return index_transcript(fingerprint, item)
+    return index
+
+
+def test_index_holds_words_and_cue_tokens(indexed):
+    assert indexed('fp1', 1, [(' Well,', 1.0), (' DARN', 1.5)], [("Well, darn it!", 0.8, 2.5)]) == 5
+    assert [record['item_id'] for record in get_indexed_files_with_tokens(['darn'])] == [1]
+    # A phrase only matches files holding every one of its words
+    assert get_indexed_files_with_tokens(['darn', 'heck']) == []
+
+
+def test_diff_swears():
+    assert diff_swears(['darn', 'heck'], ['heck', 'gosh']) == ({'gosh'}, {'darn'})
+
+
+def test_only_files_with_changed_words_are_replanned(indexed):
+    indexed('fp1', 1, [(' darn', 1.0), (' heck', 5.0)])
+    indexed('fp2', 2, [(' gosh', 2.0)])
+    records = plan_swear_changes(['heck'], ['heck', 'darn'])
+    assert [(record['item_id'], record['mute_plan']) for record in records] == [
+        (1, [(1.0, 1.4), (5.0, 5.4)])
+    ]
+    # Removing a word replans with what is left
+    [record] = plan_swear_changes(['heck', 'darn'], ['heck'])
+    assert record['mute_plan'] == [(5.0, 5.4)]
+    assert plan_swear_changes(['heck'], ['heck']) == []
+
+
+def test_phrases_need_their_words_in_order(indexed):
+    indexed('fp1', 1, [(' son', 1.0), (' of', 1.4), (' a', 1.8), (' gun', 2.2)])
+    indexed('fp2', 2, [(' a', 1.0), (' gun', 1.4), (' son', 3.0), (' of', 3.4)])
+    records = plan_swear_changes([], ['son of a gun'])
+    plans = {record['item_id']: record['mute_plan'] for record in records}
+    assert plans == {1: [(1.0, 2.6)], 2: []}
+
+
+def test_cues_nobody_was_heard_saying_are_muted_whole(indexed):
+    indexed('fp1', 1, [(' darn', 1.0)], [("Oh darn", 0.5, 2.0), ("Darn again", 10.0, 12.0)])
+    [record] = plan_swear_changes([], ['darn'])
+    assert record['mute_plan'] == [(1.0, 1.4), (10.0, 12.0)]
+    [record] = plan_swear_changes([], ['darn'], fallback=False)
+    assert record['mute_plan'] == [(1.0, 1.4)]
+
+
+def test_swear_list_edit_requeues_affected_files_with_their_plan(indexed, db, media_file, tmp_path):
+    swears = tmp_path / 'swears.txt'
+    swears.write_text('heck\n')
+    db.set_setting('swears_file', str(swears))
+    affected = media_file('Show/S01E01.mkv')
+    indexed('fp1', 1, [(' darn', 1.0)], path=affected)
+    indexed('fp2', 2, [(' gosh', 1.0)], path=media_file('Show/S01E02.mkv'))
+    indexed('fp3', 3, [(' darn', 4.0)], path='/media/deleted.mkv')
+
+    # The first check only records the list
+    tasks.check_swear_list()
+    assert db.get_processing_queue() == []
+
+    swears.write_text('heck\ndarn\n')
+    tasks.check_swear_list()
+    [item] = db.get_processing_queue()
+    assert (item['item_id'], item['file_path']) == (1, affected)
+    assert json.loads(item['options'])['mute_plan'] == [[1.0, 1.4]]
+
+    # Nothing changed since, nothing more is queued
+    db.remove_from_processing_queue(item['id'])
+    tasks.check_swear_list()
+    assert db.get_processing_queue() == []
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from api import media
+from api.bleeparr_core import Bleeparr
+from api.media import CLEAN_TRACK_TITLE
+
+
+def probe_info(cleaned):
+    streams = [
+        {'index': 0, 'codec_type': 'video', 'codec_name': 'h264'},
+        {'index': 1, 'codec_type': 'audio', 'codec_name': 'aac', 'channels': 2,
+         'tags': {'title': 'English', 'language': 'eng'}, 'disposition': {'default': 0 if cleaned else 1}}
+    ]
+    if cleaned:
+        streams.append({'index': 2, 'codec_type': 'audio', 'codec_name': 'aac', 'channels': 2,
+                        'tags': {'title': f"English - {CLEAN_TRACK_TITLE}"}, 'disposition': {'default': 1}})
+    return {'streams': streams, 'format': {'duration': '60.0'}}
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    """Record ffmpeg command lines and write their output file"""
+    commands = []
+
+    def run_ffmpeg(cmd):
+        commands.append(cmd)
+        with open(cmd[-1], 'wb') as f:
+            f.write(b'remuxed')
+        return {'wall_seconds': 1.0, 'cpu_seconds': 0.1}
+
+    monkeypatch.setattr(media, 'run_ffmpeg', run_ffmpeg)
+    return commands
+
+
+@pytest.fixture
+def engine(tmp_path):
+    swears = tmp_path / 'swears.txt'
+    swears.write_text('damn\n')
+    return Bleeparr(swears_file=str(swears))
+
+
+def replace(engine, media_file, info, plan):
+    path = media_file('Show/S01E01.mkv')
+    audio_stream = media.get_primary_audio_stream(info)
+    return path, engine._replace_with_track(path, path, plan, info, audio_stream)
+
+
+def test_empty_plan_removes_stale_clean_track(engine, media_file, ffmpeg):
+    info = probe_info(cleaned=True)
+    path, (final_path, timings) = replace(engine, media_file, info, np.empty((0, 2)))
+
+    assert final_path == path and timings is not None
+    assert open(path, 'rb').read() == b'remuxed'
+    cmd = ffmpeg[0]
+    # The cleaned track (second audio stream) is dropped, nothing is re-encoded
+    assert ['-map', '-0:a:1'] == cmd[cmd.index('-0:a:1') - 1:cmd.index('-0:a:1') + 1]
+    assert not any(arg.startswith('-filter:a') for arg in cmd)
+    # The dialogue track is the default again
+    assert cmd[cmd.index('-disposition:a:0') + 1] == 'default'
+
+
+def test_empty_plan_leaves_an_uncleaned_file_alone(engine, media_file, ffmpeg):
+    path, (final_path, timings) = replace(engine, media_file, probe_info(cleaned=False), np.empty((0, 2)))
+    assert timings is None and ffmpeg == []
+    assert open(path, 'rb').read() == b'\0' * 1024
+
+
+def test_plan_replaces_the_clean_track(engine, media_file, ffmpeg):
+    _, (_, timings) = replace(engine, media_file, probe_info(cleaned=True), np.array([[1.0, 2.0]]))
+    cmd = ffmpeg[0]
+    assert '-0:a:1' in cmd
+    assert f"title=English - {CLEAN_TRACK_TITLE}" in cmd
+    assert cmd[cmd.index('-disposition:a:1') + 1] == 'default'
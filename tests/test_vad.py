@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from api.media import SAMPLE_RATE
+from api.vad import detect_speech_regions, plan_chunks, speech_stats
+
+
+@pytest.fixture
+def audio():
+    """Build recordings from room tone, dialogue-like and music-like parts"""
+    rng = np.random.default_rng(0)
+
+    def room_tone(seconds):
+        return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.001).astype(np.float32)
+
+    def dialogue(seconds):
+        # Voice-band harmonics whose loudness rises and falls four times a second
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        voice = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((450, 900, 1350, 1800, 2400), 1))
+        syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+        return (0.2 * voice * syllables).astype(np.float32) + room_tone(seconds)
+
+    def music(seconds):
+        # Loud and in the voice band, but sustained
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        return (0.2 * (np.sin(2 * np.pi * 440 * t) + np.sin(2 * np.pi * 660 * t))).astype(np.float32) + room_tone(seconds)
+
+    parts = {'tone': room_tone, 'speech': dialogue, 'music': music}
+    return lambda *spans: np.concatenate([parts[kind](seconds) for kind, seconds in spans])
+
+
+def test_finds_dialogue_and_skips_music_and_silence(audio):
+    pcm = audio(('tone', 5), ('speech', 3), ('tone', 5), ('music', 5), ('tone', 5))
+    [(start, end)] = detect_speech_regions(pcm, SAMPLE_RATE, pad_ms=0)
+    assert start == pytest.approx(5.0, abs=0.1)
+    assert end == pytest.approx(8.0, abs=0.2)
+
+
+def test_silence_and_tiny_input_have_no_speech(audio):
+    assert detect_speech_regions(audio(('tone', 10)), SAMPLE_RATE) == []
+    assert detect_speech_regions(np.zeros(100, dtype=np.float32), SAMPLE_RATE) == []
+
+
+def test_short_blips_are_dropped(audio):
+    assert detect_speech_regions(audio(('tone', 3), ('speech', 0.15), ('tone', 3)), SAMPLE_RATE) == []
+
+
+def test_regions_are_padded_and_clipped_to_the_recording(audio):
+    pcm = audio(('tone', 5), ('speech', 3), ('tone', 5))
+    [(start, end)] = detect_speech_regions(pcm, SAMPLE_RATE, pad_ms=0)
+    assert detect_speech_regions(pcm, SAMPLE_RATE, pad_ms=200) == [
+        (pytest.approx(start - 0.2), pytest.approx(end + 0.2))
+    ]
+
+    # Padding never reaches before the start or past the end
+    [(start, end)] = detect_speech_regions(audio(('speech', 2), ('tone', 3)), SAMPLE_RATE)
+    assert start == 0.0
+    [(start, end)] = detect_speech_regions(audio(('tone', 3), ('speech', 2)), SAMPLE_RATE)
+    assert end == 5.0
+
+
+def test_pauses_shorter_than_min_silence_are_bridged(audio):
+    pcm = audio(('tone', 3), ('speech', 2), ('tone', 0.3), ('speech', 2), ('tone', 3))
+    assert len(detect_speech_regions(pcm, SAMPLE_RATE, pad_ms=0)) == 1
+
+    pcm = audio(('tone', 3), ('speech', 2), ('tone', 1.0), ('speech', 2), ('tone', 3))
+    first, second = detect_speech_regions(pcm, SAMPLE_RATE, pad_ms=0)
+    assert first[1] < second[0]
+
+
+def test_padding_merges_regions_it_makes_overlap(audio):
+    pcm = audio(('tone', 3), ('speech', 2), ('tone', 0.5), ('speech', 2), ('tone', 3))
+    assert len(detect_speech_regions(pcm, SAMPLE_RATE, pad_ms=0)) == 2
+    [(start, end)] = detect_speech_regions(pcm, SAMPLE_RATE, pad_ms=400)
+    assert start < 3.0 and end > 7.5
+
+
+def test_plan_chunks_packs_small_regions_into_windows():
+    regions = [(0.0, 2.0), (5.0, 8.0), (25.0, 29.0), (31.0, 35.0), (40.0, 90.0)]
+    assert plan_chunks(regions) == [(0.0, 29.0), (31.0, 35.0), (40.0, 90.0)]
+    assert plan_chunks([]) == []
+
+
+def test_speech_stats():
+    stats = speech_stats([(0.0, 30.0), (60.0, 90.0)], 120.0)
+    assert stats == {'regions': 2, 'duration': 120.0, 'speech_seconds': 60.0, 'skipped_seconds': 60.0,
+                     'speech_ratio': 0.5}
+    assert speech_stats([], 0.0)['speech_ratio'] == 0.0